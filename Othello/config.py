@@ -20,6 +20,8 @@ BOARD_SIZE = 8
 
 EVALUATION_GAMES = 20
 
+ARENA_CAPACITY = 1024  # Maximum number of boards pooled per game, allocated on demand, see abstractClasses.BoardArena
+
 # Network parameters
 LR = 1e-4
 GAMMA = 1  # 0.95   # Reward discounting factor
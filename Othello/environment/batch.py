@@ -0,0 +1,169 @@
+import numpy as np
+from numba import njit
+
+import Othello.config as config
+from abstractClasses import BoardException
+from Othello.config import BLACK, WHITE, EMPTY
+from Othello.environment.bitboard import OthelloBitBoard, SQUARE_BITS, ZERO, __get_moves__, __get_flips__, __popcount__, __to_array__, __to_mask__
+
+
+class BatchOthello:
+    """
+    Holds a batch of Othello games as stacked bitboards and advances all of them in lockstep.
+
+    Every query and update is a single numba call over the whole batch. Passes are applied automatically:
+    after each step :attr to_move holds the color that actually has to move next in every game.
+    """
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.board_size = config.BOARD_SIZE
+
+        self.black = np.empty(batch_size, dtype=np.uint64)
+        self.white = np.empty(batch_size, dtype=np.uint64)
+        self.to_move = np.empty(batch_size, dtype=np.int8)
+        self.done = np.empty(batch_size, dtype=np.bool_)
+        self.winners = np.empty(batch_size, dtype=np.int8)
+        self.reset()
+
+    def reset(self, indices=None):
+        """
+        Resets the games at :param indices to the starting position. Resets all games if :param indices is None.
+
+        :param indices: An index array or boolean mask selecting the games to reset
+        :return: self
+        """
+        if indices is None:
+            indices = slice(None)
+        start = OthelloBitBoard()
+        self.black[indices] = start.black
+        self.white[indices] = start.white
+        self.to_move[indices] = BLACK
+        self.done[indices] = False
+        self.winners[indices] = EMPTY
+        return self
+
+    def get_legal_moves_masks(self):
+        """ Returns the uint64 legal move mask of the color to move for every game, 0 for finished games """
+        return __batch_get_moves__(self.black, self.white, self.to_move, self.done)
+
+    def get_legal_moves_maps(self):
+        """ Returns a (batch_size, board_size, board_size) boolean array which is True on every legal move of the color to move """
+        return __batch_to_mask__(self.get_legal_moves_masks())
+
+    def get_representations(self, out=None):
+        """
+        Returns a (batch_size, board_size, board_size) int8 array of all boards in which the color to move is always BLACK
+
+        :param out: Optional buffer of that shape to write the representations into instead of allocating a new array
+        """
+        if out is None:
+            out = np.empty((self.batch_size, self.board_size, self.board_size), dtype=np.int8)
+        player = np.where(self.to_move == BLACK, self.black, self.white)
+        opponent = np.where(self.to_move == BLACK, self.white, self.black)
+        return __batch_to_array__(player, opponent, out)
+
+    def step(self, moves, reset_done=False):
+        """
+        Applies one move in every unfinished game. Moves for finished games are ignored.
+
+        :param moves: (batch_size, 2) array of coordinates or (batch_size,) array of flat tile indices
+        :param reset_done: If set, games finishing in this step are reset right after their winner has been recorded
+        :return: a tuple (done, winners) of arrays for all games. winners holds the winning color of finished games, EMPTY for draws and unfinished games
+        :raises BoardException: if a move is illegal. Games before the offending one have already been advanced in that case.
+        """
+        moves = np.asarray(moves, dtype=np.int64)
+        if moves.ndim == 2:
+            moves = moves[:, 0] * self.board_size + moves[:, 1]
+
+        illegal = __batch_step__(self.black, self.white, self.to_move, self.done, self.winners, moves)
+        if illegal >= 0:
+            raise BoardException("Illegal move %s for color %s in game %s" % (moves[illegal], self.to_move[illegal], illegal))
+
+        done, winners = self.done.copy(), self.winners.copy()
+        if reset_done:
+            self.reset(done)
+        return done, winners
+
+    def count_stones(self):
+        """ returns a tuple of arrays (num_black_stones, num_white_stones) """
+        return __batch_popcount__(self.black), __batch_popcount__(self.white)
+
+    def get_board(self, index):
+        """ Returns the game at :param index as a single OthelloBitBoard """
+        return OthelloBitBoard.from_masks(self.black[index], self.white[index], self.to_move[index])
+
+
+"""   ---  Numba implementations  ---   '''
+Each function loops over the batch inside numba so that one python call covers all games.
+"""
+
+
+@njit
+def __batch_get_moves__(black, white, to_move, done):
+    moves = np.zeros(len(black), dtype=np.uint64)
+    for b in range(len(black)):
+        if not done[b]:
+            if to_move[b] == BLACK:
+                moves[b] = __get_moves__(black[b], white[b])
+            else:
+                moves[b] = __get_moves__(white[b], black[b])
+    return moves
+
+
+@njit
+def __batch_step__(black, white, to_move, done, winners, moves):
+    """ Applies moves in place, handles passes and terminal states. Returns the index of the first illegal move or -1 """
+    for b in range(len(black)):
+        if done[b]:
+            continue
+
+        if to_move[b] == BLACK:
+            player, opponent = black[b], white[b]
+        else:
+            player, opponent = white[b], black[b]
+
+        if moves[b] < 0 or moves[b] >= 64:
+            return b
+        flips = __get_flips__(player, opponent, moves[b])
+        if flips == ZERO:
+            return b
+        player = player | flips | SQUARE_BITS[moves[b]]
+        opponent = opponent & ~flips
+
+        if to_move[b] == BLACK:
+            black[b], white[b] = player, opponent
+        else:
+            white[b], black[b] = player, opponent
+
+        if __get_moves__(opponent, player) != ZERO:
+            to_move[b] = -to_move[b]
+        elif __get_moves__(player, opponent) == ZERO:  # Neither color can move, the game is over
+            done[b] = True
+            black_stones, white_stones = __popcount__(black[b]), __popcount__(white[b])
+            winners[b] = BLACK if black_stones > white_stones else WHITE if black_stones < white_stones else EMPTY
+        # Otherwise the opponent has to pass and the same color moves again
+
+    return -1
+
+
+@njit
+def __batch_to_array__(positive, negative, out):
+    for b in range(len(positive)):
+        __to_array__(positive[b], negative[b], out[b])
+    return out
+
+
+@njit
+def __batch_to_mask__(masks):
+    out = np.empty((len(masks), 8, 8), dtype=np.bool_)
+    for b in range(len(masks)):
+        out[b] = __to_mask__(masks[b])
+    return out
+
+
+@njit
+def __batch_popcount__(masks):
+    counts = np.empty(len(masks), dtype=np.int64)
+    for b in range(len(masks)):
+        counts[b] = __popcount__(masks[b])
+    return counts
@@ -0,0 +1,284 @@
+import numpy as np
+from numba import njit
+
+import Othello.config as config
+from abstractClasses import Board, BoardException, zobrist_key
+from Othello.config import BLACK, WHITE, EMPTY
+from Othello.environment.board import ZOBRIST_TABLE, ZOBRIST_SIDE
+
+# Squares are numbered row major, bit (i * 8 + j) represents the tile board[i, j].
+FULL_MASK = np.uint64(0xFFFFFFFFFFFFFFFF)
+INNER_COLUMNS = np.uint64(0x7E7E7E7E7E7E7E7E)  # Columns 1..6, stops horizontal and diagonal shifts from wrapping around
+
+# The 8 real directions as (shift, left shift?, mask applied to opponent stones): E, W, S, N, SE, NW, SW, NE
+SHIFTS = np.array([1, 1, 8, 8, 9, 9, 7, 7], dtype=np.uint64)
+LEFT_SHIFTS = np.array([True, False, True, False, True, False, True, False])
+SHIFT_MASKS = np.array([INNER_COLUMNS, INNER_COLUMNS, FULL_MASK, FULL_MASK, INNER_COLUMNS, INNER_COLUMNS, INNER_COLUMNS, INNER_COLUMNS], dtype=np.uint64)
+
+ZERO = np.uint64(0)
+SQUARE_BITS = np.array([1 << i for i in range(64)], dtype=np.uint64)
+
+
+class OthelloBitBoard(Board):
+    """
+    Represents a board of Othello as two 64 bit masks, one per color.
+
+    The class is API compatible with OthelloBoard and can be used wherever an OthelloBoard is expected.
+    Move generation and flipping are done with shifts over the masks instead of walking the array tile by tile.
+    """
+    def __init__(self, board=None):
+        self.board_size = config.BOARD_SIZE
+        if self.board_size != 8:
+            raise BoardException("OthelloBitBoard only supports board size 8, got %s" % self.board_size)
+
+        if board:
+            self.black, self.white = board.black, board.white
+        else:
+            self.black = np.uint64((1 << (3 * 8 + 4)) | (1 << (4 * 8 + 3)))
+            self.white = np.uint64((1 << (3 * 8 + 3)) | (1 << (4 * 8 + 4)))
+
+        self.legal_moves = {}
+        self.illegal_move = None
+        self.__board__ = None
+
+        # Same keys as OthelloBoard, equal positions hash equally in both implementations
+        self.to_move = board.to_move if board else BLACK
+        self.__key__ = board.__key__ if board else zobrist_key(self.board, self.to_move, ZOBRIST_TABLE, ZOBRIST_SIDE)
+
+        self.undo_stack = []
+
+    @classmethod
+    def from_masks(cls, black, white, to_move=BLACK):
+        """ Returns the board holding the stones of the masks :param black and :param white with :param to_move to move next """
+        board = cls()
+        board.black, board.white = np.uint64(black), np.uint64(white)
+        board.to_move = int(to_move)
+        board.legal_moves = {}
+        board.__board__ = None
+        board.__key__ = zobrist_key(board.board, board.to_move, ZOBRIST_TABLE, ZOBRIST_SIDE)
+        return board
+
+    @property
+    def board(self):
+        """
+        The board as an array in the same format as OthelloBoard.board. The array is cached until the next move, writing to it does not change the position.
+        """
+        if self.__board__ is None:
+            self.__board__ = __to_array__(self.black, self.white, np.empty((8, 8), dtype=np.int8))
+        return self.__board__
+
+    def get_valid_moves(self, color):
+        if color not in self.legal_moves:
+            self.legal_moves[color] = {(i >> 3, i & 7) for i in __to_indices__(self.__get_moves_mask__(color))}
+        return self.legal_moves[color]
+
+    def apply_move(self, move, color):
+        if color is None:
+            raise BoardException("Illegal color provided: %s" % color)
+
+        player, opponent = self.__masks__(color)
+        position = move[0] * self.board_size + move[1]
+        flips = np.uint64(__get_flips__(player, opponent, position))
+
+        if flips:
+            self.__place__(player, opponent, position, flips, color)
+        else:
+            print("!! Illegal move !!")
+            self.illegal_move = color
+            self.legal_moves = {}
+            self.__board__ = None
+
+        return self
+
+    def make_move(self, move, color):
+        player, opponent = self.__masks__(color)
+        position = move[0] * self.board_size + move[1]
+        flips = np.uint64(__get_flips__(player, opponent, position))
+        if not flips:
+            raise BoardException("Illegal move %s for color %s" % (move, color))
+
+        self.undo_stack.append((self.black, self.white, self.__key__, self.to_move, self.legal_moves, self.__board__))
+        self.__place__(player, opponent, position, flips, color)
+
+    def unmake_move(self):
+        self.black, self.white, self.__key__, self.to_move, self.legal_moves, self.__board__ = self.undo_stack.pop()
+
+    def __place__(self, player, opponent, position, flips, color):
+        player, opponent = player | flips | SQUARE_BITS[position], opponent & ~flips
+        if color == BLACK:
+            self.black, self.white = player, opponent
+        else:
+            self.white, self.black = player, opponent
+
+        self.__key__ ^= __zobrist_delta__(flips, position, 0 if color == BLACK else 1)
+        if self.to_move == color:
+            self.__key__ ^= ZOBRIST_SIDE
+            self.to_move = self.other_color(color)
+
+        self.legal_moves = {}
+        self.__board__ = None
+
+    def set_board(self, board):
+        flat = board.flatten()
+        self.black = np.uint64(np.bitwise_or.reduce(SQUARE_BITS[flat == BLACK]))
+        self.white = np.uint64(np.bitwise_or.reduce(SQUARE_BITS[flat == WHITE]))
+        self.legal_moves = {}
+        self.__board__ = None
+        self.__key__ = zobrist_key(self.board, self.to_move, ZOBRIST_TABLE, ZOBRIST_SIDE)
+        return self
+
+    def game_won(self):
+        if not self.__get_moves_mask__(BLACK) and not self.__get_moves_mask__(WHITE):
+            stones = self.count_stones()
+            return BLACK if stones[0] > stones[1] else WHITE if stones[0] < stones[1] else EMPTY
+        else:
+            return None
+
+    def get_representation(self, color, out=None):
+        if out is None:
+            out = np.empty((8, 8), dtype=np.int8)
+        if color == BLACK:
+            return __to_array__(self.black, self.white, out)
+        if color == WHITE:
+            return __to_array__(self.white, self.black, out)
+        else:
+            raise BoardException("Illegal color provided: %s" % color)
+
+    def get_legal_moves_map(self, color):
+        return __to_mask__(self.__get_moves_mask__(color))
+
+    def copy(self):
+        if self.arena is not None:
+            return self.arena.acquire(self)
+        return OthelloBitBoard(self)
+
+    def copy_into(self, board):
+        board.black, board.white = self.black, self.white
+        board.legal_moves = {}
+        board.illegal_move = None
+        board.__board__ = None
+        board.to_move, board.__key__ = self.to_move, self.__key__
+        board.undo_stack.clear()
+        return board
+
+    def get_afterstates(self, color):
+        return [(self.copy().apply_move(move=move, color=color), move) for move in self.get_valid_moves(color)]
+
+    def count_stones(self):
+        return __popcount__(self.black), __popcount__(self.white)
+
+    def get_empty_spaces(self):
+        return self.board_size**2 - __popcount__(self.black | self.white)
+
+    def __masks__(self, color):
+        if color == BLACK:
+            return self.black, self.white
+        if color == WHITE:
+            return self.white, self.black
+        raise BoardException("Illegal color provided: %s" % color)
+
+    def __get_moves_mask__(self, color):
+        player, opponent = self.__masks__(color)
+        return np.uint64(__get_moves__(player, opponent))
+
+
+"""   ---  Numba implementations  ---   '''
+All masks are passed as np.uint64. Mixing them with python ints inside numba silently promotes to float64, hence the typed constants above.
+Numba returns uint64 results as python ints, the class wraps them in np.uint64 again before storing or passing them on.
+"""
+
+
+@njit
+def __shift__(x, direction):
+    if LEFT_SHIFTS[direction]:
+        return x << SHIFTS[direction]
+    return x >> SHIFTS[direction]
+
+
+@njit
+def __get_moves__(player, opponent):
+    """ Returns a mask of all empty tiles that flip at least one opponent stone when played by :param player """
+    empty = ~(player | opponent)
+    moves = ZERO
+    for direction in range(8):
+        masked_opponent = opponent & SHIFT_MASKS[direction]
+        x = __shift__(player, direction) & masked_opponent
+        for i in range(5):  # At most 6 opponent stones fit between two tiles
+            x |= __shift__(x, direction) & masked_opponent
+        moves |= __shift__(x, direction) & empty
+    return moves
+
+
+@njit
+def __get_flips__(player, opponent, position):
+    """ Returns a mask of all opponent stones flipped by placing a stone on :param position. 0 if the move is illegal """
+    move = SQUARE_BITS[position]
+    if (player | opponent) & move:
+        return ZERO
+
+    flips = ZERO
+    for direction in range(8):
+        masked_opponent = opponent & SHIFT_MASKS[direction]
+        x = __shift__(move, direction) & masked_opponent
+        candidates = ZERO
+        while x:
+            candidates |= x
+            x = __shift__(x, direction)
+            if x & player:
+                flips |= candidates
+                break
+            x &= masked_opponent
+    return flips
+
+
+@njit
+def __zobrist_delta__(flips, position, color_index):
+    """ Returns the xor of the keys of the placed stone and of all flipped stones before and after the flip """
+    delta = ZOBRIST_TABLE[color_index, position]
+    for i in range(64):
+        if flips & SQUARE_BITS[i]:
+            delta ^= ZOBRIST_TABLE[0, i] ^ ZOBRIST_TABLE[1, i]
+    return delta
+
+
+@njit
+def __popcount__(x):
+    x = x - ((x >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    x = (x & np.uint64(0x3333333333333333)) + ((x >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    x = (x + (x >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return int((x * np.uint64(0x0101010101010101)) >> np.uint64(56))
+
+
+@njit
+def __to_indices__(x):
+    indices = np.empty(__popcount__(x), dtype=np.int64)
+    n = 0
+    for i in range(64):
+        if x & SQUARE_BITS[i]:
+            indices[n] = i
+            n += 1
+    return indices
+
+
+@njit
+def __to_array__(positive, negative, out):
+    """ Fills the 8x8 array :param out with 1 for bits set in :param positive, -1 for bits set in :param negative and 0 elsewhere """
+    for i in range(64):
+        bit = SQUARE_BITS[i]
+        if positive & bit:
+            out[i >> 3, i & 7] = BLACK
+        elif negative & bit:
+            out[i >> 3, i & 7] = WHITE
+        else:
+            out[i >> 3, i & 7] = EMPTY
+    return out
+
+
+@njit
+def __to_mask__(x):
+    """ Returns an 8x8 boolean array which is True for all bits set in :param x """
+    out = np.zeros((8, 8), dtype=np.bool_)
+    for i in range(64):
+        if x & SQUARE_BITS[i]:
+            out[i >> 3, i & 7] = True
+    return out
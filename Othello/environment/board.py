@@ -2,14 +2,63 @@ import numpy as np
 from numba import njit
 
 import Othello.config as config
-from abstractClasses import Board, BoardException
+from abstractClasses import Board, BoardException, generate_zobrist_keys, zobrist_key
 from Othello.config import BLACK, WHITE, EMPTY
 
 DIRECTIONS = np.array([[-1,-1], [-1,0], [-1,1],
-                       [0, -1], [0, 0], [0, 1],
+                       [0, -1],          [0, 1],
                        [1, -1], [1, 0], [1, 1]])
 
 
+def __generate_neighbours__(board_size):
+    """ For every tile: the list of adjacent tiles in bounds """
+    return {(i, j): [(i + int(d[0]), j + int(d[1])) for d in DIRECTIONS if 0 <= i + d[0] < board_size and 0 <= j + d[1] < board_size]
+            for i in range(board_size) for j in range(board_size)}
+
+
+def __generate_line_masks__(board_size):
+    """ For every tile: a bitmask (bit i*board_size+j) of all tiles sharing a row, column or diagonal with it """
+    masks = {}
+    for i in range(board_size):
+        for j in range(board_size):
+            mask = 0
+            for k in range(board_size):
+                for l in range(board_size):
+                    if k == i or l == j or k - l == i - j or k + l == i + j:
+                        mask |= 1 << (k * board_size + l)
+            masks[(i, j)] = mask
+    return masks
+
+
+def __generate_rays__(board_size):
+    """
+    For every flat tile index and every direction: the ordered flat indices of all tiles walked when stepping away from the tile.
+    Rays are padded with -1 up to board_size - 1 entries, their actual lengths are returned separately.
+    """
+    rays = np.full((board_size**2, len(DIRECTIONS), board_size - 1), -1, dtype=np.int64)
+    lengths = np.zeros((board_size**2, len(DIRECTIONS)), dtype=np.int64)
+    for i in range(board_size):
+        for j in range(board_size):
+            for k, (di, dj) in enumerate(DIRECTIONS):
+                y, x = i + di, j + dj
+                while 0 <= y < board_size and 0 <= x < board_size:
+                    rays[i * board_size + j, k, lengths[i * board_size + j, k]] = y * board_size + x
+                    lengths[i * board_size + j, k] += 1
+                    y, x = y + di, x + dj
+    return rays, lengths
+
+
+NEIGHBOURS = __generate_neighbours__(config.BOARD_SIZE)
+NEIGHBOUR_INDICES = {tile: [i * config.BOARD_SIZE + j for i, j in neighbours] for tile, neighbours in NEIGHBOURS.items()}
+LINE_MASKS = __generate_line_masks__(config.BOARD_SIZE)
+RAYS, RAY_LENGTHS = __generate_rays__(config.BOARD_SIZE)
+
+ZOBRIST_TABLE, ZOBRIST_SIDE = generate_zobrist_keys(config.BOARD_SIZE**2)
+ZOBRIST_KEYS = {BLACK: ZOBRIST_TABLE[0].tolist(), WHITE: ZOBRIST_TABLE[1].tolist()}
+ZOBRIST_FLIPS = (ZOBRIST_TABLE[0] ^ ZOBRIST_TABLE[1]).tolist()  # Changes the color of a stone
+ZOBRIST_SIDE = int(ZOBRIST_SIDE)
+
+
 class OthelloBoard(Board):
     """
     Represents a board of Othello and all actions that can be taken on it.
@@ -20,21 +69,119 @@ class OthelloBoard(Board):
         if board:
             self.board = board.board.copy()
         else:
-            self.board = np.full((self.board_size, self.board_size), EMPTY, dtype=np.float64)
+            self.board = np.full((self.board_size, self.board_size), EMPTY, dtype=np.int8)
             self.board[3, 3] = config.WHITE
             self.board[3, 4] = config.BLACK
             self.board[4, 3] = config.BLACK
             self.board[4, 4] = config.WHITE
 
-        self.legal_moves = {}
+        # Legal moves of both colors are maintained incrementally by apply_move, starting from a full scan.
+        # Setting legal_moves to {} invalidates them, e.g. after writing to self.board directly.
+        # The sets are replaced rather than mutated so that copies can share them.
+        self.legal_moves = board.legal_moves if board else {}
+        self.frontier = board.frontier if board else set()  # Empty tiles adjacent to at least one stone
         self.illegal_move = None
 
+        # Statistics maintained alongside the legal moves and only valid while these are
+        self.__stones__ = board.__stones__ if board else (0, 0)  # (black, white)
+        self.__frontier_discs__ = board.__frontier_discs__ if board else (0, 0)  # (black, white) stones adjacent to an empty tile
+        self.__empty_neighbours__ = list(board.__empty_neighbours__) if board else []  # Number of empty neighbours per flat tile index
+        self.__passes__ = None  # Computed on demand
+
+        # The color that did not make the last move. Othello.__run__ skips passing players, therefore this is only a best guess after a pass.
+        self.to_move = board.to_move if board else BLACK
+        self.__key__ = board.__key__ if board else zobrist_key(self.board, self.to_move, ZOBRIST_TABLE, ZOBRIST_SIDE)
+
+        self.undo_stack = []
+
     def get_valid_moves(self, color):
-        if color in self.legal_moves:
-            return self.legal_moves[color]
+        if not self.legal_moves:
+            self.__scan_legal_moves__()
+        return self.legal_moves[color]
+
+    def __scan_legal_moves__(self):
+        self.frontier = {neighbour for tile in zip(*np.nonzero(self.board)) for neighbour in NEIGHBOURS[(int(tile[0]), int(tile[1]))]
+                         if self.board[neighbour] == EMPTY}
+        self.legal_moves = {BLACK: __get_legal_moves__(self.board, self.board_size, BLACK, WHITE),
+                            WHITE: __get_legal_moves__(self.board, self.board_size, WHITE, BLACK)}
+        self.__key__ = zobrist_key(self.board, self.to_move, ZOBRIST_TABLE, ZOBRIST_SIDE)
+
+        empty = np.pad(self.board == EMPTY, 1).astype(np.int8)
+        empty_neighbours = sum(empty[1 + i:1 + i + self.board_size, 1 + j:1 + j + self.board_size] for i, j in DIRECTIONS)
+        self.__empty_neighbours__ = empty_neighbours.flatten().tolist()
+        self.__stones__ = __count_stones__(self.board, self.board_size)
+        self.__frontier_discs__ = __count_stones__(np.where(empty_neighbours > 0, self.board, EMPTY), self.board_size)
+        self.__passes__ = None
+
+    def __update_legal_moves__(self, takes):
+        """
+        Updates frontier and legal moves after :param takes (the placed stone followed by all flipped ones) changed color.
+        Only frontier tiles sharing a line with a changed tile can change their legality.
+        """
+        move = takes[0]
+        frontier = set(self.frontier)
+        frontier.discard(move)
+        frontier.update(neighbour for neighbour in NEIGHBOURS[move] if self.board[neighbour] == EMPTY)
+        self.frontier = frontier
+
+        affected = 0
+        for take in takes:
+            affected |= LINE_MASKS[take]
+        candidates = [tile for tile in frontier if affected >> (tile[0] * self.board_size + tile[1]) & 1]
+
+        black, white = set(self.legal_moves[BLACK]), set(self.legal_moves[WHITE])
+        black.discard(move)
+        white.discard(move)
+        if candidates:
+            legal = __get_legal_moves_at__(self.board, self.board_size, np.array(candidates), BLACK, WHITE)
+            for tile, (legal_black, legal_white) in zip(candidates, legal.tolist()):
+                if legal_black:
+                    black.add(tile)
+                else:
+                    black.discard(tile)
+                if legal_white:
+                    white.add(tile)
+                else:
+                    white.discard(tile)
+        self.legal_moves = {BLACK: black, WHITE: white}
+
+    def __update_stats__(self, takes, color):
+        """ Updates disc counts, frontier discs and empty neighbour counts after :param takes (the placed stone followed by all flipped ones) changed color """
+        empty_neighbours = self.__empty_neighbours__
+        move = takes[0]
+
+        # Flipped frontier discs change color, the placed stone is a frontier disc if it has an empty neighbour
+        flipped_frontier = 0
+        for i in range(1, len(takes)):
+            if empty_neighbours[takes[i][0] * self.board_size + takes[i][1]]:
+                flipped_frontier += 1
+        gained_frontier = flipped_frontier + (1 if empty_neighbours[move[0] * self.board_size + move[1]] else 0)
+
+        # Stones next to the placed one may have lost their last empty neighbour
+        enclosed = {BLACK: 0, WHITE: 0}
+        for index, neighbour in zip(NEIGHBOUR_INDICES[move], NEIGHBOURS[move]):
+            empty_neighbours[index] -= 1
+            if not empty_neighbours[index] and self.board[neighbour] != EMPTY:
+                enclosed[int(self.board[neighbour])] += 1
+
+        black, white = self.__stones__
+        black_frontier, white_frontier = self.__frontier_discs__
+        if color == BLACK:
+            self.__stones__ = black + len(takes), white - len(takes) + 1
+            self.__frontier_discs__ = black_frontier + gained_frontier - enclosed[BLACK], white_frontier - flipped_frontier - enclosed[WHITE]
         else:
-            self.legal_moves[color] = __get_legal_moves__(self.board, self.board_size, color, self.other_color(color))
-            return self.legal_moves[color]
+            self.__stones__ = black - len(takes) + 1, white + len(takes)
+            self.__frontier_discs__ = black_frontier - flipped_frontier - enclosed[BLACK], white_frontier + gained_frontier - enclosed[WHITE]
+        self.__passes__ = None
+
+    def __update_key__(self, takes, color):
+        key = self.__key__ ^ ZOBRIST_KEYS[color][takes[0][0] * self.board_size + takes[0][1]]
+        for i in range(1, len(takes)):
+            key ^= ZOBRIST_FLIPS[takes[i][0] * self.board_size + takes[i][1]]
+        if self.to_move == color:
+            key ^= ZOBRIST_SIDE
+            self.to_move = self.other_color(color)
+        self.__key__ = key
 
     def apply_move(self, move, color):
         if color is None:
@@ -43,57 +190,125 @@ class OthelloBoard(Board):
         takes = find_takes(self.board, self.board_size, move, color, self.other_color(color))
 
         if len(takes) > 1:  # More than just placed stone in taken set
-            for t in takes:
-                self.board[t[0], t[1]] = color
-
+            self.__place__(takes, color)
         else:
             print("!! Illegal move !!")
             self.illegal_move = color
 
+        return self
+
+    def make_move(self, move, color):
+        takes = find_takes(self.board, self.board_size, move, color, self.other_color(color))
+        if len(takes) <= 1:
+            raise BoardException("Illegal move %s for color %s" % (move, color))
+
+        self.undo_stack.append((takes, color, self.__key__, self.to_move, self.legal_moves, self.frontier, self.__stones__, self.__frontier_discs__, self.__passes__))
+        self.__place__(takes, color)
+
+    def unmake_move(self):
+        takes, color, self.__key__, self.to_move, self.legal_moves, self.frontier, self.__stones__, self.__frontier_discs__, self.__passes__ = self.undo_stack.pop()
+        other_color = self.other_color(color)
+
+        self.board[takes[0][0], takes[0][1]] = EMPTY
+        for i in range(1, len(takes)):
+            self.board[takes[i][0], takes[i][1]] = other_color
+
+        if self.legal_moves:
+            for index in NEIGHBOUR_INDICES[takes[0]]:
+                self.__empty_neighbours__[index] += 1
+
+    def __place__(self, takes, color):
+        for t in takes:
+            self.board[t[0], t[1]] = color
+        self.__update_key__(takes, color)
+
+        if self.legal_moves:
+            self.__update_legal_moves__(takes)
+            self.__update_stats__(takes, color)
+
+    def set_board(self, board):
+        self.board[:] = board
         self.legal_moves = {}
+        self.__key__ = zobrist_key(self.board, self.to_move, ZOBRIST_TABLE, ZOBRIST_SIDE)
         return self
 
+    @property
+    def stones(self):
+        """ Tuple (num_black_stones, num_white_stones) """
+        if not self.legal_moves:
+            self.__scan_legal_moves__()
+        return self.__stones__
+
+    @property
+    def empty_spaces(self):
+        black, white = self.stones
+        return self.board_size**2 - black - white
+
+    @property
+    def frontier_discs(self):
+        """ Tuple (num_black_stones, num_white_stones) of stones adjacent to at least one empty tile """
+        if not self.legal_moves:
+            self.__scan_legal_moves__()
+        return self.__frontier_discs__
+
+    @property
+    def passes(self):
+        """ Number of consecutive passes following the last move: 0 if to_move can move, 1 if only the other color can, 2 if the game is over """
+        if not self.legal_moves:
+            self.__scan_legal_moves__()
+        if self.__passes__ is None:
+            other_color = self.other_color(self.to_move)
+            self.__passes__ = 0 if self.get_valid_moves(self.to_move) else 1 if self.get_valid_moves(other_color) else 2
+        return self.__passes__
+
     def game_won(self):
-        if len(self.get_valid_moves(config.BLACK) | self.get_valid_moves(config.WHITE)) == 0:
-            stones = self.count_stones()
-            return config.BLACK if stones[0] > stones[1] else config.WHITE if stones[0] < stones[1] else config.EMPTY
+        if self.passes == 2:
+            black, white = self.stones
+            return config.BLACK if black > white else config.WHITE if black < white else config.EMPTY
         else:
             return None
 
-    def get_representation(self, color):
+    def get_representation(self, color, out=None):
         if color == BLACK:
-            return self.board.copy()
+            if out is None:
+                return self.board.copy()
+            np.copyto(out, self.board)
+            return out
 
         if color == WHITE:
-            return __get_representation_njit__(self.board, self.board_size, color, self.other_color(color))
+            return np.negative(self.board, out=out)
         else:
             raise BoardException("Illegal color provided: %s" % color)
 
     def get_legal_moves_map(self, color):
-        legal_moves = self.get_valid_moves(color)
-        if not legal_moves:
-            return np.zeros((self.board_size, self.board_size))
-        else:
-            return __get_legal_moves_map__(self.board_size, legal_moves)
+        legal_moves_map = np.zeros((self.board_size, self.board_size), dtype=np.bool_)
+        for move in self.get_valid_moves(color):
+            legal_moves_map[move] = True
+        return legal_moves_map
 
     def copy(self):
+        if self.arena is not None:
+            return self.arena.acquire(self)
         return OthelloBoard(self)
 
+    def copy_into(self, board):
+        np.copyto(board.board, self.board)
+        board.legal_moves, board.frontier = self.legal_moves, self.frontier
+        board.__stones__, board.__frontier_discs__, board.__passes__ = self.__stones__, self.__frontier_discs__, self.__passes__
+        board.__empty_neighbours__[:] = self.__empty_neighbours__
+        board.illegal_move = None
+        board.to_move, board.__key__ = self.to_move, self.__key__
+        board.undo_stack.clear()
+        return board
+
     def get_afterstates(self, color):
         return [(self.copy().apply_move(move=move, color=color), move) for move in self.get_valid_moves(color)]
 
     def count_stones(self):
-        return __count_stones__(self.board, self.board_size)
+        return self.stones
 
     def get_empty_spaces(self):
-        stone_count = self.count_stones()
-        return self.board_size**2 - stone_count[0] - stone_count[1]
-
-    def __eq__(self, other):
-        return (self.board == other.board).all()
-
-    def __hash__(self):
-        return hash(str(self.board))
+        return self.empty_spaces
 
 
 """   ---  Numba implementations  ---   '''
@@ -105,109 +320,73 @@ These functions can then be wrapped by a class method, hiding the numba implemen
 
 @njit
 def __get_legal_moves__(board, board_size, color, other_color):
+    board = board.reshape(board_size * board_size)
     legal_moves = set()
-    for i in range(board_size):
-        for j in range(board_size):
-            if board[i][j] == EMPTY:
-                pos = np.array([i, j])
-                legal = False  # Optimization preventing unnecessary checks after move has been proven valid
-                for k in range(len(DIRECTIONS)):
-                    direction = DIRECTIONS[k]
-                    new_pos = pos + direction
-                    if not legal and in_bounds(board_size, new_pos) and board[new_pos[0], new_pos[1]] == other_color:
-                        if __get_legal_moves_in_direction__(board, board_size, new_pos, direction, color, other_color):
-                            legal_moves.add((pos[0], pos[1]))
-                            legal = True
+    for position in range(board_size * board_size):
+        if board[position] == EMPTY:
+            for direction in range(len(DIRECTIONS)):  # Stops at the first direction proving the move valid
+                if __count_flips_in_direction__(board, position, direction, color, other_color):
+                    legal_moves.add((position // board_size, position % board_size))
+                    break
     return legal_moves
 
 
 @njit
-def __get_legal_moves_in_direction__(board, board_size, pos, direction, color, other_color):
+def __get_legal_moves_at__(board, board_size, positions, color, other_color):
+    """ Returns a (len(positions), 2) boolean array stating whether each empty position is a legal move for :param color and :param other_color respectively """
+    board = board.reshape(board_size * board_size)
+    legal = np.zeros((len(positions), 2), dtype=np.bool_)
+    for n in range(len(positions)):
+        position = positions[n, 0] * board_size + positions[n, 1]
+        for direction in range(len(DIRECTIONS)):
+            if not legal[n, 0] and __count_flips_in_direction__(board, position, direction, color, other_color):
+                legal[n, 0] = True
+            if not legal[n, 1] and __count_flips_in_direction__(board, position, direction, other_color, color):
+                legal[n, 1] = True
+    return legal
+
+
+@njit
+def __count_flips_in_direction__(board, position, direction, color, other_color):
     """
-    Checks for player stones in the given direction AFTER the given position that mark the original position as a legal move
+    Walks the precomputed ray from :param position in :param direction over the flattened board
 
-    :param board: the board
-    :param board_size: the board size (NxN)
-    :param pos: The position of the first oppoonent stone
-    :param direction: direction to check
+    :param board: the flattened board
+    :param position: flat index of the tile a stone would be placed on
+    :param direction: index into DIRECTIONS
     :param color: player color
     :param other_color: opponent color
-    :return: True if at least one stone can be overturned in the given direction and False otherwise
+    :return: The number of opponent stones overturned in the given direction, 0 if the ray is not closed by a player stone
     """
-    new_pos = pos + direction
-
-    while in_bounds(board_size, new_pos) and board[new_pos[0], new_pos[1]] != EMPTY:
-
-        if board[new_pos[0], new_pos[1]] == color:
-            return True
-
-        if board[new_pos[0], new_pos[1]] == other_color:
-            new_pos = new_pos + direction
-
-    return False
-
-
-@njit
-def __get_legal_moves_map__(board_size, valid_moves):
-    legal_moves_map = np.zeros((board_size, board_size))
-    for move in valid_moves:
-        legal_moves_map[move[0]][move[1]] = 1
-    return legal_moves_map
+    ray = RAYS[position, direction]
+    for k in range(RAY_LENGTHS[position, direction]):
+        tile = board[ray[k]]
+        if tile == color:
+            return k
+        if tile != other_color:
+            return 0
+    return 0
 
 
 @njit
 def find_takes(board, board_size, move, color, other_color):
-    takes = [move]
-    for i in range(len(DIRECTIONS)):
-        direction = DIRECTIONS[i]
-        new_pos = np.array(move) + direction
-        if in_bounds(board_size, new_pos) and board[new_pos[0], new_pos[1]] == other_color:
-            find_takes_directionally(board, board_size, new_pos, direction, color, other_color, takes)
+    """ Returns the placed stone :param move followed by all stones it overturns """
+    flat_board = board.reshape(board_size * board_size)
+    position = move[0] * board_size + move[1]
+    takes = [(move[0], move[1])]
+    for direction in range(len(DIRECTIONS)):
+        ray = RAYS[position, direction]
+        for k in range(__count_flips_in_direction__(flat_board, position, direction, color, other_color)):
+            takes.append((ray[k] // board_size, ray[k] % board_size))
     return takes
 
 
-@njit
-def find_takes_directionally(board, board_size, pos, direction, color, other_color, takes):
-    dir_takes = [(pos[0], pos[1])]
-
-    new_pos = pos + direction
-    while in_bounds(board_size, (new_pos[0], new_pos[1])) and board[new_pos[0], new_pos[1]] != config.EMPTY:
-
-        if board[new_pos[0], new_pos[1]] == color:
-            takes.extend(dir_takes)
-            return
-
-        if board[new_pos[0], new_pos[1]] == other_color:
-            dir_takes.append((new_pos[0], new_pos[1]))
-            new_pos += direction
-
-    return
-
-
 @njit
 def __count_stones__(board, board_size):
     """ returns a tuple (num_black_stones, num_white_stones)"""
 
-    black = (board == np.full((board_size, board_size), BLACK, dtype=np.float64)).sum()
-    white = (board == np.full((board_size, board_size), WHITE, dtype=np.float64)).sum()
+    black = (board == BLACK).sum()
+    white = (board == WHITE).sum()
 
     return black, white
 
-
-@njit
-def __get_representation_njit__(board, board_size, color, other_color):
-    out = np.full((board_size, board_size), config.EMPTY, dtype=np.float64)
-
-    for i in range(board_size):
-        for j in range(board_size):
-            if board[i, j] == color:
-                out[i,j] = other_color
-            elif board[i, j] == other_color:
-                out[i, j] = color
-
-    return out
-
-
-@njit
-def in_bounds(board_size, position):
-    return position[0] >= 0 and position[1] >= 0 and position[0] < board_size and position[1] < board_size
@@ -1,12 +1,17 @@
 from two_player_game import TwoPlayerGame
+from abstractClasses import BoardArena
 import Othello.config as config
 from Othello.environment.board import OthelloBoard
 
 
 class Othello(TwoPlayerGame):
 
-    def __init__(self, players, gui=None):
+    def __init__(self, players, gui=None, board_type=OthelloBoard, arena_capacity=config.ARENA_CAPACITY):
         super(Othello, self).__init__(players=players, config=config, gui=gui)
+        self.board_type = board_type  # OthelloBoard or any API compatible implementation such as OthelloBitBoard
+
+        # All boards of a game are drawn from the arena and reclaimed when the next game starts. Players must not keep boards across games.
+        self.arena = BoardArena(board_type, arena_capacity) if arena_capacity else None
 
         self.player1.color = config.BLACK
         self.player2.color = config.WHITE
@@ -22,14 +27,20 @@ class Othello(TwoPlayerGame):
         :param player2:
         :return: The original color of the winning player
         """
-        self.board = OthelloBoard()
+        if self.arena is not None:
+            self.arena.release_all()
+            self.board = self.arena.acquire()
+        else:
+            self.board = self.board_type()
         players = player1, player2
         if self.gui:
             self.gui.show_game(self.board)
 
         while True:
             if len(self.board.get_valid_moves(players[0].color)) > 0:
-                move = players[0].get_move(self.board.copy())
+                board = self.board.copy()
+                move = players[0].get_move(board)
+                board.release()
                 self.board.apply_move(move, players[0].color)
 
                 if self.gui:
@@ -0,0 +1,123 @@
+from datetime import datetime
+from multiprocessing import Pool
+
+import Othello.config as config
+from abstractClasses import BoardException
+from Othello.config import BLACK
+from Othello.environment.board import OthelloBoard
+from Othello.environment.bitboard import OthelloBitBoard
+
+# Number of leaf nodes reachable from the initial position, passes count as a ply
+REFERENCE_COUNTS = {1: 4, 2: 12, 3: 56, 4: 244, 5: 1396, 6: 8200, 7: 55092, 8: 390216}
+
+
+def perft(board, color, depth):
+    """
+    Counts the leaf nodes of the game tree below :param board walking it with make_move / unmake_move.
+
+    A player without legal moves passes, which counts as a ply. Finished games count as a single leaf regardless of the remaining depth.
+
+    :param board: The board to start from. It is left unchanged
+    :param color: The color to move
+    :param depth: The number of plies to expand
+    :return: The number of leaf nodes at :param depth
+    """
+    if depth == 0:
+        return 1
+
+    other_color = board.other_color(color)
+    moves = board.get_valid_moves(color)
+    if not moves:
+        if not board.get_valid_moves(other_color):
+            return 1
+        return perft(board, other_color, depth - 1)
+
+    if depth == 1:  # Bulk counting, the leaves themselves need not be generated
+        return len(moves)
+
+    nodes = 0
+    for move in list(moves):
+        board.make_move(move, color)
+        nodes += perft(board, other_color, depth - 1)
+        board.unmake_move()
+    return nodes
+
+
+def divide(depth, board_type=OthelloBoard, pool=None):
+    """
+    Runs perft from the initial position split by root move.
+
+    :param depth: The number of plies to expand, at least 1
+    :param board_type: The board implementation to use, OthelloBoard or OthelloBitBoard
+    :param pool: Optional multiprocessing.Pool the root moves are distributed over. None runs everything in this process
+    :return: A dict {root move: leaf nodes}
+    """
+    moves = sorted(board_type().get_valid_moves(BLACK))
+    jobs = [(board_type, move, depth) for move in moves]
+
+    if pool is not None:
+        counts = pool.map(__perft_root_move__, jobs)
+    else:
+        counts = [__perft_root_move__(job) for job in jobs]
+
+    return dict(zip(moves, counts))
+
+
+def __perft_root_move__(job):
+    """ Module level so that it can be sent to worker processes """
+    board_type, move, depth = job
+    board = board_type()
+    board.make_move(move, BLACK)
+    return perft(board, board.other_color(BLACK), depth - 1)
+
+
+def run_perft(max_depth, board_type=OthelloBoard, processes=1, silent=False):
+    """
+    Runs perft for every depth up to :param max_depth and validates the results against REFERENCE_COUNTS.
+
+    :param max_depth: The deepest depth to run
+    :param board_type: The board implementation to validate
+    :param processes: Number of worker processes the root moves are split across. 1 runs everything in this process
+    :param silent: Flag controlling if output is written to console
+    :return: A list of tuples (depth, nodes, nodes per second)
+    :raises BoardException: if a count differs from its reference value
+    """
+    pool = Pool(processes, initializer=__warm_up__, initargs=(board_type,)) if processes > 1 else None
+    __warm_up__(board_type)
+
+    try:
+        results = []
+        for depth in range(1, max_depth + 1):
+            start = datetime.now()
+            nodes = sum(divide(depth, board_type, pool).values())
+            seconds = max((datetime.now() - start).total_seconds(), 1e-6)
+            results.append((depth, nodes, nodes / seconds))
+
+            if not silent:
+                print("%s depth %s: %s nodes, %.0f nodes/sec" % (board_type.__name__, depth, nodes, nodes / seconds))
+
+            if depth in REFERENCE_COUNTS and nodes != REFERENCE_COUNTS[depth]:
+                raise BoardException("%s perft(%s) = %s, expected %s" % (board_type.__name__, depth, nodes, REFERENCE_COUNTS[depth]))
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+    return results
+
+
+def __warm_up__(board_type):
+    """ Triggers numba compilation so that it is not included in the measured times """
+    perft(board_type(), BLACK, 3)
+
+
+if __name__ == '__main__':
+
+    START_TIME = datetime.now()
+
+    MAX_DEPTH = 8
+    PROCESSES = 4
+
+    for BOARD_TYPE in OthelloBoard, OthelloBitBoard:
+        run_perft(MAX_DEPTH, board_type=BOARD_TYPE, processes=PROCESSES)
+
+    print("\n| Perft completed, took %s |" % config.time_diff(START_TIME))
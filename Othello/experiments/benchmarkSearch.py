@@ -0,0 +1,92 @@
+import random
+from datetime import datetime
+from time import perf_counter
+
+import Othello.config as conf
+from Othello.experiments.othelloBaseExperiment import OthelloBaseExperiment
+from Othello.environment.board import OthelloBoard
+from Othello.players.basePlayers import ExperiencedPlayer
+from Othello.players.heuristics import OthelloHeuristic
+from Othello.players.search_based_ai import GameArtificialIntelligence
+from search_based_ai import ALPHA_BETA, PRINCIPAL_VARIATION
+from move_ordering import MoveOrdering
+
+
+class BenchmarkSearch(OthelloBaseExperiment):
+    """
+    Compares the visited nodes and the time it takes to complete each depth of the iterative deepening between search configurations.
+
+    All configurations search the same positions, reached by seeded random play, and must agree on the score of every position.
+    """
+    config = conf
+
+    def __init__(self, positions, seed=0):
+        super(BenchmarkSearch, self).__init__()
+        self.positions = generate_positions(positions, seed)
+
+    def reset(self):
+        return self
+
+    def run(self, configurations, max_depth, silent=False):
+        """
+        :param configurations: A list of tuples (name, strategy, kwargs for GameArtificialIntelligence)
+        :param max_depth: The deepest iteration
+        :return: a dict {name: list of tuples (depth, visited nodes, seconds) summed over all positions}
+        """
+        results, scores = {}, {}
+        for name, strategy, kwargs in configurations:
+            totals = [[depth, 0, 0] for depth in range(1, max_depth + 1)]
+            for index, (board, color) in enumerate(self.positions):
+                ai = GameArtificialIntelligence(OthelloHeuristic(strategy).evaluate,
+                                                move_ordering=MoveOrdering(square_priorities=ExperiencedPlayer.heuristic_table), **kwargs)
+                for total in totals:
+                    random.seed(index)  # Same random root order for all configurations
+                    ai.reset_statistics()
+                    start = perf_counter()
+                    ai.move_search(board.copy(), total[0], color, board.other_color(color), time_limit=float("inf"))
+                    total[1] += ai.visited_nodes
+                    total[2] += perf_counter() - start
+                    if scores.setdefault((strategy, index, total[0]), ai.best_score) != ai.best_score:
+                        raise AssertionError("%s disagrees on the score of position %s at depth %s" % (name, index, total[0]))
+
+            results[name] = [tuple(total) for total in totals]
+            if not silent:
+                print("\n%s" % name)
+                for depth, nodes, seconds in results[name]:
+                    print("depth %s: %9s nodes %7.2fs" % (depth, nodes, seconds))
+        return results
+
+
+def generate_positions(count, seed):
+    """ :return: a list of :param count tuples (board, color to move) from random games of 8 to 40 moves """
+    generator = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board, color = OthelloBoard(), conf.BLACK
+        for move in range(generator.randint(8, 40)):
+            valid_moves = sorted(board.get_valid_moves(color))
+            if not valid_moves:
+                break
+            board.apply_move(generator.choice(valid_moves), color)
+            color = board.other_color(color)
+        if board.game_won() is None and board.get_valid_moves(color):
+            positions.append((board, color))
+    return positions
+
+
+if __name__ == '__main__':
+
+    START_TIME = datetime.now()
+
+    POSITIONS = 10
+    MAX_DEPTH = 5
+    CONFIGURATIONS = []
+    for NAME, STRATEGY, WINDOW in ("RGRUENER", OthelloHeuristic.RGRUENER_STRATEGY, 1000), ("MASUS", OthelloHeuristic.MASUS_STRATEGY, 5):
+        CONFIGURATIONS += [("%s alpha-beta" % NAME, STRATEGY, {"search": ALPHA_BETA}),
+                           ("%s PVS" % NAME, STRATEGY, {"search": PRINCIPAL_VARIATION}),
+                           ("%s PVS aspiration %s" % (NAME, WINDOW), STRATEGY, {"search": PRINCIPAL_VARIATION, "aspiration_window": WINDOW})]
+
+    experiment = BenchmarkSearch(positions=POSITIONS)
+    experiment.run(configurations=CONFIGURATIONS, max_depth=MAX_DEPTH)
+
+    print("\n| Benchmark completed, took %s |" % conf.time_diff(START_TIME))
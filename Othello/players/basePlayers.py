@@ -1,10 +1,13 @@
 import numpy as np
 from random import choice, random
+from time import perf_counter
 
 import Othello.config as config
 from abstractClasses import Player, PlayerException
 from Othello.players.heuristics import OthelloHeuristic
 from Othello.players.search_based_ai import GameArtificialIntelligence
+from Othello.players.endgame import EndgameSolver
+from move_ordering import MoveOrdering
 
 
 class HumanPlayer(Player):
@@ -48,7 +51,9 @@ class NovicePlayer(Player):
         for move in board.get_valid_moves(self.color):
             afterstate = board.copy().apply_move(move, self.color)
             if afterstate.game_won() == self.color:
+                afterstate.release()
                 return move
+            afterstate.release()
 
         try:
             return choice(list(board.get_valid_moves(self.color)))
@@ -77,9 +82,11 @@ class ExperiencedPlayer(Player):
         for move in valid_moves:
             afterstate = board.copy().apply_move(move, self.color)
             if afterstate.game_won() == self.color:
+                afterstate.release()
                 return move
 
             attacks.append((self.evaluate_heuristic_table(afterstate), move))
+            afterstate.release()
 
         try:
             return max(attacks)[1]
@@ -110,14 +117,53 @@ class SearchPlayer(Player):
     PURE_MOBILITY_STRATEGY = OthelloHeuristic.PURE_MOBILITY_STRATEGY
     GREEDY_STRATEGY = OthelloHeuristic.GREEDY_STRATEGY
 
-    def __init__(self, search_depth=3, strategy=OthelloHeuristic.RGRUENER_STRATEGY):
+    def __init__(self, search_depth=None, strategy=OthelloHeuristic.RGRUENER_STRATEGY, time_per_move=None, time_per_game=None, endgame_empties=None):
+        """
+        :param search_depth: The depth to search to. With a time budget, the maximum depth of the iterative deepening.
+                             Defaults to 3 without and to the end of the game with a time budget
+        :param time_per_move: Seconds per move, None for no limit
+        :param time_per_game: Seconds per game, spread evenly over the remaining own moves. None for no limit
+        :param endgame_empties: Positions with at most this many empty squares are solved exactly by an EndgameSolver, which plays perfectly
+                                from there on. Around 14 to 20, solving takes milliseconds at 14 and up to a minute at 20. None to always search
+        """
         super(SearchPlayer, self).__init__()
-        self.search_depth = search_depth
-        self.ai = GameArtificialIntelligence(OthelloHeuristic(strategy).evaluate)
+        timed = time_per_move is not None or time_per_game is not None
+        self.search_depth = search_depth if search_depth is not None else (config.BOARD_SIZE**2 if timed else 3)
+        self.time_per_move = time_per_move
+        self.time_per_game = time_per_game
+        self.time_left = time_per_game
+        self.endgame_empties = endgame_empties
+        self.endgame_solver = EndgameSolver() if endgame_empties is not None else None
+        self.ai = GameArtificialIntelligence(OthelloHeuristic(strategy).evaluate, move_ordering=MoveOrdering(square_priorities=ExperiencedPlayer.heuristic_table),
+                                             win_score=OthelloHeuristic.WIN // 2)  # Won games score WIN plus the disc difference
 
     def get_move(self, board):
         assert self.color
-        return self.ai.move_search(board, self.search_depth, self.color, board.other_color(self.color))
+        start = perf_counter()
+        if self.endgame_solver is not None and board.get_empty_spaces() <= self.endgame_empties:
+            move = self.endgame_solver.solve(board, self.color)[1]
+        else:
+            move = self.ai.move_search(board, self.search_depth, self.color, board.other_color(self.color), self.__time_limit__(board))
+        if self.time_left is not None:
+            self.time_left -= perf_counter() - start
+        return move
+
+    def register_winner(self, winner_color):
+        self.time_left = self.time_per_game  # The next game starts with the full budget
+        return super(SearchPlayer, self).register_winner(winner_color)
+
+    def __time_limit__(self, board):
+        """ Seconds available for the next move: time_per_move, capped by an even share of the game budget over the own moves still to come """
+        limits = [] if self.time_per_move is None else [self.time_per_move]
+        if self.time_left is not None:
+            own_moves_left = max((board.board_size**2 - sum(board.count_stones())) // 2, 1)
+            limits.append(max(self.time_left, 0) / own_moves_left)
+        return min(limits) if limits else None
 
     def __str__(self):
-        return "[%s search depth %s]" % (self.__class__.__name__, self.search_depth)
+        if self.time_per_move is not None or self.time_per_game is not None:
+            return "[%s time per move %s per game %s%s]" % (self.__class__.__name__, self.time_per_move, self.time_per_game, self.__endgame_str__())
+        return "[%s search depth %s%s]" % (self.__class__.__name__, self.search_depth, self.__endgame_str__())
+
+    def __endgame_str__(self):
+        return "" if self.endgame_empties is None else " solving %s empties" % self.endgame_empties
@@ -0,0 +1,191 @@
+import numpy as np
+from numba import njit
+
+from Othello.config import BLACK, WHITE
+from Othello.environment.bitboard import SQUARE_BITS, ZERO, __get_moves__, __get_flips__, __popcount__, __to_indices__
+
+MAX_SCORE = 64
+
+# Below this many empties moves are ordered by parity only, above by fastest first with parity breaking ties
+FASTEST_FIRST_EMPTIES = 6
+# Positions with fewer empties are cheaper to solve than to look up
+TABLE_MIN_EMPTIES = 6
+
+# The four 4x4 quadrants, parity ordering prefers moves into quadrants with an odd number of empties
+QUADRANTS = np.array([0x0F0F0F0F, 0xF0F0F0F0, 0x0F0F0F0F << 32, 0xF0F0F0F0 << 32], dtype=np.uint64)
+
+HASH_FACTORS = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F], dtype=np.uint64)
+BYTE = np.uint64(0xFF)
+
+
+class EndgameSolver:
+    """
+    Solves Othello positions exactly by searching to the end of the game.
+
+    Scores are final disc differences from the perspective of the color to move. solve searches with principal variation search
+    in numba, ordering moves fastest first (fewest opponent replies) and by region parity. solve_wld only decides win, draw or loss,
+    which needs null windows around 0 only and is considerably cheaper.
+
+    Solved bounds are kept in a small hash table of (player mask, opponent mask) -> (lower bound, upper bound, best move),
+    which persists between calls until clear is called.
+    """
+    def __init__(self, table_size=2**16):
+        """
+        :param table_size: The number of slots of the hash table, rounded up to the next power of two
+        """
+        bits = max(table_size - 1, 1).bit_length()
+        self.table = np.zeros((1 << bits, 3), dtype=np.uint64)
+        self.shift = np.uint64(64 - bits)
+        self.statistics = np.zeros(3, dtype=np.int64)  # Visited nodes, table hits, cutoffs
+
+    def clear(self):
+        """ Removes all entries and resets the statistics """
+        self.table[:] = 0
+        self.statistics[:] = 0
+
+    def solve(self, board, color, alpha=-MAX_SCORE, beta=MAX_SCORE):
+        """
+        :param board: An OthelloBoard or OthelloBitBoard
+        :param color: The color to move
+        :param alpha: Lower end of the window, scores outside of (alpha, beta) are only bounds
+        :param beta: Upper end of the window
+        :return: a tuple (final disc difference for :param color under perfect play, best move). The move is None if :param color has to pass
+        """
+        player, opponent = __masks__(board, color)
+        score, position = __solve_root__(player, opponent, alpha, beta, self.table, self.shift, self.statistics)
+        return score, (None if position < 0 else (position >> 3, position & 7))
+
+    def solve_wld(self, board, color):
+        """
+        :return: a tuple (1 for a win, 0 for a draw, -1 for a loss of :param color under perfect play, a move achieving it)
+        """
+        score, move = self.solve(board, color, -1, 1)
+        return int(np.sign(score)), move
+
+
+def __masks__(board, color):
+    """ :return: a tuple of np.uint64 masks (stones of :param color, stones of the other color) """
+    flat = board.board.flatten()
+    black = np.uint64(np.bitwise_or.reduce(SQUARE_BITS[flat == BLACK]))
+    white = np.uint64(np.bitwise_or.reduce(SQUARE_BITS[flat == WHITE]))
+    return (black, white) if color == BLACK else (white, black)
+
+
+"""   ---  Numba implementations  ---   '''
+Masks are np.uint64 as in Othello.environment.bitboard. Positions are square indices i * 8 + j, -1 for no move.
+Inside numba __popcount__ returns uint64, which must be cast before it meets signed scores or it silently promotes them to float64.
+Table rows hold the player mask, the opponent mask and (lower + 64) | (upper + 64) << 8 | (move + 1) << 16.
+"""
+
+
+@njit
+def __solve_root__(player, opponent, alpha, beta, table, shift, statistics):
+    moves = __get_moves__(player, opponent)
+    if not moves:
+        return __search__(player, opponent, alpha, beta, table, shift, statistics), -1
+
+    best, best_position = -MAX_SCORE - 1, -1
+    positions = __ordered_moves__(player, opponent, moves, __table_move__(player, opponent, table, shift))
+    for k in range(len(positions)):
+        score = __child_score__(player, opponent, positions[k], alpha, beta, k == 0, table, shift, statistics)
+        if score > best:
+            best, best_position = score, positions[k]
+        if score > alpha:
+            alpha = score
+        if alpha >= beta:
+            break
+    return best, best_position
+
+
+@njit
+def __search__(player, opponent, alpha, beta, table, shift, statistics):
+    """ Fail-soft principal variation search, :return: the final disc difference from the perspective of :param player or a bound of it """
+    statistics[0] += 1
+    moves = __get_moves__(player, opponent)
+    if not moves:
+        if not __get_moves__(opponent, player):
+            return np.int64(__popcount__(player)) - np.int64(__popcount__(opponent))
+        return -__search__(opponent, player, -beta, -alpha, table, shift, statistics)
+
+    empties = 64 - np.int64(__popcount__(player | opponent))
+    index, table_move = -1, -1
+    if empties >= TABLE_MIN_EMPTIES:
+        index = __table_index__(player, opponent, shift)
+        if table[index, 0] == player and table[index, 1] == opponent:
+            statistics[1] += 1
+            entry = table[index, 2]
+            lower, upper, table_move = np.int64(entry & BYTE) - MAX_SCORE, np.int64((entry >> np.uint64(8)) & BYTE) - MAX_SCORE, np.int64(entry >> np.uint64(16)) - 1
+            if lower >= beta or lower == upper:
+                return lower
+            if upper <= alpha:
+                return upper
+            alpha, beta = max(alpha, lower), min(beta, upper)
+
+    window_alpha, window_beta = alpha, beta
+    best, best_position = -MAX_SCORE - 1, -1
+    positions = __ordered_moves__(player, opponent, moves, table_move)
+    for k in range(len(positions)):
+        score = __child_score__(player, opponent, positions[k], alpha, beta, k == 0, table, shift, statistics)
+        if score > best:
+            best, best_position = score, positions[k]
+        if score > alpha:
+            alpha = score
+        if alpha >= beta:
+            statistics[2] += 1
+            break
+
+    if index >= 0:
+        lower = best if best > window_alpha else -MAX_SCORE
+        upper = best if best < window_beta else MAX_SCORE
+        table[index, 0], table[index, 1] = player, opponent
+        table[index, 2] = np.uint64(lower + MAX_SCORE) | (np.uint64(upper + MAX_SCORE) << np.uint64(8)) | (np.uint64(best_position + 1) << np.uint64(16))
+    return best
+
+
+@njit
+def __child_score__(player, opponent, position, alpha, beta, first, table, shift, statistics):
+    """ Plays :param position and searches the reply, all moves but the first only with a null window unless they beat :param alpha """
+    flips = __get_flips__(player, opponent, position)
+    new_player, new_opponent = player | flips | SQUARE_BITS[position], opponent & ~flips
+    if not first:
+        score = -__search__(new_opponent, new_player, -alpha - 1, -alpha, table, shift, statistics)
+        if not alpha < score < beta:
+            return score
+    return -__search__(new_opponent, new_player, -beta, -alpha, table, shift, statistics)
+
+
+@njit
+def __ordered_moves__(player, opponent, moves, table_move):
+    """ :return: the positions of :param moves, table move first, then fastest first and odd quadrants first """
+    positions = __to_indices__(moves)
+    empty = ~(player | opponent)
+    odd = ZERO
+    for quadrant in QUADRANTS:
+        if __popcount__(empty & quadrant) & 1:
+            odd |= quadrant
+    fastest_first = __popcount__(empty) > FASTEST_FIRST_EMPTIES
+
+    keys = np.empty(len(positions), dtype=np.int64)
+    for k in range(len(positions)):
+        position = positions[k]
+        keys[k] = 0 if odd & SQUARE_BITS[position] else 1
+        if position == table_move:
+            keys[k] = -1
+        elif fastest_first:
+            flips = __get_flips__(player, opponent, position)
+            replies = __get_moves__(opponent & ~flips, player | flips | SQUARE_BITS[position])
+            keys[k] += 2 * np.int64(__popcount__(replies))
+    return positions[np.argsort(keys, kind="mergesort")]
+
+
+@njit
+def __table_index__(player, opponent, shift):
+    return np.int64((player * HASH_FACTORS[0] ^ opponent * HASH_FACTORS[1]) >> shift)
+
+
+@njit
+def __table_move__(player, opponent, table, shift):
+    index = __table_index__(player, opponent, shift)
+    if table[index, 0] == player and table[index, 1] == opponent:
+        return np.int64(table[index, 2] >> np.uint64(16)) - 1
+    return -1
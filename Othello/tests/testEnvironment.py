@@ -5,9 +5,16 @@ import os
 from datetime import datetime
 
 import Othello.config as config
-from Othello.environment.board import OthelloBoard
+from Othello.environment.board import OthelloBoard, RAYS, RAY_LENGTHS
+from Othello.environment.bitboard import OthelloBitBoard
+from Othello.environment.batch import BatchOthello
 from Othello.environment.game import Othello
+from Othello.environment.perft import run_perft, divide, REFERENCE_COUNTS
+from abstractClasses import BoardException, BoardArena
 from Othello.players.basePlayers import RandomPlayer, DeterministicPlayer, NovicePlayer, ExperiencedPlayer, ExpertPlayer, SearchPlayer
+from Othello.players.endgame import EndgameSolver
+from Othello.players.acPlayer import FCACPlayer
+from mcts import MCTSPlayer
 from Othello.experiments.othelloBaseExperiment import OthelloBaseExperiment
 from Othello.environment.evaluation import evaluate_against_base_players
 from plotting import Plotter
@@ -80,6 +87,233 @@ class TestEnvironment(unittest.TestCase):
         board.apply_move((1, 1), config.BLACK)
         self.assertEqual(board.illegal_move, config.BLACK)
 
+    def test_Board_IncrementalLegalMoves(self):
+        for i in range(self.TEST_EPISODES):
+            board, color = OthelloBoard(), config.BLACK
+            while board.game_won() is None:
+                scanned = board.copy()
+                scanned.legal_moves = {}  # Forces a full scan
+                for c in config.BLACK, config.WHITE:
+                    self.assertEqual(board.get_valid_moves(c), scanned.get_valid_moves(c), msg="Incremental legal moves differ from full scan")
+                self.assertEqual(board.frontier, scanned.frontier)
+
+                if board.get_valid_moves(color):
+                    board.apply_move(random.choice(list(board.get_valid_moves(color))), color)
+                color = board.other_color(color)
+
+    def test_Board_IncrementalStats(self):
+        for i in range(self.TEST_EPISODES):
+            board, color = OthelloBoard(), config.BLACK
+            while True:
+                scanned = board.copy()
+                scanned.legal_moves = {}  # Forces a full scan
+                self.assertEqual(board.stones, scanned.stones)
+                self.assertEqual(board.frontier_discs, scanned.frontier_discs)
+                self.assertEqual(board.passes, scanned.passes)
+                self.assertEqual(board.empty_spaces, 64 - sum(board.stones))
+                if board.game_won() is not None:
+                    break
+
+                if board.get_valid_moves(color):
+                    board.apply_move(random.choice(list(board.get_valid_moves(color))), color)
+                color = board.other_color(color)
+
+            self.assertEqual(board.passes, 2)
+            self.assertEqual(board.stones, (int((board.board == config.BLACK).sum()), int((board.board == config.WHITE).sum())))
+
+    def test_Board_Rays(self):
+        # Direction 4 is (0, 1), direction 7 is (1, 1)
+        self.assertEqual(list(RAYS[0, 4, :RAY_LENGTHS[0, 4]]), [1, 2, 3, 4, 5, 6, 7])
+        self.assertEqual(list(RAYS[0, 7, :RAY_LENGTHS[0, 7]]), [9, 18, 27, 36, 45, 54, 63])
+        self.assertEqual(RAY_LENGTHS[0, 0], 0)
+        self.assertEqual(list(RAYS[63, 0, :RAY_LENGTHS[63, 0]]), [54, 45, 36, 27, 18, 9, 0])
+        self.assertTrue((RAYS[0, 4, RAY_LENGTHS[0, 4]:] == -1).all())
+
+    def test_Board_ZobristKey(self):
+        board, transposition = OthelloBoard(), OthelloBoard()
+        for move, color in ((2, 3), config.BLACK), ((2, 2), config.WHITE), ((3, 2), config.BLACK):
+            board.apply_move(move, color)
+        for move, color in ((3, 2), config.BLACK), ((2, 2), config.WHITE), ((2, 3), config.BLACK):
+            transposition.apply_move(move, color)
+
+        self.assertTrue((board.board == transposition.board).all())
+        self.assertEqual(board.key, transposition.key, msg="Transpositions must have the same key")
+        self.assertEqual(board, transposition)
+        self.assertEqual(len({board, transposition, board.copy()}), 1)
+        self.assertNotEqual(board.key, OthelloBoard().key)
+
+        bitboard = OthelloBitBoard()
+        for move, color in ((2, 3), config.BLACK), ((2, 2), config.WHITE), ((3, 2), config.BLACK):
+            bitboard.apply_move(move, color)
+        self.assertEqual(board.key, bitboard.key)
+
+    def test_Board_MakeUnmakeMove(self):
+        for board_type in OthelloBoard, OthelloBitBoard:
+            board, reference, color = board_type(), board_type(), config.BLACK
+            history = []
+            while board.game_won() is None:
+                if board.get_valid_moves(color):
+                    move = random.choice(list(board.get_valid_moves(color)))
+                    history.append((board.copy(), board.get_valid_moves(config.BLACK), board.get_valid_moves(config.WHITE)))
+
+                    board.make_move(move, color)
+                    reference.apply_move(move, color)
+                    self.assertTrue((board.board == reference.board).all())
+                    self.assertEqual(board.key, reference.key)
+                    self.assertEqual(board.get_valid_moves(color), reference.get_valid_moves(color))
+                color = board.other_color(color)
+
+            self.assertRaises(BoardException, OthelloBoard().make_move, (0, 0), config.BLACK)
+
+            while history:
+                previous, black_moves, white_moves = history.pop()
+                board.unmake_move()
+                self.assertTrue((board.board == previous.board).all(), msg="unmake_move did not restore the board")
+                self.assertEqual(board.key, previous.key)
+                self.assertEqual(board.get_valid_moves(config.BLACK), black_moves)
+                self.assertEqual(board.get_valid_moves(config.WHITE), white_moves)
+            self.assertEqual(board.undo_stack, [])
+
+    def test_SearchPlayer_LeavesBoardUnchanged(self):
+        player = SearchPlayer(search_depth=3)
+        player.color = config.BLACK
+        board = OthelloBoard()
+        board.apply_move((2, 3), config.BLACK)
+        board.apply_move((2, 2), config.WHITE)
+        original = board.copy()
+
+        move = player.get_move(board)
+        self.assertIn(move, original.get_valid_moves(config.BLACK))
+        self.assertTrue((board.board == original.board).all())
+        self.assertEqual(board.key, original.key)
+        self.assertEqual(board.get_valid_moves(config.BLACK), original.get_valid_moves(config.BLACK))
+
+    def test_SearchPlayer_TimeBudget(self):
+        player = SearchPlayer(time_per_move=0.2)
+        self.assertEqual(player.search_depth, 64)
+        player.color = config.BLACK
+        board = OthelloBoard()
+        board.apply_move((2, 3), config.BLACK)
+        board.apply_move((2, 2), config.WHITE)
+        SearchPlayer(search_depth=1).ai.move_search(board, 1, config.BLACK, config.WHITE)  # Numba compilation is not part of the budget
+
+        start = datetime.now()
+        move = player.get_move(board)
+        self.assertLess((datetime.now() - start).total_seconds(), 1)
+        self.assertIn(move, board.get_valid_moves(config.BLACK))
+        self.assertEqual(move, player.ai.best_move)
+        self.assertGreaterEqual(player.ai.completed_depth, 2, msg="Iterative deepening did not complete shallow iterations")
+        self.assertLess(player.ai.completed_depth, 64)
+
+        # A fixed depth searched iteratively finds the same score as a single search
+        deepened = SearchPlayer(search_depth=3).ai
+        deepened.move_search(board, 3, config.BLACK, config.WHITE, time_limit=60)
+        single = SearchPlayer(search_depth=3).ai
+        single.move_search(board, 3, config.BLACK, config.WHITE)
+        self.assertEqual((deepened.completed_depth, deepened.best_score), (3, single.best_score))
+
+        player = SearchPlayer(time_per_game=1)
+        simulation = Othello([player, RandomPlayer()])
+        start = datetime.now()
+        simulation.run_simulations(2)
+        self.assertLess((datetime.now() - start).total_seconds(), 4)
+        self.assertEqual(player.time_left, 1, msg="Game budget not reset after the game")
+
+    def test_EndgameSolver(self):
+        def minimax(board, color):
+            if not board.get_valid_moves(color):
+                if not board.get_valid_moves(board.other_color(color)):
+                    stones = board.count_stones()
+                    return (stones[0] - stones[1]) * (1 if color == config.BLACK else -1)
+                return -minimax(board, board.other_color(color))
+            scores = []
+            for move in list(board.get_valid_moves(color)):
+                board.make_move(move, color)
+                scores.append(-minimax(board, board.other_color(color)))
+                board.unmake_move()
+            return max(scores)
+
+        solver = EndgameSolver(table_size=2**10)
+        for i in range(10):
+            board, color = OthelloBoard(), config.BLACK
+            while board.get_empty_spaces() > 7 or not board.get_valid_moves(color):
+                if board.game_won() is not None:
+                    board, color = OthelloBoard(), config.BLACK
+                if board.get_valid_moves(color):
+                    board.apply_move(random.choice(sorted(board.get_valid_moves(color))), color)
+                color = board.other_color(color)
+
+            score, move = solver.solve(board, color)
+            self.assertEqual(score, minimax(board, color))
+            self.assertEqual(solver.solve_wld(board, color)[0], np.sign(score))
+            board.apply_move(move, color)
+            self.assertEqual(-minimax(board, board.other_color(color)), score, msg="Solved move does not achieve the solved score")
+
+        player = SearchPlayer(search_depth=1, endgame_empties=10)
+        simulation = Othello([player, RandomPlayer()])
+        simulation.run_simulations(2)
+
+    def test_MCTSPlayer(self):
+        board, color = OthelloBoard(), config.BLACK
+        while sum(board.count_stones()) < 14 or not board.get_valid_moves(color):
+            if board.get_valid_moves(color):
+                board.apply_move(random.choice(sorted(board.get_valid_moves(color))), color)
+            color = board.other_color(color)
+        original = board.copy()
+
+        for player in MCTSPlayer(FCACPlayer(lr=1e-5), simulations=200), MCTSPlayer(simulations=20):
+            player.color = color
+            self.assertIn(player.get_move(board), board.get_valid_moves(color))
+            self.assertEqual(sum(visits for move, visits in player.mcts.root_distribution()), player.simulations - 1)
+            self.assertTrue((board.board == original.board).all(), msg="Search changed the board")
+
+    def test_BoardArena(self):
+        arena = BoardArena(OthelloBoard, 4)
+        self.assertEqual(len(arena.boards), 0, msg="Boards allocated before they are needed")
+        board = arena.acquire()
+        self.assertEqual(board, OthelloBoard())
+        board.apply_move((2, 3), config.BLACK)
+
+        copy = board.copy()
+        self.assertIs(copy.arena, arena)
+        self.assertTrue((copy.board == board.board).all())
+        self.assertEqual(copy.get_valid_moves(config.WHITE), board.get_valid_moves(config.WHITE))
+        copy.apply_move((2, 2), config.WHITE)
+        self.assertEqual(board.board[2, 2], config.EMPTY, msg="Arena copies share storage")
+        self.assertEqual(len(arena), 2)
+
+        copy.release()
+        copy.release()
+        self.assertEqual(len(arena), 1)
+        self.assertIs(board.copy(), copy, msg="Released board was not reused")
+        self.assertEqual(len(arena.boards), 2)
+
+        boards = [board.copy() for i in range(3)]
+        self.assertEqual(arena.overflows, 1)
+        self.assertEqual(boards[-1].key, board.key)
+
+        arena.release_all()
+        self.assertEqual(len(arena), 0)
+
+        arena = BoardArena(OthelloBoard, 16)
+        board = arena.acquire().apply_move((2, 3), config.BLACK)
+        symmetric = board.rotate_and_flip()
+        self.assertTrue(all(transformed.arena_index is not None for transformed in symmetric))
+        self.assertFalse(any(np.shares_memory(a.board, b.board) for a in symmetric for b in symmetric if a is not b), msg="set_board replaced arena storage by a view")
+        for transformed in symmetric:
+            transformed.release()
+        canonical = board.canonical()[0]
+        self.assertTrue((canonical.board == board.canonical()[0].board).all())
+
+        simulation = Othello([ExperiencedPlayer(), NovicePlayer()], arena_capacity=16)
+        simulation.run_simulations(4)
+        self.assertEqual(simulation.arena.overflows, 0)
+        self.assertEqual(len(simulation.arena), 1, msg="Boards handed to players were not released")
+
+        simulation = Othello([ExperiencedPlayer(), NovicePlayer()])
+        simulation.run_simulations(2)
+        self.assertLess(len(simulation.arena.boards), 16, msg="The arena grew beyond the boards in use at a time")
+
     def test_Board_GameWon(self):
 
         # Case 1: Full board
@@ -144,6 +378,20 @@ class TestEnvironment(unittest.TestCase):
             rep = boards[i].get_representation(config.WHITE)
             self.assertTrue((rep == inverses[i].board).all(), msg="Inverting board failed")
 
+    def test_Board_RepresentationBuffer(self):
+        for board in OthelloBoard(), OthelloBitBoard():
+            board.apply_move((2, 3), config.BLACK)
+            out = np.empty((8, 8), dtype=np.int8)
+
+            self.assertIs(board.get_representation(config.WHITE, out=out), out)
+            self.assertTrue((out == -board.board).all())
+            self.assertIs(board.get_representation(config.BLACK, out=out), out)
+            self.assertTrue((out == board.board).all())
+
+            self.assertEqual(board.board.dtype, np.int8)
+            self.assertEqual(board.get_legal_moves_map(config.WHITE).dtype, np.bool_)
+            self.assertEqual(board.get_legal_moves_map(config.WHITE).sum(), 3)
+
     def test_Board_CountStones(self):
         board = OthelloBoard()
         self.assertEqual((2, 2), board.count_stones())
@@ -210,6 +458,118 @@ class TestEnvironment(unittest.TestCase):
         simulation.run_simulations(N)
         print("Simulating %s random games took %s" % (N, datetime.now()-start))
 
+    def test_BitBoard_MatchesArrayBoard(self):
+        for i in range(self.TEST_EPISODES):
+            board, bitboard = OthelloBoard(), OthelloBitBoard()
+            color = config.BLACK
+            while board.game_won() is None:
+                self.assertIsNone(bitboard.game_won())
+                self.assertEqual(board.get_valid_moves(color), bitboard.get_valid_moves(color), msg="Valid moves differ")
+                self.assertTrue((board.get_legal_moves_map(color) == bitboard.get_legal_moves_map(color)).all())
+                if board.get_valid_moves(color):
+                    move = random.choice(list(board.get_valid_moves(color)))
+                    board.apply_move(move, color)
+                    bitboard.apply_move(move, color)
+                    self.assertTrue((board.board == bitboard.board).all(), msg="Applying move %s resulted in different boards" % (move,))
+                    self.assertTrue((board.get_representation(config.WHITE) == bitboard.get_representation(config.WHITE)).all())
+                    self.assertEqual(board.count_stones(), bitboard.count_stones())
+                color = board.other_color(color)
+            self.assertEqual(board.game_won(), bitboard.game_won())
+
+        bitboard = OthelloBitBoard()
+        bitboard.apply_move((1, 1), config.BLACK)
+        self.assertEqual(bitboard.illegal_move, config.BLACK)
+
+    def test_BitBoard_Game(self):
+        simulation = Othello([ExperiencedPlayer(), RandomPlayer()], board_type=OthelloBitBoard)
+        results, losses = simulation.run_simulations(self.TEST_EPISODES)
+        self.assertTrue(None not in results)
+
+        game = Othello((DeterministicPlayer(), DeterministicPlayer()), board_type=OthelloBitBoard)
+        game.run_simulations(1)
+        self.assertEqual(game.board.game_won(), config.WHITE)
+
+    def test_BitBoard_Performance(self):
+        N = 200
+
+        def play_random_games(board_type, games):
+            moves = 0
+            for i in range(games):
+                board, color = board_type(), config.BLACK
+                while board.game_won() is None:
+                    valid_moves = board.get_valid_moves(color)
+                    if valid_moves:
+                        board.apply_move(random.choice(list(valid_moves)), color)
+                        moves += 1
+                    color = board.other_color(color)
+            return moves
+
+        for board_type in OthelloBoard, OthelloBitBoard:
+            play_random_games(board_type, 1)  # Trigger numba compilation outside of the measurement
+
+            start = datetime.now()
+            moves = play_random_games(board_type, N)
+            seconds = (datetime.now() - start).total_seconds()
+            print("%s: %s moves in %s random games took %ss -> %s moves/sec" % (board_type.__name__, moves, N, seconds, int(moves / seconds)))
+
+    def test_Perft(self):
+        for board_type in OthelloBoard, OthelloBitBoard:
+            results = run_perft(5, board_type=board_type, silent=True)
+            self.assertEqual([nodes for depth, nodes, nodes_per_second in results], [REFERENCE_COUNTS[depth] for depth in range(1, 6)])
+
+        self.assertEqual(sum(divide(4, OthelloBitBoard).values()), REFERENCE_COUNTS[4])
+        run_perft(5, board_type=OthelloBitBoard, processes=2, silent=True)
+
+    def test_BatchOthello(self):
+        B = 16
+        batch = BatchOthello(B)
+        boards = [OthelloBitBoard() for i in range(B)]
+        colors = [config.BLACK] * B
+        finished = 0
+
+        while finished < 2 * B:
+            legal_maps = batch.get_legal_moves_maps()
+            representations = batch.get_representations()
+            moves = np.zeros(B, dtype=np.int64)
+            for b in range(B):
+                # Apply passes to the reference board the way Othello.__run__ does
+                if not boards[b].get_valid_moves(colors[b]):
+                    colors[b] = boards[b].other_color(colors[b])
+                self.assertEqual(batch.to_move[b], colors[b])
+                self.assertTrue((legal_maps[b] == boards[b].get_legal_moves_map(colors[b])).all(), msg="Legal moves differ in game %s" % b)
+                self.assertTrue((representations[b] == boards[b].get_representation(colors[b])).all(), msg="Representation differs in game %s" % b)
+                moves[b] = random.choice(np.flatnonzero(legal_maps[b]))
+
+            done, winners = batch.step(moves, reset_done=True)
+            for b in range(B):
+                boards[b].apply_move((moves[b] // 8, moves[b] % 8), colors[b])
+                colors[b] = boards[b].other_color(colors[b])
+                if done[b]:
+                    self.assertEqual(winners[b], boards[b].game_won())
+                    boards[b], colors[b] = OthelloBitBoard(), config.BLACK
+                    finished += 1
+                else:
+                    self.assertIsNone(boards[b].game_won())
+
+        self.assertTrue((batch.to_move == config.BLACK).any())
+        self.assertRaises(BoardException, batch.step, np.zeros(B, dtype=np.int64))
+
+        # Games of a lockstep batch mostly finish together, play some moves so that the boards differ from the start position
+        for step in range(6):
+            batch.step(np.array([random.choice(np.flatnonzero(legal_map)) for legal_map in batch.get_legal_moves_maps()]))
+        representations = batch.get_representations()
+        keys = set()
+        for b in range(B):
+            board = batch.get_board(b)
+            self.assertTrue((board.board * batch.to_move[b] == representations[b]).all(), msg="Board of game %s differs" % b)
+            reference = OthelloBitBoard()
+            reference.to_move = board.to_move
+            self.assertEqual(board.key, reference.set_board(board.board.copy()).key)
+            keys.add(board.key)
+        positions = {(int(batch.black[b]), int(batch.white[b]), int(batch.to_move[b])) for b in range(B)}
+        self.assertGreater(len(positions), 1)
+        self.assertEqual(len(keys), len(positions), msg="Keys of different games are equal")
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,120 @@
+import numpy as np
+
+import TicTacToe.config as config
+from abstractClasses import BoardException
+from TicTacToe.config import BLACK, WHITE, EMPTY
+from TicTacToe.environment.board import TicTacToeBoard
+from TicTacToe.environment.stateTable import POWERS, WIN_LINES
+
+WIN_LINE_INDICES = np.array(WIN_LINES)
+
+
+class BatchTicTacToe:
+    """
+    Holds a batch of 3x3 TicTacToe games as a (batch_size, 9) int8 array and advances all of them in lockstep.
+
+    Every query and update is a vectorized numpy operation over the whole batch. Tiles are addressed by flat index i * 3 + j.
+    """
+    def __init__(self, batch_size, seed=None):
+        if config.BOARD_SIZE != 3:
+            raise BoardException("BatchTicTacToe only supports board size 3, got %s" % config.BOARD_SIZE)
+
+        self.batch_size = batch_size
+        self.board_size = config.BOARD_SIZE
+
+        self.boards = np.empty((batch_size, self.board_size**2), dtype=np.int8)
+        self.to_move = np.empty(batch_size, dtype=np.int8)
+        self.done = np.empty(batch_size, dtype=np.bool_)
+        self.winners = np.empty(batch_size, dtype=np.int8)
+        self.random_state = np.random.RandomState(seed)
+        self.reset()
+
+    def reset(self, indices=None, to_move=BLACK):
+        """
+        Resets the games at :param indices to the empty board. Resets all games if :param indices is None.
+
+        :param indices: An index array or boolean mask selecting the games to reset
+        :param to_move: The color making the first move
+        :return: self
+        """
+        if indices is None:
+            indices = slice(None)
+        self.boards[indices] = EMPTY
+        self.to_move[indices] = to_move
+        self.done[indices] = False
+        self.winners[indices] = EMPTY
+        return self
+
+    def get_legal_moves_masks(self):
+        """ Returns a (batch_size, 9) boolean array which is True on every empty tile of unfinished games """
+        return (self.boards == EMPTY) & ~self.done[:, None]
+
+    def get_legal_moves_maps(self):
+        """ Returns a (batch_size, board_size, board_size) boolean array which is True on every legal move """
+        return self.get_legal_moves_masks().reshape(self.batch_size, self.board_size, self.board_size)
+
+    def get_representations(self, out=None):
+        """
+        Returns a (batch_size, board_size, board_size) int8 array of all boards in which the color to move is always BLACK
+
+        :param out: Optional buffer of that shape to write the representations into instead of allocating a new array
+        """
+        boards = self.boards.reshape(self.batch_size, self.board_size, self.board_size)
+        return np.multiply(boards, self.to_move[:, None, None], out=out)
+
+    def get_codes(self):
+        """ Returns the base-3 code of every board, see TicTacToe.environment.stateTable """
+        return (self.boards % 3).astype(np.int64) @ np.array(POWERS)
+
+    def sample_random_moves(self):
+        """ Returns the flat index of a uniformly chosen legal move for every game. Arbitrary for finished games """
+        return np.argmax(self.get_legal_moves_masks() * self.random_state.random_sample(self.boards.shape), axis=1)
+
+    def step(self, moves, reset_done=False):
+        """
+        Places a stone of the color to move in every unfinished game. Moves for finished games are ignored.
+
+        :param moves: (batch_size, 2) array of coordinates or (batch_size,) array of flat tile indices
+        :param reset_done: If set, games finishing in this step are reset right after their winner has been recorded
+        :return: a tuple (done, winners) of arrays for all games. winners holds the winning color of finished games, EMPTY for draws and unfinished games
+        :raises BoardException: if a move is illegal. No game is changed in that case
+        """
+        moves = np.asarray(moves, dtype=np.int64)
+        if moves.ndim == 2:
+            moves = moves[:, 0] * self.board_size + moves[:, 1]
+
+        games = np.flatnonzero(~self.done)
+        moves = moves[games]
+        illegal = (moves < 0) | (moves >= self.board_size**2)
+        illegal[~illegal] = self.boards[games[~illegal], moves[~illegal]] != EMPTY
+        if illegal.any():
+            game = games[np.argmax(illegal)]
+            raise BoardException("Illegal move %s for color %s in game %s" % (moves[np.argmax(illegal)], self.to_move[game], game))
+
+        colors = self.to_move[games]
+        self.boards[games, moves] = colors
+
+        # Only the color that just moved can have completed a line
+        boards = self.boards[games]
+        won = (boards[:, WIN_LINE_INDICES].sum(axis=2, dtype=np.int8) == 3 * colors[:, None]).any(axis=1)
+        finished = won | (boards != EMPTY).all(axis=1)
+
+        self.winners[games[won]] = colors[won]
+        self.done[games[finished]] = True
+        self.to_move[games] = -colors
+
+        done, winners = self.done.copy(), self.winners.copy()
+        if reset_done:
+            self.reset(done)
+        return done, winners
+
+    def count_stones(self):
+        """ returns a tuple of arrays (num_black_stones, num_white_stones) """
+        return (self.boards == BLACK).sum(axis=1), (self.boards == WHITE).sum(axis=1)
+
+    def get_board(self, index):
+        """ Returns the game at :param index as a single TicTacToeBoard """
+        board = TicTacToeBoard()
+        board.to_move = int(self.to_move[index])
+        return board.set_board(self.boards[index].reshape(self.board_size, self.board_size))
+
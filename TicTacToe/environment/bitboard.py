@@ -0,0 +1,204 @@
+import numpy as np
+
+import TicTacToe.config as config
+from abstractClasses import Board, BoardException, generate_zobrist_keys, zobrist_key
+from TicTacToe.config import BLACK, WHITE, EMPTY
+
+# Tables depend on the board dimensions and are built once per (rows, columns, win_length)
+TABLES = {}
+
+
+def get_tables(rows, columns, win_length):
+    """
+    Precomputes everything needed to play m,n,k games on a board of :param rows x :param columns with :param win_length in a row to win.
+
+    Tile (i, j) is represented by bit i * columns + j.
+
+    :return: a dict holding
+             'lines': for every tile, the masks of all win lines of length win_length containing it
+             'bits': the mask of every tile
+             'zobrist': tuple (tile_keys, side_key) as created by generate_zobrist_keys
+    """
+    if (rows, columns, win_length) not in TABLES:
+        lines = [[] for i in range(rows * columns)]
+        for i in range(rows):
+            for j in range(columns):
+                for di, dj in (1, 0), (0, 1), (1, 1), (1, -1):
+                    end_i, end_j = i + di * (win_length - 1), j + dj * (win_length - 1)
+                    if 0 <= end_i < rows and 0 <= end_j < columns:
+                        tiles = [(i + di * k) * columns + j + dj * k for k in range(win_length)]
+                        mask = sum(1 << tile for tile in tiles)
+                        for tile in tiles:
+                            lines[tile].append(mask)
+
+        tile_keys, side_key = generate_zobrist_keys(rows * columns)
+        TABLES[(rows, columns, win_length)] = {'lines': lines,
+                                               'bits': [1 << tile for tile in range(rows * columns)],
+                                               'zobrist': (tile_keys, int(side_key))}
+    return TABLES[(rows, columns, win_length)]
+
+
+class TicTacToeBitBoard(Board):
+    """
+    Represents a board of a generalized m,n,k game (k in a row on an m x n board) as two integer bitmasks, one per color.
+
+    The class is API compatible with TicTacToeBoard. Only the win lines through the last placed stone are checked for a win,
+    using precomputed line masks, which keeps large boards such as 8x8 affordable.
+    """
+    def __init__(self, board=None, rows=config.BOARD_SIZE, columns=config.BOARD_SIZE, win_length=config.WIN_LINE_LENGTH):
+        if board:
+            rows, columns, win_length = board.rows, board.columns, board.win_length
+        self.rows, self.columns, self.win_length = rows, columns, win_length
+        self.board_size = rows  # Players assume square boards
+        self.tables = get_tables(rows, columns, win_length)
+        self.full_mask = (1 << rows * columns) - 1
+
+        self.black = board.black if board else 0
+        self.white = board.white if board else 0
+        self.winner = board.winner if board else None  # Maintained incrementally, the color owning a complete line
+        self.illegal_move = None
+        self.__board__ = None
+
+        # The color that did not make the last move
+        self.to_move = board.to_move if board else BLACK
+        self.__key__ = board.__key__ if board else zobrist_key(self.board, self.to_move, *self.tables['zobrist'])
+
+        self.undo_stack = []
+
+    @property
+    def board(self):
+        """
+        The board as an array in the same format as TicTacToeBoard.board. The array is cached until the next move, writing to it does not change the position.
+        """
+        if self.__board__ is None:
+            board = np.zeros(self.rows * self.columns, dtype=np.int8)
+            bits = self.tables['bits']
+            for tile in range(self.rows * self.columns):
+                if self.black & bits[tile]:
+                    board[tile] = BLACK
+                elif self.white & bits[tile]:
+                    board[tile] = WHITE
+            self.__board__ = board.reshape(self.rows, self.columns)
+        return self.__board__
+
+    def get_valid_moves(self, color=None):
+        empty = ~(self.black | self.white) & self.full_mask
+        moves = []
+        while empty:
+            bit = empty & -empty
+            tile = bit.bit_length() - 1
+            moves.append((tile // self.columns, tile % self.columns))
+            empty ^= bit
+        return moves
+
+    def apply_move(self, move, color):
+        if color is None:
+            raise BoardException("Illegal color provided: %s" % color)
+
+        if self.__is_empty__(move):
+            self.__place__(move, color)
+        else:
+            print("!! Illegal move !!")
+            print("Player %s played move %s" % (color, move))
+            self.illegal_move = color
+        return self
+
+    def make_move(self, move, color):
+        if not self.__is_empty__(move):
+            raise BoardException("Illegal move %s for color %s" % (move, color))
+
+        self.undo_stack.append((self.black, self.white, self.winner, self.__key__, self.to_move))
+        self.__place__(move, color)
+
+    def unmake_move(self):
+        self.black, self.white, self.winner, self.__key__, self.to_move = self.undo_stack.pop()
+        self.__board__ = None
+
+    def __is_empty__(self, move):
+        if not (0 <= move[0] < self.rows and 0 <= move[1] < self.columns):
+            return False
+        return not (self.black | self.white) & self.tables['bits'][move[0] * self.columns + move[1]]
+
+    def __place__(self, move, color):
+        tile = int(move[0]) * self.columns + int(move[1])
+        if color == BLACK:
+            self.black |= self.tables['bits'][tile]
+            player = self.black
+        else:
+            self.white |= self.tables['bits'][tile]
+            player = self.white
+
+        if self.winner is None:
+            for line in self.tables['lines'][tile]:
+                if player & line == line:
+                    self.winner = color
+                    break
+
+        tile_keys, side_key = self.tables['zobrist']
+        self.__key__ ^= int(tile_keys[0 if color == BLACK else 1][tile])
+        if self.to_move == color:
+            self.__key__ ^= side_key
+            self.to_move = self.other_color(color)
+        self.__board__ = None
+
+    def set_board(self, board):
+        flat = board.flatten()
+        bits = self.tables['bits']
+        self.black = sum(bits[tile] for tile in np.flatnonzero(flat == BLACK))
+        self.white = sum(bits[tile] for tile in np.flatnonzero(flat == WHITE))
+        self.winner = None
+        for color, player in (BLACK, self.black), (WHITE, self.white):
+            if any(player & line == line for lines in self.tables['lines'] for line in lines):
+                self.winner = color
+                break
+        self.__board__ = None
+        self.__key__ = zobrist_key(self.board, self.to_move, *self.tables['zobrist'])
+        return self
+
+    def game_won(self):
+        if self.illegal_move is not None:
+            return self.other_color(self.illegal_move)
+
+        if self.winner is not None:
+            return self.winner
+        if (self.black | self.white) == self.full_mask:
+            return EMPTY
+        return None
+
+    def get_afterstates(self, color):
+        return [(self.copy().apply_move(move=move, color=color), move) for move in self.get_valid_moves(color)]
+
+    def in_bounds(self, position):
+        return 0 <= position[0] < self.rows and 0 <= position[1] < self.columns
+
+    def get_representation(self, color, out=None):
+        if color == BLACK:
+            if out is None:
+                return self.board.copy()
+            np.copyto(out, self.board)
+            return out
+
+        if color == WHITE:
+            return np.negative(self.board, out=out)
+        else:
+            raise BoardException("Illegal color provided: %s" % color)
+
+    def get_legal_moves_map(self, color):
+        return self.board == EMPTY
+
+    def copy(self):
+        if self.arena is not None:
+            return self.arena.acquire(self)
+        return TicTacToeBitBoard(self)
+
+    def copy_into(self, board):
+        board.black, board.white, board.winner = self.black, self.white, self.winner
+        board.illegal_move = None
+        board.__board__ = None
+        board.to_move, board.__key__ = self.to_move, self.__key__
+        board.undo_stack.clear()
+        return board
+
+    def count_stones(self):
+        """ returns a tuple (num_black_stones, num_white_stones)"""
+        return bin(self.black).count("1"), bin(self.white).count("1")
@@ -2,9 +2,14 @@ import numpy as np
 from numba import njit
 
 from copy import deepcopy
-from abstractClasses import Board, BoardException
+from abstractClasses import Board, BoardException, generate_zobrist_keys, zobrist_key
 import TicTacToe.config as config
 from TicTacToe.config import BLACK, WHITE, EMPTY
+from TicTacToe.environment.stateTable import STATE_TABLE, POWERS, DIGITS, encode, decode
+
+ZOBRIST_TABLE, ZOBRIST_SIDE = generate_zobrist_keys(config.BOARD_SIZE**2)
+ZOBRIST_KEYS = {BLACK: ZOBRIST_TABLE[0].tolist(), WHITE: ZOBRIST_TABLE[1].tolist()}
+ZOBRIST_SIDE = int(ZOBRIST_SIDE)
 
 
 class TicTacToeBoard(Board):
@@ -13,13 +18,21 @@ class TicTacToeBoard(Board):
     """
     def __init__(self, board=None):
         self.board_size = board.board_size if board else config.BOARD_SIZE
-        self.board = board.board.copy() if board else np.full((self.board_size, self.board_size), EMPTY, dtype=np.float64)
+        self.board = board.board.copy() if board else np.full((self.board_size, self.board_size), EMPTY, dtype=np.int8)
         self.illegal_move = None
 
-        # Vectorized element wise function
-        self.__get_representation__ = __generate_vectorized_get_representation__()
+        # The color that did not make the last move
+        self.to_move = board.to_move if board else BLACK
+        self.__key__ = board.__key__ if board else zobrist_key(self.board, self.to_move, ZOBRIST_TABLE, ZOBRIST_SIDE)
+
+        # Base-3 code of the position indexing the precomputed STATE_TABLE, None for boards without one
+        self.code = board.code if board else (encode(self.board) if STATE_TABLE is not None else None)
+
+        self.undo_stack = []
 
     def get_valid_moves(self, color=None):
+        if STATE_TABLE is not None:
+            return list(STATE_TABLE.valid_moves[self.code])
         return __get_valid_moves__(self.board, self.board_size)
 
     def apply_move(self, move, color):
@@ -27,22 +40,60 @@ class TicTacToeBoard(Board):
             raise BoardException("Illegal color provided: %s" % color)
 
         if move in self.get_valid_moves():
-            self.board[move[0]][move[1]] = color
+            self.__place__(move, color)
         else:
             print("!! Illegal move !!")
             print("Player %s played move %s" % (color, move))
             self.illegal_move = color
         return self
 
+    def make_move(self, move, color):
+        if self.board[move[0], move[1]] != EMPTY:
+            raise BoardException("Illegal move %s for color %s" % (move, color))
+
+        self.undo_stack.append((move, self.__key__, self.to_move))
+        self.__place__(move, color)
+
+    def unmake_move(self):
+        move, self.__key__, self.to_move = self.undo_stack.pop()
+        if STATE_TABLE is not None:
+            self.code -= DIGITS[int(self.board[move[0], move[1]])] * POWERS[int(move[0]) * self.board_size + int(move[1])]
+        self.board[move[0], move[1]] = EMPTY
+
+    def __place__(self, move, color):
+        self.board[move[0]][move[1]] = color
+        if STATE_TABLE is not None:
+            self.code += DIGITS[color] * POWERS[int(move[0]) * self.board_size + int(move[1])]
+
+        self.__key__ ^= ZOBRIST_KEYS[color][int(move[0]) * self.board_size + int(move[1])]
+        if self.to_move == color:
+            self.__key__ ^= ZOBRIST_SIDE
+            self.to_move = self.other_color(color)
+
+    def set_board(self, board):
+        self.board[:] = board
+        self.__key__ = zobrist_key(self.board, self.to_move, ZOBRIST_TABLE, ZOBRIST_SIDE)
+        if STATE_TABLE is not None:
+            self.code = encode(self.board)
+        return self
+
+    def canonical(self):
+        if STATE_TABLE is not None:
+            code, symmetry = STATE_TABLE.canonical(self.code)
+            return self.copy().set_board(decode(code)), symmetry
+        return super(TicTacToeBoard, self).canonical()
+
     def game_won(self):
         if self.illegal_move is not None:
             return self.other_color(self.illegal_move)
 
-        valid_moves = __get_valid_moves__(self.board, self.board_size)
-        if not valid_moves:
-            return EMPTY
+        if STATE_TABLE is not None:
+            return STATE_TABLE.winner(self.code)
 
-        return __game_won__(self.board, self.board_size, valid_moves)
+        winner = __game_won__(self.board, self.board_size)
+        if winner is None and not __get_valid_moves__(self.board, self.board_size):
+            return EMPTY
+        return winner
 
     def get_afterstates(self, color):
         return [(self.copy().apply_move(move=move, color=color), move) for move in self.get_valid_moves(color)]
@@ -50,29 +101,36 @@ class TicTacToeBoard(Board):
     def in_bounds(self, position):
         return __in_bounds__(position, self.board_size)
 
-    def get_representation(self, color):
-        return __get_representation__(self.board, color)
+    def get_representation(self, color, out=None):
+        if color == BLACK:
+            if out is None:
+                return self.board.copy()
+            np.copyto(out, self.board)
+            return out
 
         if color == WHITE:
-            return self.__get_representation__(self.board)
+            return np.negative(self.board, out=out)
         else:
             raise BoardException("Illegal color provided: %s" % color)
 
     def get_legal_moves_map(self, color):
-        return __get_legal_moves_map__(self.board_size, __get_valid_moves__(self.board, self.board_size))
+        return __get_legal_moves_map__(self.board_size, self.get_valid_moves())
 
     def copy(self):
+        if self.arena is not None:
+            return self.arena.acquire(self)
         return TicTacToeBoard(self)
 
+    def copy_into(self, board):
+        np.copyto(board.board, self.board)
+        board.illegal_move = None
+        board.to_move, board.__key__, board.code = self.to_move, self.__key__, self.code
+        board.undo_stack.clear()
+        return board
+
     def count_stones(self):
         return __count_stones__(self.board, self.board_size)
 
-    def __eq__(self, other):
-        return (self.board == other.board).all()
-
-    def __hash__(self):
-        return hash(str(self.board))
-
 
 """   ---  Numba implementations  ---   '''
 Numba 0.36 does not yet fully support custom types.
@@ -92,7 +150,7 @@ def __get_valid_moves__(board, board_size):
 
 
 @njit
-def __game_won__(board, board_size, valid_moves):
+def __game_won__(board, board_size):
     for i in range(board_size):
         for j in range(board_size):
             # Make use of symmetry, only check bottom right half of directions
@@ -122,34 +180,11 @@ def __in_bounds__(position, board_size):
     return True
 
 
-# @njit
-def __get_representation__(board, color):
-    if color == BLACK:
-        return board.copy()
-
-    if color == WHITE:
-        representation = []
-        for row in board:
-            new_row = []
-            for field in row:
-                if field == EMPTY:
-                    new_row.append(EMPTY)
-                elif field == BLACK:
-                    new_row.append(WHITE)
-                else:
-                    new_row.append(BLACK)
-            representation.append(new_row)
-
-        return np.array(representation, dtype=np.float64)
-
-    raise BoardException("Illegal color provided: %s" % color)
-
-
 @njit
 def __get_legal_moves_map__(board_size, valid_moves):
-    legal_moves_map = np.zeros((board_size, board_size))
+    legal_moves_map = np.zeros((board_size, board_size), dtype=np.bool_)
     for move in valid_moves:
-        legal_moves_map[move[0]][move[1]] = 1
+        legal_moves_map[move[0]][move[1]] = True
     return legal_moves_map
 
 
@@ -157,28 +192,8 @@ def __get_legal_moves_map__(board_size, valid_moves):
 def __count_stones__(board, board_size):
     """ returns a tuple (num_black_stones, num_white_stones)"""
 
-    black = (board == np.full((board_size, board_size), BLACK, dtype=np.float64)).sum()
-    white = (board == np.full((board_size, board_size), WHITE, dtype=np.float64)).sum()
+    black = (board == BLACK).sum()
+    white = (board == WHITE).sum()
 
     return black, white
 
-
-def __generate_vectorized_get_representation__():
-    """
-    Generates a vectorized function(board_sample) that calculates a board representation element wise and in parallel.
-
-    Empirically this implementation is slightly slower than a loop based one for board size = 3 but almost twice as fast with board size = 8 which is the final target for this game.
-    These values obviously depend on the executing hardware.
-    :return: a function of (boardsample) that calculates a board representation
-    """
-
-    def __element_wise_representation__(board_sample):
-        if board_sample == config.EMPTY:
-            return config.EMPTY
-        if board_sample == config.BLACK:
-            return config.WHITE
-        if board_sample == config.WHITE:
-            return config.BLACK
-        raise BoardException("Board contains illegal colors")
-
-    return np.vectorize(__element_wise_representation__, otypes=[np.float])
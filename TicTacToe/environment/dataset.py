@@ -0,0 +1,116 @@
+import os
+import shutil
+import numpy as np
+
+import TicTacToe.config as config
+from TicTacToe.config import BLACK, EMPTY
+from abstractClasses import BoardException
+from TicTacToe.environment.board import TicTacToeBoard
+from TicTacToe.environment.stateTable import STATE_TABLE, STATES, WINNER, ONGOING, CANONICAL, CANONICAL_ID, decode
+
+DATASET_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "datasets")
+
+# One .npy file each, row i of all arrays describes the same board
+ARRAYS = "codes", "boards", "legal_moves_maps", "labels"
+
+
+class SupervisedDataset:
+    """
+    Every 3x3 board that can occur in a game and is not over yet, labeled with the move of a base player.
+
+    The dataset is built once per labeler and cached on disk, later loads memory-map the arrays instead of reading them.
+
+    codes: (N,) base-3 codes of the boards
+    boards: (N, 3, 3) int8 boards
+    legal_moves_maps: (N, 3, 3) bool legal moves maps
+    labels: (N,) int64 flat index of the labeled move
+    """
+    def __init__(self, directory):
+        for name in ARRAYS:
+            setattr(self, name, np.load(os.path.join(directory, name + ".npy"), mmap_mode="r"))
+
+    @classmethod
+    def load(cls, labeling_strategy, color=BLACK, canonical=False, directory=DATASET_DIRECTORY):
+        """
+        Loads the dataset of :param labeling_strategy, building and caching it first if it does not exist yet.
+
+        :param labeling_strategy: The player labeling the boards. Players that are not deterministic label each board only once
+        :param color: The color the labeling strategy plays with
+        :param canonical: If set, the dataset only contains the canonical forms of the boards
+        :param directory: The directory holding all cached datasets
+        :return: a SupervisedDataset
+        """
+        path = os.path.join(directory, dataset_key(labeling_strategy, color, canonical))
+        if not os.path.isdir(path):
+            arrays = build_supervised_dataset(labeling_strategy, color, canonical)
+
+            # Written to a temporary directory first so that concurrent runs never see an incomplete dataset
+            temporary = "%s.%s.tmp" % (path, os.getpid())
+            os.makedirs(temporary)
+            for name in ARRAYS:
+                np.save(os.path.join(temporary, name + ".npy"), arrays[name])
+            try:
+                os.rename(temporary, path)
+            except OSError:
+                shutil.rmtree(temporary)  # Built by another run in the meantime
+
+        return cls(path)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def sample(self, batch_size, random_state=np.random):
+        """
+        Draws a random minibatch with replacement.
+
+        :return: a tuple (boards, legal_moves_maps, labels) of in-memory arrays
+        """
+        indices = np.sort(random_state.randint(len(self), size=batch_size))  # Sorted reads are friendlier to the memory map
+        return self.boards[indices], self.legal_moves_maps[indices], self.labels[indices]
+
+    def to_training_set(self, indices=None):
+        """
+        Converts the dataset into the format of TicTacToeBaseExperiment.generate_supervised_training_data.
+
+        :param indices: The rows to convert, all rows if None
+        :return: a list of tuples (board, move_label)
+        """
+        indices = range(len(self)) if indices is None else indices
+        return [(TicTacToeBoard().set_board(self.boards[i]), (int(self.labels[i]) // 3, int(self.labels[i]) % 3)) for i in indices]
+
+    def move_table(self):
+        """ :return: a (STATES,) array holding the labeled flat move per board code, -1 for boards not in the dataset """
+        table = np.full(STATES, -1, dtype=np.int64)
+        table[self.codes] = self.labels
+        return table
+
+
+def dataset_key(labeling_strategy, color, canonical):
+    """ Identifies a labeler by its class and all its plain attributes, such as ExperiencedPlayer's deterministic and block_mid """
+    attributes = ["%s=%s" % (name, value) for name, value in sorted(vars(labeling_strategy).items())
+                  if name not in ("color", "original_color") and isinstance(value, (bool, int, float, str))]
+    return "-".join([labeling_strategy.__class__.__name__] + attributes + ["color=%s" % color] + (["canonical"] if canonical else []))
+
+
+def build_supervised_dataset(labeling_strategy, color=BLACK, canonical=False):
+    """
+    Labels every board in which the game is not over and that can occur in a game started by either color.
+
+    :return: a dict holding the arrays described in SupervisedDataset
+    """
+    if STATE_TABLE is None:
+        raise BoardException("Supervised datasets are only implemented for 3x3 TicTacToe")
+
+    selected = (STATE_TABLE.table[:, WINNER] == ONGOING) & (STATE_TABLE.table[:, CANONICAL_ID] >= 0)
+    if canonical:
+        selected &= STATE_TABLE.table[:, CANONICAL] == np.arange(STATES)
+    codes = np.flatnonzero(selected)
+
+    boards = np.stack([decode(code) for code in codes])
+    labeling_strategy.color = color
+    labels = []
+    for board in boards:
+        move = labeling_strategy.get_move(TicTacToeBoard().set_board(board))
+        labels.append(move[0] * config.BOARD_SIZE + move[1])
+
+    return {"codes": codes.astype(np.int64), "boards": boards, "legal_moves_maps": boards == EMPTY, "labels": np.array(labels, dtype=np.int64)}
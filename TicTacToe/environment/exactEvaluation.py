@@ -0,0 +1,198 @@
+import numpy as np
+import torch
+from functools import partial
+
+import TicTacToe.config as config
+from TicTacToe.config import BLACK, WHITE, EMPTY
+from abstractClasses import LearningPlayer, BoardException, symmetry_tables
+from TicTacToe.environment.board import TicTacToeBoard
+from TicTacToe.environment.stateTable import STATE_TABLE, STATES, POWERS, WINNER, ONGOING, DIGITS, CANONICAL
+from TicTacToe.players.basePlayers import RandomPlayer, NovicePlayer, ExperiencedPlayer, ExpertPlayer
+
+"""
+Exact counterpart of TicTacToe.environment.evaluation for 3x3 boards.
+
+Instead of sampling games, the game tree is enumerated with the probability of every move of both players.
+Results are therefore expected values: a score of 0.5 means that P(win) - P(loss) = 0.5, not that half the sampled games were won.
+"""
+
+
+def exact_evaluate_against_base_players(player, evaluation_players=[RandomPlayer(), NovicePlayer(), ExperiencedPlayer(), ExpertPlayer()], silent=True):
+    """
+    Standardized evaluation against base players, computed exactly.
+
+    Every opponent is played with both colors and both as first and as second player, the four configurations that
+    TicTacToe.run_simulations cycles through. Positions are memoized by base-3 code and color to move.
+
+    :param player: The player to be evaluated. LearningPlayers are evaluated with the move probabilities of their model,
+                   all other players with get_move_distribution
+    :param evaluation_players: A list of players against which the player should be evaluated
+    :param silent: Flag controlling if output is written to console
+    :return: a tuple (score, results, overview) in the format of evaluate_against_base_players. The overview holds the
+             probabilities of each outcome instead of game counts
+    """
+    if STATE_TABLE is None:
+        raise BoardException("Exact evaluation is only implemented for 3x3 TicTacToe")
+
+    # Store original training values
+    if issubclass(player.__class__, LearningPlayer):
+        training_values = player.strategy.train, player.strategy.model.training
+        player.strategy.train, player.strategy.model.training = False, False
+        policy = PolicyTable(player).get_move_distribution
+    else:
+        policy = partial(get_move_distribution, player)
+
+    original_color = getattr(player, "color", None)
+    results, overview = [], []
+    for e_player in evaluation_players:
+        e_original_color = getattr(e_player, "color", None)
+
+        outcomes = np.zeros(3)
+        for color in BLACK, WHITE:
+            player.color, e_player.color = color, TicTacToeBoard.other_color(color)
+            policies = {color: policy, e_player.color: partial(get_move_distribution, e_player)}
+            memo = {}
+            for first in BLACK, WHITE:
+                outcome = __expected_outcome__(TicTacToeBoard(), first, policies, memo)
+                outcomes += outcome[[DIGITS[color], DIGITS[EMPTY], DIGITS[e_player.color]]] / 4
+
+        e_player.color = e_original_color
+        distribution = {config.LABEL_WIN: outcomes[0], config.LABEL_DRAW: outcomes[1], config.LABEL_LOSS: outcomes[2]}
+        results.append((e_player.__str__(), outcomes[0] - outcomes[2]))
+        overview.append((e_player.__str__(), distribution))
+
+        if not silent:
+            print_distribution(player, e_player, distribution)
+
+    player.color = original_color
+
+    # Restore original training values
+    if issubclass(player.__class__, LearningPlayer):
+        player.strategy.train, player.strategy.model.training = training_values
+
+    results.insert(0, ("Total Score", np.mean([result[1] for result in results])))  # Insert average overall score as first element of results
+    total = {label: np.mean([entry[1][label] for entry in overview]) for label in (config.LABEL_WIN, config.LABEL_DRAW, config.LABEL_LOSS)}
+    overview.insert(0, ("[Total Score]", total))
+
+    if not silent:
+        print("Overall score: %s" % results[0][1])
+
+    return results[0][1], results, overview
+
+
+def get_move_distribution(player, board):
+    """
+    The probability of every move the base player :param player chooses on :param board.
+
+    Players that are not known to be random are assumed to be deterministic, their distribution is the single move returned by get_move.
+
+    :return: A list of tuples (move, probability)
+    """
+    valid_moves = board.get_valid_moves(player.color)
+
+    if isinstance(player, RandomPlayer):
+        return [(move, 1 / len(valid_moves)) for move in valid_moves]
+
+    if isinstance(player, NovicePlayer):
+        for move in valid_moves:
+            if board.copy().apply_move(move, player.color).game_won() == player.color:
+                return [(move, 1)]
+        return [(move, 1 / len(valid_moves)) for move in valid_moves]
+
+    if isinstance(player, ExperiencedPlayer) and not player.deterministic:
+        # Equally valued moves are chosen uniformly by the random noise added to their scores
+        move = player.get_move(board)
+        afterstate = board.copy().apply_move(move, player.color)
+        if afterstate.game_won() == player.color or (player.block_mid and move == (1, 1) and sum(board.count_stones()) == 1):
+            return [(move, 1)]
+        moves = __best_heuristic_moves__(player, board, valid_moves)
+        return [(move, 1 / len(moves)) for move in moves]
+
+    if isinstance(player, ExpertPlayer) and player.search_depth >= len(valid_moves):
+        moves = STATE_TABLE.get_optimal_moves(board.code, player.color)
+        return [(move, 1 / len(moves)) for move in moves]
+
+    return [(player.get_move(board), 1)]
+
+
+class PolicyTable:
+    """
+    Move probabilities of a LearningPlayer for every 3x3 position in which the game is not over, computed in a single forward pass.
+
+    If the player has CANONICAL set, only canonical forms are evaluated and their probabilities are mapped back onto the other boards.
+    """
+    def __init__(self, player):
+        self.player = player
+
+        ongoing = STATE_TABLE.table[:, WINNER] == ONGOING
+        if player.CANONICAL:
+            ongoing &= STATE_TABLE.table[:, CANONICAL] == np.arange(STATES)
+        codes = np.flatnonzero(ongoing)
+        boards = np.array([EMPTY, BLACK, WHITE], dtype=np.int8)[codes[:, None] // np.array(POWERS) % 3]
+        legal_moves_maps = np.tile(boards == EMPTY, (2, 1))
+        representations = np.concatenate((boards * BLACK, boards * WHITE))
+
+        with torch.no_grad():
+            probs, _ = player.strategy.model(config.make_variable(representations), config.make_variable(legal_moves_maps))
+        probs = probs.cpu().numpy()
+        probs /= probs.sum(axis=1, keepdims=True)  # The legal softmax zeroes illegal moves without renormalizing
+
+        self.rows = np.full(STATES, -1, dtype=np.int64)
+        self.rows[codes] = np.arange(len(codes))
+        self.probs = {BLACK: probs[:len(codes)], WHITE: probs[len(codes):]}
+
+    def get_move_distribution(self, board):
+        """ :return: A list of tuples (move, probability) for the player's current color """
+        code, symmetry = STATE_TABLE.canonical(board.code) if self.player.CANONICAL else (board.code, 0)
+        probs = self.probs[self.player.color][self.rows[code]]
+        tiles = symmetry_tables(3)[1][symmetry]  # Tiles of the moves on the evaluated board
+        return [(move, probs[tiles[move[0] * 3 + move[1]]]) for move in board.get_valid_moves(self.player.color)]
+
+
+def print_distribution(player, e_player, distribution):
+    print("\nExact evaluation of %s vs %s" % (player.__str__(), e_player.__str__()))
+    print("Total score: %s" % (distribution[config.LABEL_WIN] - distribution[config.LABEL_LOSS]))
+    print("W/D/L: %.3f/%.3f/%.3f" % (distribution[config.LABEL_WIN], distribution[config.LABEL_DRAW], distribution[config.LABEL_LOSS]))
+
+
+def __expected_outcome__(board, to_move, policies, memo):
+    """
+    :param policies: A dict {color: function mapping a board to a list of tuples (move, probability)}
+    :return: an array holding the probabilities of the outcomes EMPTY, BLACK, WHITE indexed by DIGITS
+    """
+    key = (board.code, to_move)
+    if key in memo:
+        return memo[key]
+
+    outcome = np.zeros(3)
+    winner = board.game_won()
+    if winner is not None:
+        outcome[DIGITS[winner]] = 1
+    else:
+        for move, probability in policies[to_move](board):
+            if probability:
+                board.make_move(move, to_move)
+                outcome += probability * __expected_outcome__(board, TicTacToeBoard.other_color(to_move), policies, memo)
+                board.unmake_move()
+
+    memo[key] = outcome
+    return outcome
+
+
+def __best_heuristic_moves__(player, board, valid_moves):
+    """ All moves ExperiencedPlayer considers equally good before breaking the tie randomly """
+    denies, attacks = [], []
+    for move in valid_moves:
+        afterstate = board.copy().apply_move(move, player.color)
+        afterstate_opponent = board.copy().apply_move(move, board.other_color(player.color))
+        if afterstate_opponent.game_won() == board.other_color(player.color):
+            denies.append((__heuristic_score__(player, afterstate_opponent), move))
+        attacks.append((__heuristic_score__(player, afterstate), move))
+
+    candidates = denies if denies else attacks
+    best = max(score for score, move in candidates)
+    return [move for score, move in candidates if score == best]
+
+
+def __heuristic_score__(player, board):
+    return np.sum(player.heuristic_table * (board.board == player.color) - player.heuristic_table * (board.board == board.other_color(player.color)))
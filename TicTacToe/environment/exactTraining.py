@@ -0,0 +1,152 @@
+import numpy as np
+import torch
+
+import TicTacToe.config as config
+from TicTacToe.config import BLACK, WHITE, EMPTY
+from abstractClasses import LearningPlayer, BoardException, PlayerException, symmetry_tables
+from TicTacToe.environment.board import TicTacToeBoard
+from TicTacToe.environment.stateTable import STATE_TABLE, TILES, decode
+from TicTacToe.environment.exactEvaluation import get_move_distribution
+
+
+class ExactPolicyGradient:
+    """
+    Trains the policy of a LearningPlayer on the exact expected score against fixed opponents on 3x3 TicTacToe.
+
+    The game tree is enumerated once: every legal move of the player and every move the opponent plays with nonzero probability,
+    with both colors and both as first and second player. Each update evaluates the model on all positions in which the player
+    is to move in a single forward pass, backs the expected score up the tree one stone count at a time and takes one optimizer
+    step on its exact gradient. The objective equals the score of exact_evaluate_against_base_players for the same opponents.
+
+    If the player has CANONICAL set, only canonical forms are evaluated, which shrinks the forward pass about eightfold.
+    """
+    def __init__(self, player, opponents):
+        """
+        :param player: The LearningPlayer to train. Its strategy's model and optimizer are used
+        :param opponents: A list of players whose move distributions are known to get_move_distribution
+        """
+        if STATE_TABLE is None:
+            raise BoardException("Exact training is only implemented for 3x3 TicTacToe")
+        if not issubclass(player.__class__, LearningPlayer):
+            raise PlayerException("ExactPolicyGradient trains LearningPlayers, received %s" % player)
+
+        self.player = player
+        self.opponents = opponents
+
+        self.stones = []  # Number of stones of every node, nodes are only backed up after all their successors
+        self.values = []  # Score of terminal nodes from the player's perspective
+        self.successors = []  # Node index per tile, -1 for illegal moves
+        self.probabilities = []  # Move probability per tile for opponent nodes, None for player nodes
+        self.policy_rows = []  # Row in the forward pass for player nodes, -1 otherwise
+        self.tiles = []  # Per tile, the tile of the move on the evaluated board
+
+        self.representations, self.legal_moves_maps = [], []
+        self.rows = {}  # (code, color) -> row in the forward pass
+        self.roots = []
+
+        original_colors = getattr(player, "color", None), [getattr(opponent, "color", None) for opponent in opponents]
+        for opponent in opponents:
+            for color in BLACK, WHITE:
+                player.color, opponent.color = color, TicTacToeBoard.other_color(color)
+                nodes = {}
+                for first in BLACK, WHITE:
+                    self.roots.append(self.__enumerate__(TicTacToeBoard(), first, opponent, nodes))
+        player.color = original_colors[0]
+        for opponent, color in zip(opponents, original_colors[1]):
+            opponent.color = color
+
+        self.__build_levels__()
+
+    def expected_score(self):
+        """
+        :return: The differentiable expected score (P(win) - P(loss)) averaged over all opponents and configurations
+        """
+        probs, _ = self.player.strategy.model(self.representations, self.legal_moves_maps)
+        probs = probs / probs.sum(dim=1, keepdim=True)  # The legal softmax zeroes illegal moves without renormalizing
+
+        values = self.terminal_values
+        for nodes, successors, weights, rows, tiles in self.levels:
+            weights = weights if rows is None else probs[rows].gather(1, tiles)
+            values = values.index_put((nodes,), (weights * values[successors]).sum(dim=1))
+        return values[self.root_tensor].mean()
+
+    def update(self):
+        """
+        Takes one optimizer step maximizing the expected score.
+
+        :return: The expected score before the step
+        """
+        strategy = self.player.strategy
+        strategy.model.training = True
+
+        strategy.optimizer.zero_grad()
+        score = self.expected_score()
+        (-score).backward()
+        strategy.optimizer.step()
+
+        return float(score.data)
+
+    def __enumerate__(self, board, to_move, opponent, nodes):
+        key = (board.code, to_move)
+        if key in nodes:
+            return nodes[key]
+
+        node = len(self.stones)
+        nodes[key] = node
+        self.stones.append(sum(board.count_stones()))
+        self.successors.append([-1] * TILES)
+        self.probabilities.append(None)
+        self.policy_rows.append(-1)
+        self.tiles.append(symmetry_tables(3)[1][0])
+
+        winner = board.game_won()
+        self.values.append(0 if winner in (None, EMPTY) else (1 if winner == self.player.color else -1))
+        if winner is not None:
+            return node
+
+        if to_move == self.player.color:
+            distribution = [(move, None) for move in board.get_valid_moves()]
+            code, symmetry = STATE_TABLE.canonical(board.code) if self.player.CANONICAL else (board.code, 0)
+            if (code, to_move) not in self.rows:
+                self.rows[(code, to_move)] = len(self.representations)
+                self.representations.append(decode(code) * to_move)
+                self.legal_moves_maps.append(decode(code) == EMPTY)
+            self.policy_rows[node] = self.rows[(code, to_move)]
+            self.tiles[node] = symmetry_tables(3)[1][symmetry]
+        else:
+            distribution = get_move_distribution(opponent, board)
+            self.probabilities[node] = [0] * TILES
+
+        for move, probability in distribution:
+            tile = move[0] * 3 + move[1]
+            board.make_move(move, to_move)
+            self.successors[node][tile] = self.__enumerate__(board, TicTacToeBoard.other_color(to_move), opponent, nodes)
+            board.unmake_move()
+            if probability is not None:
+                self.probabilities[node][tile] = probability
+
+        return node
+
+    def __build_levels__(self):
+        """ Groups the inner nodes into tensors by stone count and type, which are backed up from the full board down """
+        dummy = len(self.stones)  # Illegal moves point to an extra node of value 0
+        successors = np.array(self.successors)
+        inner = (successors != -1).any(axis=1)
+        successors[successors == -1] = dummy
+        stones, policy_rows = np.array(self.stones), np.array(self.policy_rows)
+
+        self.levels = []
+        for count in reversed(range(TILES)):
+            for player_nodes in True, False:
+                nodes = np.flatnonzero(inner & (stones == count) & ((policy_rows != -1) == player_nodes))
+                if len(nodes) == 0:
+                    continue
+                weights = None if player_nodes else config.make_variable([self.probabilities[node] for node in nodes])
+                rows = torch.LongTensor(policy_rows[nodes]) if player_nodes else None
+                tiles = torch.LongTensor(np.array(self.tiles)[nodes]) if player_nodes else None
+                self.levels.append((torch.LongTensor(nodes), torch.LongTensor(successors[nodes]), weights, rows, tiles))
+
+        self.terminal_values = config.make_variable(self.values + [0])
+        self.root_tensor = torch.LongTensor(self.roots)
+        self.representations = config.make_variable(np.array(self.representations))
+        self.legal_moves_maps = config.make_variable(np.array(self.legal_moves_maps))
@@ -6,8 +6,9 @@ from TicTacToe.environment.board import TicTacToeBoard
 
 class TicTacToe(TwoPlayerGame):
 
-    def __init__(self, players):
+    def __init__(self, players, board_type=TicTacToeBoard):
         super(TicTacToe, self).__init__(players=players, config=config)
+        self.board_type = board_type  # TicTacToeBoard or any API compatible implementation such as TicTacToeBitBoard
 
         self.player1.color = config.BLACK
         self.player2.color = config.WHITE
@@ -23,7 +24,7 @@ class TicTacToe(TwoPlayerGame):
         :param player2:
         :return: The original color of the winning player
         """
-        self.board = TicTacToeBoard()
+        self.board = self.board_type()
         players = player1, player2
 
         while True:
@@ -0,0 +1,185 @@
+import os
+import numpy as np
+
+import TicTacToe.config as config
+from TicTacToe.config import BLACK, WHITE, EMPTY
+from abstractClasses import canonical_symmetry, transform_move, inverse_transform_move
+
+"""
+Every 3x3 board is identified by its base-3 code: sum(digit(board[i, j]) * 3**(i * 3 + j)) with digit EMPTY -> 0, BLACK -> 1, WHITE -> 2.
+Codes of all 3**9 boards, including unreachable ones, index a dense table holding everything there is to know about the position.
+
+Positions that are mapped onto each other by one of the 8 symmetries of the board (see abstractClasses.symmetry_tables) share a canonical
+code, the code of their canonical form. Canonical forms of positions reachable in a game, with either color moving first, are numbered
+densely by their canonical ID, which makes them suitable as indices of caches and datasets.
+"""
+
+TILES = 9
+STATES = 3**TILES
+POWERS = [3**i for i in range(TILES)]
+DIGITS = {EMPTY: 0, BLACK: 1, WHITE: 2}
+ONGOING = 2  # Winner entry of positions in which the game is not over yet
+
+# Flat tile indices of all lines in the order TicTacToeBoard scans them, which decides the winner of (unreachable) boards with two lines
+WIN_LINES = [(0, 3, 6), (0, 1, 2), (0, 4, 8), (1, 4, 7), (2, 5, 8), (3, 4, 5), (6, 4, 2), (6, 7, 8)]
+
+# Columns of the table. Values and optimal moves exist once for each color to move
+WINNER, LEGAL_MOVES, VALUE_BLACK, VALUE_WHITE, OPTIMAL_BLACK, OPTIMAL_WHITE, CANONICAL, SYMMETRY, CANONICAL_ID = range(9)
+COLUMNS = 9
+
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stateTable.npy")
+
+
+class StateTable:
+    """
+    Winner, legal moves, perfect play value and optimal moves of every 3x3 TicTacToe board.
+
+    Values are the color winning under perfect play of both sides (EMPTY for a draw), moves are bitmasks over flat tile indices.
+    Canonical codes and IDs are described at the top of this module.
+    """
+    def __init__(self, table):
+        self.table = table
+        self.winners = table[:, WINNER].tolist()
+        self.values = table[:, [VALUE_BLACK, VALUE_WHITE]].tolist()
+        self.valid_moves = [__to_moves__(mask) for mask in table[:, LEGAL_MOVES].tolist()]
+        self.optimal_moves = [(__to_moves__(black), __to_moves__(white)) for black, white in table[:, [OPTIMAL_BLACK, OPTIMAL_WHITE]].tolist()]
+        self.canonical_forms = table[:, [CANONICAL, SYMMETRY]].tolist()
+        self.canonical_ids = table[:, CANONICAL_ID].tolist()
+        self.num_canonical = int(table[:, CANONICAL_ID].max()) + 1
+
+    @classmethod
+    def load(cls, path=CACHE_FILE):
+        """
+        Loads the table from :param path, building and caching it there if the file does not exist yet.
+
+        :param path: Location of the cached .npy file
+        :return: a StateTable
+        """
+        if os.path.isfile(path):
+            table = np.load(path)
+            if table.shape == (STATES, COLUMNS):
+                return cls(table)
+
+        table = build_state_table()
+        try:
+            np.save(path, table)
+        except OSError:
+            pass  # Read only installation, the table is rebuilt on the next import
+        return cls(table)
+
+    def winner(self, code):
+        """ :return: The winner of the board, EMPTY for a draw and None if the game is not over """
+        winner = self.winners[code]
+        return None if winner == ONGOING else winner
+
+    def value(self, code, to_move):
+        """ :return: The winner under perfect play if :param to_move moves next, EMPTY for a draw """
+        return self.values[code][0 if to_move == BLACK else 1]
+
+    def get_optimal_moves(self, code, to_move):
+        """ :return: A list of all moves of :param to_move that keep the value of the position """
+        return self.optimal_moves[code][0 if to_move == BLACK else 1]
+
+    def canonical(self, code):
+        """ :return: a tuple (canonical code, symmetry) where symmetry is the index of the symmetry mapping the board onto its canonical form """
+        return tuple(self.canonical_forms[code])
+
+    def canonical_id(self, code):
+        """ :return: The dense ID of the canonical form of the board, -1 if the board cannot occur in a game """
+        return self.canonical_ids[code]
+
+    def to_canonical_move(self, move, code):
+        """ Maps :param move on the board :param code onto its canonical form """
+        return transform_move(move, self.canonical_forms[code][1], 3)
+
+    def from_canonical_move(self, move, code):
+        """ Maps :param move on the canonical form of the board :param code back onto the board """
+        return inverse_transform_move(move, self.canonical_forms[code][1], 3)
+
+
+def encode(board):
+    """ Returns the base-3 code of a board array """
+    return sum(DIGITS[int(tile)] * power for tile, power in zip(board.flatten(), POWERS))
+
+
+def decode(code):
+    """ Returns the board array of a base-3 code """
+    return np.array([EMPTY, BLACK, WHITE], dtype=np.int8)[np.array(code) // np.array(POWERS) % 3].reshape(3, 3)
+
+
+def build_state_table():
+    """
+    Computes the table by retrograde analysis: boards are solved in order of decreasing stone count, so all successors are known.
+
+    :return: a (STATES, COLUMNS) int32 array, see the column constants
+    """
+    codes = np.arange(STATES)
+    digits = codes[:, None] // np.array(POWERS) % 3
+    tiles = np.array([EMPTY, BLACK, WHITE])[digits]
+
+    winners = np.full(STATES, ONGOING)
+    for line in reversed(WIN_LINES):  # Earlier lines overwrite later ones
+        for color in WHITE, BLACK:
+            winners[(tiles[:, line] == color).all(axis=1)] = color
+    winners[(winners == ONGOING) & (digits != 0).all(axis=1)] = EMPTY
+
+    table = np.zeros((STATES, COLUMNS), dtype=np.int32)
+    table[:, WINNER] = winners
+    table[:, LEGAL_MOVES] = ((digits == 0) * (1 << np.arange(TILES))).sum(axis=1)
+
+    values = [[EMPTY, EMPTY] for code in codes]
+    optimal = [[0, 0] for code in codes]
+    winners, empties = winners.tolist(), [np.flatnonzero(row == 0).tolist() for row in digits]
+    for code in np.argsort(-(digits != 0).sum(axis=1), kind="stable").tolist():
+        if winners[code] != ONGOING:
+            values[code] = [winners[code], winners[code]]
+            continue
+
+        for column, color in enumerate((BLACK, WHITE)):
+            best, moves = None, 0
+            for tile in empties[code]:
+                value = values[code + DIGITS[color] * POWERS[tile]][1 - column] * color  # Scored from the perspective of color
+                if best is None or value > best:
+                    best, moves = value, 1 << tile
+                elif value == best:
+                    moves |= 1 << tile
+            values[code][column], optimal[code][column] = best * color, moves
+
+    table[:, [VALUE_BLACK, VALUE_WHITE]] = values
+    table[:, [OPTIMAL_BLACK, OPTIMAL_WHITE]] = optimal
+
+    canonical, symmetries = canonical_symmetry(tiles.reshape(STATES, 3, 3))
+    table[:, CANONICAL] = (canonical.reshape(STATES, TILES) % 3) @ np.array(POWERS)  # WHITE % 3 is its digit
+    table[:, SYMMETRY] = symmetries
+
+    # Symmetries preserve reachability, so the canonical forms of reachable boards are reachable themselves
+    reachable = __reachable__(digits, table[:, WINNER] == ONGOING)
+    canonical_codes = np.unique(table[reachable, CANONICAL])
+    table[:, CANONICAL_ID] = -1
+    table[reachable, CANONICAL_ID] = np.searchsorted(canonical_codes, table[reachable, CANONICAL])
+    return table
+
+
+def __reachable__(digits, ongoing):
+    """ Marks all boards that occur in games started by either color, expanding the boards of each stone count at once """
+    stones = (digits != 0).sum(axis=1)
+    balanced = (digits == DIGITS[BLACK]).sum(axis=1) == (digits == DIGITS[WHITE]).sum(axis=1)
+
+    reachable = np.zeros(STATES, dtype=np.bool_)
+    for first, second in (DIGITS[BLACK], DIGITS[WHITE]), (DIGITS[WHITE], DIGITS[BLACK]):
+        reached = np.zeros(STATES, dtype=np.bool_)
+        reached[0] = True
+        for count in range(TILES):
+            frontier = np.flatnonzero(reached & ongoing & (stones == count))
+            movers = np.where(balanced[frontier], first, second)
+            successors = frontier[:, None] + movers[:, None] * np.array(POWERS)
+            reached[successors[digits[frontier] == 0]] = True
+        reachable |= reached
+    return reachable
+
+
+def __to_moves__(mask):
+    return [(tile // 3, tile % 3) for tile in range(TILES) if mask >> tile & 1]
+
+
+STATE_TABLE = StateTable.load() if config.BOARD_SIZE == 3 and config.WIN_LINE_LENGTH == 3 else None
@@ -0,0 +1,73 @@
+from datetime import datetime
+from random import random
+
+import TicTacToe.config as config
+from TicTacToe.experiments.ticTacToeBaseExperiment import TicTacToeBaseExperiment
+from TicTacToe.players.basePlayers import RandomPlayer, NovicePlayer, ExperiencedPlayer, ExpertPlayer
+from TicTacToe.players.reinforcePlayer import FCReinforcePlayer
+from TicTacToe.environment.exactTraining import ExactPolicyGradient
+from TicTacToe.environment.exactEvaluation import exact_evaluate_against_base_players
+from plotting import Printer
+
+
+class TrainPGExact(TicTacToeBaseExperiment):
+    """
+    Trains a ReinforcePlayer on the exact expected score against fixed opponents instead of on sampled games.
+    """
+    def __init__(self, updates, evaluation_period, pretrained_player=None, opponents=None):
+        super(TrainPGExact, self).__init__()
+        self.updates = updates
+        self.evaluation_period = evaluation_period
+        self.pretrained_player = pretrained_player.copy(shared_weights=False) if pretrained_player else None
+        self.opponents = opponents
+
+    def reset(self):
+        self.__init__(updates=self.updates, evaluation_period=self.evaluation_period, pretrained_player=self.pretrained_player, opponents=self.opponents)
+        return self
+
+    def run(self, lr, silent=False):
+        self.player1 = self.pretrained_player if self.pretrained_player else FCReinforcePlayer(lr=lr)
+        opponents = self.opponents if self.opponents else [RandomPlayer(), NovicePlayer(), ExperiencedPlayer(), ExpertPlayer()]
+
+        start_time = datetime.now()
+        trainer = ExactPolicyGradient(self.player1, opponents)
+        print("Enumerated %s positions in %s" % (len(trainer.stones), config.time_diff(start_time)))
+
+        for update in range(1, self.updates + 1):
+            score = trainer.update()
+            self.add_results(("Expected score", score))
+
+            if update % self.evaluation_period == 0:
+                score, results, overview = exact_evaluate_against_base_players(self.player1)
+                self.add_results(results)
+
+            if not silent and Printer.print_episode(update, self.updates, datetime.now() - start_time):
+                self.plot_and_save(
+                    "%s exact PG" % (self.player1),
+                    "Train %s on the exact expected score vs %s\nUpdates: %s\nTime: %s"
+                    % (self.player1, [str(opponent) for opponent in opponents], update, config.time_diff(start_time)))
+
+        self.final_score, self.final_results, self.results_overview = exact_evaluate_against_base_players(self.player1, silent=False)
+        return self
+
+
+if __name__ == '__main__':
+
+    start = datetime.now()
+
+    UPDATES = 1000
+    EVALUATION_PERIOD = 10
+    LR = random() * 1e-9 + 1e-3
+
+    PLAYER = None  # Experiment.load_player("player.pth")
+    OPPONENTS = None  # [ExpertPlayer()]
+
+    print("Training ReinforcePlayer on exact gradients vs %s with lr: %s" % (OPPONENTS, LR))
+
+    experiment = TrainPGExact(updates=UPDATES, evaluation_period=EVALUATION_PERIOD, pretrained_player=PLAYER, opponents=OPPONENTS)
+    try:
+        experiment.run(lr=LR)
+    except:
+        experiment.save_player(experiment.player1)
+
+    print("took: %s" % (datetime.now() - start))
@@ -36,10 +36,10 @@ if __name__ == '__main__':
     AVAILABLE_EXPERIMENTS = TrainPGStrategySupervised, TrainPGSupervisedContinuous
     start = datetime.now()
 
-    GAMES = 2
+    SAMPLES = 20
     EPISODES = 2000000
 
-    # experiment = SupervisedCrossValidation(TrainPGStrategySupervised(games=GAMES, episodes=EPISODES))
+    # experiment = SupervisedCrossValidation(TrainPGStrategySupervised(samples=SAMPLES, episodes=EPISODES))
     experiment = SupervisedCrossValidation(TrainPGSupervisedContinuous(games=EPISODES, evaluation_period=1000))
     results = experiment.run(3, -2, -3.5)
 
@@ -12,29 +12,33 @@ from plotting import Printer
 
 class TrainPGStrategySupervised(TicTacToeBaseExperiment):
 
-    def __init__(self, games, episodes):
+    def __init__(self, samples, episodes):
+        """
+        :param samples: The number of boards drawn from the supervised dataset of the expert to train on
+        """
         super(TrainPGStrategySupervised, self).__init__()
 
-        self.games = games
+        self.samples = samples
         self.episodes = episodes
 
     def reset(self):
-        self.__init__(games=self.games, episodes=self.episodes)
+        self.__init__(samples=self.samples, episodes=self.episodes)
         return self
 
     def run(self, lr, silent=False):
 
-        print("Training PGStrategy supervised on %s games for %s Episodes - LR: %s" % (self.games, self.episodes, lr))
-        TEST_GAMES = 1
+        print("Training PGStrategy supervised on %s samples for %s Episodes - LR: %s" % (self.samples, self.episodes, lr))
+        TEST_SAMPLES = 10
 
         player = FCReinforcePlayer(lr=lr)
         player.color = config.BLACK
+        player.ROTATE_AND_FLIP = False  # Rewards are only assigned to the moves played, not to the evaluations of the symmetric boards
 
         expert = ExperiencedPlayer(deterministic=True, block_mid=True)
         expert.color = config.BLACK
 
-        training_set = self.generate_supervised_training_data(self.games, expert)
-        test_set = self.generate_supervised_training_data(TEST_GAMES, expert)
+        training_set = self.load_supervised_training_data(self.samples, expert)
+        test_set = self.load_supervised_training_data(TEST_SAMPLES, expert)
 
         start = datetime.now()
         for episode in range(self.episodes):
@@ -67,8 +71,8 @@ class TrainPGStrategySupervised(TicTacToeBaseExperiment):
 
             if not silent:
                 if Printer.print_episode(episode + 1, self.episodes, datetime.now() - start):
-                    plot_name = "Supervised on %s games lr: %s" % (self.games, lr)
-                    plot_info = "Lr: %s - %s Games - %s Episodes\nFinal Scores: %s / %s \nTime: %s" % (lr, self.games, episode+1, '{:.2f}'.format(average_reward), '{:.2f}'.format(average_test_reward), config.time_diff(start))
+                    plot_name = "Supervised on %s samples lr: %s" % (self.samples, lr)
+                    plot_info = "Lr: %s - %s Samples - %s Episodes\nFinal Scores: %s / %s \nTime: %s" % (lr, self.samples, episode+1, '{:.2f}'.format(average_reward), '{:.2f}'.format(average_test_reward), config.time_diff(start))
                     self.plot_and_save(plot_name, plot_name + "\n" + plot_info)
 
         return average_reward, average_test_reward
@@ -76,11 +80,11 @@ class TrainPGStrategySupervised(TicTacToeBaseExperiment):
 
 if __name__ == '__main__':
 
-    GAMES = 1
+    SAMPLES = 10
     EPISODES = 100000
     LR = random()*1e-9 + 1e-5
 
-    experiment = TrainPGStrategySupervised(games=GAMES, episodes=EPISODES)
+    experiment = TrainPGStrategySupervised(samples=SAMPLES, episodes=EPISODES)
     experiment.run(lr=LR)
 
     print("Successfully trained on %s games" % experiment.__plotter__.num_episodes)
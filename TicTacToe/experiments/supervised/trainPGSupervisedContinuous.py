@@ -1,4 +1,5 @@
 import os
+import numpy as np
 from datetime import datetime
 from random import random
 
@@ -8,35 +9,45 @@ from TicTacToe.players.acPlayer import LargeFCACPlayer, ConvACPlayer
 from TicTacToe.players.reinforcePlayer import FCReinforcePlayer, ConvReinforcePlayer
 from TicTacToe.players.basePlayers import ExperiencedPlayer, RandomPlayer
 from TicTacToe.environment.board import TicTacToeBoard
+from TicTacToe.environment.batch import BatchTicTacToe
+from TicTacToe.environment.dataset import SupervisedDataset
 from plotting import Printer
 
 
 class TrainPGSupervisedContinuous(TicTacToeBaseExperiment):
 
-    def __init__(self, games, evaluation_period):
+    def __init__(self, games, evaluation_period, batch_size=None):
+        """
+        :param batch_size: If set, games are played batch_size at a time in a BatchTicTacToe with one update per batch. Otherwise one game at a time
+        """
         super(TrainPGSupervisedContinuous, self).__init__()
 
         self.games = games
         self.evaluation_period = evaluation_period
+        self.batch_size = batch_size
 
     def reset(self):
-        self.__init__(games=self.games, evaluation_period=self.evaluation_period)
+        self.__init__(games=self.games, evaluation_period=self.evaluation_period, batch_size=self.batch_size)
         return self
 
     def run(self, lr, silent=False):
 
-        EVALUATION_GAMES = 10
+        EVALUATION_SAMPLES = 100
 
         player = FCReinforcePlayer(lr=lr)
         player.color = config.BLACK
 
+        if self.batch_size:
+            return self.run_batched(player, EVALUATION_SAMPLES, silent)
+
         expert = ExperiencedPlayer(deterministic=True, block_mid=True)
         expert.color = config.BLACK
+        player.ROTATE_AND_FLIP = False  # One reward per move played below, the symmetric boards would add log_probs without rewards
 
         generator = RandomPlayer()
         color_iterator = self.AlternatingColorIterator()
 
-        validation_set = self.generate_supervised_training_data(EVALUATION_GAMES, ExperiencedPlayer(deterministic=True, block_mid=True))
+        validation_set = self.load_supervised_training_data(EVALUATION_SAMPLES, ExperiencedPlayer(deterministic=True, block_mid=True))
 
         print("Training ReinforcedPlayer supervised continuously with LR: %s" % lr)
         start = datetime.now()
@@ -63,28 +74,84 @@ class TrainPGSupervisedContinuous(TicTacToeBaseExperiment):
             self.add_results([("Losses", loss), ("Reward", average_reward)])
 
             if game % self.evaluation_period == 0:
-                test_rewards = []
-                for board, expert_move in validation_set:
-                    # Evaluation mode
-                    player.strategy.train, player.strategy.model.training = False, False
-                    strategy_move = player.get_move(board)
-                    player.strategy.train, player.strategy.model.training = True, True
+                self.evaluate(player, validation_set)
+
+            if not silent:
+                self.print_progress(player, game + 1, average_reward, start)
+
+        return average_reward
+
+    def run_batched(self, player, evaluation_samples, silent):
+        """
+        Plays self.batch_size games in lockstep. Expert labels are looked up in the cached dataset of all its moves and the player samples its moves for the whole batch in a single forward pass.
 
-                    test_reward = config.BLACK if expert_move == strategy_move else config.WHITE
-                    test_rewards.append(test_reward)
+        Unlike the sequential loop, no more samples are taken from a game once it is over.
+        """
+        expert_moves = SupervisedDataset.load(ExperiencedPlayer(deterministic=True, block_mid=True), config.BLACK).move_table()
+        environment = BatchTicTacToe(self.batch_size)
+
+        validation_set = self.load_supervised_training_data(evaluation_samples, ExperiencedPlayer(deterministic=True, block_mid=True))
+
+        print("Training ReinforcedPlayer supervised continuously in batches of %s with LR: %s" % (self.batch_size, player.strategy.lr))
+        start = datetime.now()
+        for batch, games in enumerate(range(self.batch_size, self.games + self.batch_size, self.batch_size)):
+            environment.reset()
+            rewards = np.zeros((9, self.batch_size))
+            active = np.zeros((9, self.batch_size), dtype=np.bool_)
+
+            for i in range(9):
+                active[i] = ~environment.done
+                if not active[i].any():
+                    break
 
-                average_test_reward = sum(test_rewards) / len(test_rewards)
-                del test_rewards[:]
-                self.add_results(("Test reward", average_test_reward))
+                # The player always plays BLACK, its representation is the board itself
+                boards = environment.boards.reshape(-1, config.BOARD_SIZE, config.BOARD_SIZE)[active[i]]
+                player_moves = player.strategy.evaluate_batch(boards, environment.get_legal_moves_maps()[active[i]]).cpu().numpy()
+                rewards[i, active[i]] = np.where(expert_moves[environment.get_codes()[active[i]]] == player_moves, config.LABEL_WIN, config.LABEL_LOSS)
+
+                # prepare for next sample
+                environment.step(environment.sample_random_moves())
+
+            returns = np.zeros_like(rewards)
+            running_reward = np.zeros(self.batch_size)
+            for i in reversed(range(9)):
+                running_reward = player.strategy.gamma * running_reward + rewards[i] if player.strategy.gamma > 0 else rewards[i]
+                returns[i] = running_reward
+
+            average_reward = rewards[active].mean()
+            loss = player.strategy.update(returns=returns[active].tolist())  # Same order as the log_probs: step by step, game by game
+            del player.strategy.rewards[:]
+            self.add_results([("Losses", loss), ("Reward", average_reward)])
+
+            if batch % max(self.evaluation_period // self.batch_size, 1) == 0:
+                self.evaluate(player, validation_set)
 
             if not silent:
-                if Printer.print_episode(game + 1, self.games, datetime.now() - start):
-                    plot_name = "Supervised Continuous training of %s" % (player)
-                    plot_info = "%s Games - Final reward: %s \nTime: %s" % (game+1, average_reward, config.time_diff(start))
-                    self.plot_and_save(plot_name, plot_name + "\n" + plot_info)
+                self.print_progress(player, min(games, self.games), average_reward, start)
 
         return average_reward
 
+    def evaluate(self, player, validation_set):
+        test_rewards = []
+        for board, expert_move in validation_set:
+            # Evaluation mode
+            player.strategy.train, player.strategy.model.training = False, False
+            strategy_move = player.get_move(board)
+            player.strategy.train, player.strategy.model.training = True, True
+
+            test_reward = config.BLACK if expert_move == strategy_move else config.WHITE
+            test_rewards.append(test_reward)
+
+        average_test_reward = sum(test_rewards) / len(test_rewards)
+        del test_rewards[:]
+        self.add_results(("Test reward", average_test_reward))
+
+    def print_progress(self, player, games, average_reward, start):
+        if Printer.print_episode(games, self.games, datetime.now() - start):
+            plot_name = "Supervised Continuous training of %s" % (player)
+            plot_info = "%s Games - Final reward: %s \nTime: %s" % (games, average_reward, config.time_diff(start))
+            self.plot_and_save(plot_name, plot_name + "\n" + plot_info)
+
 
 if __name__ == '__main__':
 
@@ -92,8 +159,9 @@ if __name__ == '__main__':
     LR = random()*1e-9 + 1e-4
 
     EVALUATION_PERIOD = 1000
+    BATCH_SIZE = None  # e.g. 100 to play that many games in lockstep with one update per batch
 
-    experiment = TrainPGSupervisedContinuous(games=GAMES, evaluation_period=EVALUATION_PERIOD)
+    experiment = TrainPGSupervisedContinuous(games=GAMES, evaluation_period=EVALUATION_PERIOD, batch_size=BATCH_SIZE)
     reward = experiment.run(lr=LR)
 
     print("Successfully trained on %s games" % experiment.__plotter__.num_episodes)
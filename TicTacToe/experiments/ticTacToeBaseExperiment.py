@@ -1,10 +1,13 @@
+import numpy as np
 from datetime import datetime
 from abc import ABC
 
 import TicTacToe.config as conf
 from TicTacToe.environment.board import TicTacToeBoard
 from TicTacToe.players.basePlayers import ExperiencedPlayer, RandomPlayer
+from TicTacToe.environment.dataset import SupervisedDataset
 from experiment import Experiment
+from abstractClasses import transform_move
 
 
 class TicTacToeBaseExperiment(Experiment):
@@ -14,12 +17,13 @@ class TicTacToeBaseExperiment(Experiment):
         super(TicTacToeBaseExperiment, self).__init__()
 
     @classmethod
-    def generate_supervised_training_data(cls, games, labeling_strategy):
+    def generate_supervised_training_data(cls, games, labeling_strategy, canonical=False):
         """
         Generates training data by applying random moves to a board and labeling each sample with the move that :param labeling_strategy would have taken given the board.
 
         :param games: The number of games to be simulated
         :param labeling_strategy: The strategy used to label each sample. The label equals labeling_strategy.get_move(board)
+        :param canonical: If set, samples are the canonical forms of the boards, labeled with the move mapped onto them. For LearningPlayers with CANONICAL set
         :return: a list of tuples(board_sample, move_label)
         """
 
@@ -35,7 +39,11 @@ class TicTacToeBaseExperiment(Experiment):
             for i in range(9):
                 # generate training pair
                 expert_move = labeling_strategy.get_move(board)
-                training_set.append((board.copy(), expert_move))
+                if canonical:
+                    sample, symmetry = board.canonical()
+                    training_set.append((sample, transform_move(expert_move, symmetry, board.board_size)))
+                else:
+                    training_set.append((board.copy(), expert_move))
 
                 # prepare for next sample
                 move = generator.get_move(board)
@@ -43,3 +51,18 @@ class TicTacToeBaseExperiment(Experiment):
 
         print("Generated %s training pairs form %s games in %s" % (len(training_set), games, datetime.now() - start))
         return training_set
+
+    @classmethod
+    def load_supervised_training_data(cls, samples, labeling_strategy, canonical=False):
+        """
+        Samples training data from the cached dataset of all reachable boards labeled by :param labeling_strategy, see TicTacToe.environment.dataset.
+
+        Unlike generate_supervised_training_data, boards are drawn uniformly from all positions instead of from random games.
+
+        :param samples: The number of training pairs to draw. All boards of the dataset if None
+        :param labeling_strategy: The strategy used to label the samples
+        :param canonical: If set, samples are canonical forms of the boards
+        :return: a list of tuples(board_sample, move_label)
+        """
+        dataset = SupervisedDataset.load(labeling_strategy, cls.config.BLACK, canonical)
+        return dataset.to_training_set(None if samples is None else np.random.randint(len(dataset), size=samples))
@@ -36,15 +36,40 @@ class PGStrategy(abstract.Strategy):
             self.log_probs.append(log_prob)
         return move
 
-    def update(self):
+    def evaluate_batch(self, board_samples, legal_moves_maps):
+        """
+        Samples one move for each board in a single forward pass. Used with TicTacToe.environment.batch.BatchTicTacToe.
+
+        :param board_samples: (N, board_size, board_size) array of board representations
+        :param legal_moves_maps: (N, board_size, board_size) array of the corresponding legal moves maps
+        :return: a LongTensor of N flat move indices
+        """
+        input = config.make_variable(board_samples)
+        legal_moves_maps = config.make_variable(legal_moves_maps)
+        probs, _ = self.model(input, legal_moves_maps)
+
+        distribution = Categorical(probs)
+        actions = distribution.sample()
+
+        if self.train:
+            self.log_probs.extend(distribution.log_prob(actions).split(1))
+        return actions
+
+    def update(self, returns=None):
+        """
+        :param returns: Optional list holding the already discounted return of every entry of self.log_probs. If None, self.rewards are discounted
+        """
         if not self.train:
             return None
 
-        if len(self.log_probs) != len(self.rewards):
-            raise abstract.PlayerException("log_probs length must be equal to rewards length. Got %s - %s" % (len(self.log_probs), len(self.rewards)))
+        if returns is None:
+            if len(self.log_probs) != len(self.rewards):
+                raise abstract.PlayerException("log_probs length must be equal to rewards length. Got %s - %s" % (len(self.log_probs), len(self.rewards)))
+            returns = self.discount_rewards(self.rewards, self.gamma)
+        elif len(self.log_probs) != len(returns):
+            raise abstract.PlayerException("log_probs length must be equal to returns length. Got %s - %s" % (len(self.log_probs), len(returns)))
 
-        rewards = self.discount_rewards(self.rewards, self.gamma)
-        rewards = config.make_variable(rewards)
+        rewards = config.make_variable(returns)
         # rewards = self.normalize_rewards(rewards)  # For now nothing to normalize, standard deviation = 0
 
         policy_losses = [(-log_prob * reward) for log_prob, reward in zip(self.log_probs, rewards)]
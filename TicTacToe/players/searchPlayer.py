@@ -1,22 +1,62 @@
+from random import choice
+from time import perf_counter
+
 from abstractClasses import Player
 
 import TicTacToe.config as config
 from TicTacToe.environment.board import Board
+from TicTacToe.environment.stateTable import STATE_TABLE
 from TicTacToe.players.search_based_ai import GameArtificialIntelligence
+from move_ordering import MoveOrdering
 
 
 class SearchPlayer(Player):
 
-    def __init__(self, search_depth=9):
+    def __init__(self, search_depth=9, time_per_move=None, time_per_game=None, use_state_table=False):
+        """
+        :param search_depth: The depth to search to. With a time budget, the maximum depth of the iterative deepening
+        :param time_per_move: Seconds per move, None for no limit
+        :param time_per_game: Seconds per game, spread evenly over the remaining own moves. None for no limit
+        :param use_state_table: Flag controlling if the perfect play moves of the precomputed STATE_TABLE replace searches that would reach
+                                the end of the game. Ignored with a time budget, which always searches
+        """
         super(SearchPlayer, self).__init__()
         self.search_depth = search_depth
-        self.ai = GameArtificialIntelligence(evaluate)
+        self.use_state_table = use_state_table
+        self.time_per_move = time_per_move
+        self.time_per_game = time_per_game
+        self.time_left = time_per_game
+        from TicTacToe.players.basePlayers import ExperiencedPlayer  # basePlayers imports this module
+        self.ai = GameArtificialIntelligence(evaluate, move_ordering=MoveOrdering(square_priorities=ExperiencedPlayer.heuristic_table))
 
     def get_move(self, board):
         assert self.color
-        return self.ai.move_search(board, self.search_depth, self.color, board.other_color(self.color))
+        timed = self.time_per_move is not None or self.time_per_game is not None
+        if self.use_state_table and not timed and STATE_TABLE is not None and self.search_depth >= len(board.get_valid_moves()):
+            # The search would reach the end of the game, the precomputed perfect play moves are equivalent
+            return choice(STATE_TABLE.get_optimal_moves(board.code, self.color))
+
+        start = perf_counter()
+        move = self.ai.move_search(board, self.search_depth, self.color, board.other_color(self.color), self.__time_limit__(board))
+        if self.time_left is not None:
+            self.time_left -= perf_counter() - start
+        return move
+
+    def register_winner(self, winner_color):
+        self.time_left = self.time_per_game  # The next game starts with the full budget
+        return super(SearchPlayer, self).register_winner(winner_color)
+
+    def __time_limit__(self, board):
+        """ Seconds available for the next move: time_per_move, capped by an even share of the game budget over the own moves still to come """
+        limits = [] if self.time_per_move is None else [self.time_per_move]
+        if self.time_left is not None:
+            own_moves_left = max((board.board_size**2 - sum(board.count_stones())) // 2, 1)
+            limits.append(max(self.time_left, 0) / own_moves_left)
+        return min(limits) if limits else None
 
     def __str__(self):
+        if self.time_per_move is not None or self.time_per_game is not None:
+            return "[%s time per move %s per game %s]" % (self.__class__.__name__, self.time_per_move, self.time_per_game)
         return "[%s search depth %s]" % (self.__class__.__name__, self.search_depth)
 
 
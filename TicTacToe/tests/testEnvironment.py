@@ -2,14 +2,24 @@ import unittest
 import numpy as np
 import random
 import os
+import sys
+import tempfile
+import subprocess
 from datetime import datetime
 
 import TicTacToe.config as config
 from TicTacToe.environment.game import TicTacToe
 from TicTacToe.environment.board import TicTacToeBoard
+from TicTacToe.environment.bitboard import TicTacToeBitBoard
+from TicTacToe.environment.batch import BatchTicTacToe
+from TicTacToe.environment.dataset import SupervisedDataset
+from TicTacToe.environment.stateTable import STATE_TABLE, build_state_table, encode, decode, COLUMNS
+from abstractClasses import BoardException, LearningPlayer, transform_move, inverse_transform_move, canonical_symmetry
+from TicTacToe.experiments.ticTacToeBaseExperiment import TicTacToeBaseExperiment
 import TicTacToe.players.basePlayers as ttt_players
 from TicTacToe.players.reinforcePlayer import FCReinforcePlayer
 from TicTacToe.environment.evaluation import evaluate_against_base_players
+from TicTacToe.environment.exactEvaluation import exact_evaluate_against_base_players
 from plotting import Plotter
 
 
@@ -49,6 +59,160 @@ class TestEnvironment(unittest.TestCase):
         board.apply_move((2, 0), config.BLACK)
         self.assertEqual(board.game_won(), config.BLACK, msg="Black Won")
 
+    def test_Board_GameWonOnFullBoard(self):
+        board = TicTacToeBoard()
+        for move, color in (((0, 0), config.BLACK), ((1, 0), config.WHITE), ((1, 2), config.BLACK), ((1, 1), config.WHITE), ((2, 0), config.BLACK),
+                            ((2, 1), config.WHITE), ((0, 1), config.BLACK), ((2, 2), config.WHITE)):
+            board.apply_move(move, color)
+        self.assertIsNone(board.game_won())
+        board.apply_move((0, 2), config.BLACK)
+        self.assertEqual(board.game_won(), config.BLACK, msg="Completing a line with the last move is a win, not a draw")
+
+    def test_StateTable(self):
+        table = build_state_table()
+        self.assertEqual(table.shape, (3**9, COLUMNS))
+        self.assertTrue((table == STATE_TABLE.table).all(), msg="Cached state table is outdated")
+
+        self.assertEqual(STATE_TABLE.value(0, config.BLACK), config.EMPTY, msg="Perfect play must end in a draw")
+        self.assertEqual(len(STATE_TABLE.get_optimal_moves(0, config.BLACK)), 9)
+
+        board = TicTacToeBoard()
+        board.apply_move((0, 0), config.BLACK)
+        board.apply_move((0, 1), config.WHITE)
+        self.assertEqual(board.code, encode(board.board))
+        self.assertEqual(STATE_TABLE.value(board.code, config.BLACK), config.BLACK)
+        self.assertEqual(STATE_TABLE.value(board.code, config.WHITE), config.EMPTY)
+
+        for i in range(self.TEST_EPISODES):
+            board, color = TicTacToeBoard(), random.choice((config.BLACK, config.WHITE))
+            while board.game_won() is None:
+                self.assertEqual(board.code, encode(board.board))
+                self.assertEqual(sorted(board.get_valid_moves()), sorted(zip(*np.nonzero(board.board == config.EMPTY))))
+
+                value = STATE_TABLE.value(board.code, color)
+                for move in STATE_TABLE.get_optimal_moves(board.code, color):
+                    board.make_move(move, color)
+                    self.assertEqual(STATE_TABLE.value(board.code, board.other_color(color)), value)
+                    board.unmake_move()
+
+                board.apply_move(random.choice(board.get_valid_moves()), color)
+                color = board.other_color(color)
+
+    def test_CanonicalStates(self):
+        # Games started by BLACK reach 5478 boards with 765 canonical forms
+        codes, stack = set(), [TicTacToeBoard()]
+        while stack:
+            board = stack.pop()
+            if board.code in codes:
+                continue
+            codes.add(board.code)
+            if board.game_won() is None:
+                for move in board.get_valid_moves():
+                    stack.append(board.copy().apply_move(move, board.to_move))
+        self.assertEqual(len(codes), 5478)
+        self.assertEqual(len({STATE_TABLE.canonical_id(code) for code in codes}), 765)
+        self.assertGreaterEqual(min(STATE_TABLE.canonical_id(code) for code in codes), 0)
+        self.assertEqual(STATE_TABLE.canonical_id(encode(np.ones((3, 3)))), -1, msg="Unreachable board has a canonical ID")
+
+        for code in random.sample(sorted(codes), 100):
+            board = TicTacToeBoard().set_board(decode(code))
+            self.assertEqual(board.code, code)
+            canonical, symmetry = board.canonical()
+            self.assertTrue((canonical.board == canonical_symmetry(board.board)[0]).all())
+            self.assertEqual(symmetry, canonical_symmetry(board.board)[1])
+            self.assertEqual(STATE_TABLE.canonical_id(canonical.code), STATE_TABLE.canonical_id(code))
+            for move in board.get_valid_moves():
+                canonical_move = STATE_TABLE.to_canonical_move(move, code)
+                self.assertEqual(canonical.board[canonical_move], config.EMPTY)
+                self.assertEqual(STATE_TABLE.from_canonical_move(canonical_move, code), move)
+
+        LearningPlayer.CANONICAL = True
+        try:
+            player = FCReinforcePlayer(lr=1e-5)
+            results, losses = TicTacToe([player, ttt_players.RandomPlayer()]).run_simulations(self.TEST_EPISODES)
+            self.assertEqual(len(results), self.TEST_EPISODES)
+        finally:
+            LearningPlayer.CANONICAL = False
+
+        training_set = TicTacToeBaseExperiment.generate_supervised_training_data(5, ttt_players.ExperiencedPlayer(), canonical=True)
+        for board, move in training_set:
+            self.assertEqual(board, board.canonical()[0])
+            self.assertEqual(board.board[move], config.EMPTY)
+
+    def test_SupervisedDataset(self):
+        expert = ttt_players.ExperiencedPlayer(deterministic=True, block_mid=True)
+        with tempfile.TemporaryDirectory() as directory:
+            dataset = SupervisedDataset.load(expert, directory=directory)
+            self.assertEqual(len(os.listdir(directory)), 1)
+            self.assertEqual(len(SupervisedDataset.load(ttt_players.ExperiencedPlayer(), directory=directory)), len(dataset))
+            self.assertEqual(len(os.listdir(directory)), 2, msg="Labelers with different attributes share a dataset")
+
+            reloaded = SupervisedDataset.load(expert, directory=directory)
+            self.assertIsInstance(reloaded.boards, np.memmap)
+            self.assertTrue((reloaded.labels == dataset.labels).all())
+
+            self.assertEqual(len({STATE_TABLE.canonical_id(code) for code in dataset.codes}), len(SupervisedDataset.load(expert, canonical=True, directory=directory)))
+
+            for board, move in dataset.to_training_set(range(0, len(dataset), 97)):
+                self.assertIsNone(board.game_won())
+                self.assertEqual(board.board[move], config.EMPTY)
+                self.assertEqual(expert.get_move(board), move)
+
+            boards, legal_moves_maps, labels = dataset.sample(64)
+            self.assertEqual(boards.shape, (64, 3, 3))
+            self.assertTrue(legal_moves_maps.reshape(64, 9)[np.arange(64), labels].all())
+
+            moves = dataset.move_table()
+            for i in range(10):
+                board = TicTacToeBoard()
+                while board.game_won() is None:
+                    move = expert.get_move(board)
+                    self.assertEqual(moves[board.code], move[0] * 3 + move[1])
+                    board.apply_move(random.choice(board.get_valid_moves()), board.to_move)
+
+    def test_Board_ZobristKey(self):
+        board, transposition = TicTacToeBoard(), TicTacToeBoard()
+        for move, color in ((0, 0), config.BLACK), ((1, 1), config.WHITE), ((2, 2), config.BLACK):
+            board.apply_move(move, color)
+        for move, color in ((2, 2), config.BLACK), ((1, 1), config.WHITE), ((0, 0), config.BLACK):
+            transposition.apply_move(move, color)
+
+        self.assertEqual(board.key, transposition.key, msg="Transpositions must have the same key")
+        self.assertEqual(board, transposition)
+        self.assertEqual(len({board, transposition, board.copy()}), 1)
+
+        board.apply_move((0, 1), config.WHITE)
+        transposition.apply_move((0, 1), config.BLACK)
+        self.assertNotEqual(board.key, transposition.key)
+
+        # Same stones, different color to move
+        board, other_board = TicTacToeBoard(), TicTacToeBoard()
+        board.apply_move((0, 0), config.BLACK)
+        board.apply_move((1, 1), config.WHITE)
+        other_board.apply_move((1, 1), config.WHITE)
+        other_board.apply_move((0, 0), config.BLACK)
+        self.assertTrue((board.board == other_board.board).all())
+        self.assertNotEqual(board.key, other_board.key)
+
+    def test_Board_MakeUnmakeMove(self):
+        board = TicTacToeBoard()
+        history = []
+        color = config.BLACK
+        while board.game_won() is None:
+            move = random.choice(board.get_valid_moves(color))
+            history.append(board.copy())
+            board.make_move(move, color)
+            color = board.other_color(color)
+
+        self.assertRaises(BoardException, board.make_move, move, color)
+
+        while history:
+            previous = history.pop()
+            board.unmake_move()
+            self.assertTrue((board.board == previous.board).all(), msg="unmake_move did not restore the board")
+            self.assertEqual(board.key, previous.key)
+        self.assertEqual(board.undo_stack, [])
+
     def test_Board_Representation(self):
         random_player = ttt_players.RandomPlayer()
         boards = []
@@ -71,6 +235,118 @@ class TestEnvironment(unittest.TestCase):
             rep = boards[i].get_representation(config.WHITE)
             self.assertTrue((rep == inverses[i].board).all(), msg="Inverting board failed")
 
+    def test_Board_Symmetries(self):
+        board = TicTacToeBoard()
+        board.apply_move((0, 1), config.BLACK)
+        board.apply_move((1, 2), config.WHITE)
+
+        boards = board.rotate_and_flip()
+        expected = [np.rot90(b, k=i) for b in (board.board, np.fliplr(board.board)) for i in range(4)]
+        for transformed, b in zip(boards, expected):
+            self.assertTrue((transformed.board == b).all())
+            self.assertEqual(transformed.key, TicTacToeBoard().set_board(b.copy()).key)
+
+        for symmetry in range(8):
+            moves = {transform_move(move, symmetry, board.board_size) for move in board.get_valid_moves()}
+            self.assertEqual(moves, set(boards[symmetry].get_valid_moves()))
+            for move in board.get_valid_moves():
+                self.assertEqual(inverse_transform_move(transform_move(move, symmetry, 3), symmetry, 3), move)
+
+        canonicals = [b.canonical() for b in boards]
+        self.assertEqual(len({b.key for b, symmetry in canonicals}), 1, msg="Symmetric boards have different canonical forms")
+        self.assertEqual(canonicals[0][0], boards[canonicals[0][1]])
+
+        batch, symmetries = canonical_symmetry(np.stack([b.board for b in boards]))
+        self.assertTrue((batch == canonicals[0][0].board).all())
+        self.assertEqual(list(symmetries), [symmetry for b, symmetry in canonicals])
+
+    def test_BitBoard_MatchesArrayBoard(self):
+        for i in range(100):
+            board, bitboard = TicTacToeBoard(), TicTacToeBitBoard()
+            color = random.choice((config.BLACK, config.WHITE))
+            while True:
+                self.assertTrue((board.board == bitboard.board).all())
+                self.assertEqual(board.key, bitboard.key)
+                self.assertEqual(board.game_won(), bitboard.game_won())
+                self.assertEqual(sorted(board.get_valid_moves()), bitboard.get_valid_moves())
+                self.assertEqual(board.count_stones(), bitboard.count_stones())
+                if board.game_won() is not None:
+                    break
+
+                move = random.choice(board.get_valid_moves())
+                board.apply_move(move, color)
+                bitboard.apply_move(move, color)
+                color = board.other_color(color)
+
+    def test_BitBoard_MNK(self):
+        board = TicTacToeBitBoard(rows=4, columns=6, win_length=4)
+        self.assertEqual(len(board.get_valid_moves()), 24)
+        for move, color in ((3, 1), config.WHITE), ((0, 0), config.BLACK), ((2, 2), config.WHITE), ((1, 3), config.WHITE):
+            board.make_move(move, color)
+        self.assertIsNone(board.game_won())
+        board.make_move((0, 4), config.WHITE)
+        self.assertEqual(board.game_won(), config.WHITE, msg="Anti diagonal not detected")
+        for i in range(5):
+            board.unmake_move()
+        self.assertEqual(board, TicTacToeBitBoard(rows=4, columns=6, win_length=4))
+
+        board = TicTacToeBitBoard(rows=8, columns=8, win_length=5)
+        for j in range(4):
+            board.apply_move((7, j), config.BLACK)
+            board.apply_move((6, j + 1), config.WHITE)
+        self.assertIsNone(board.game_won())
+        board.apply_move((7, 4), config.BLACK)
+        self.assertEqual(board.game_won(), config.BLACK)
+
+        simulation = TicTacToe([ttt_players.RandomPlayer(), ttt_players.NovicePlayer()], board_type=TicTacToeBitBoard)
+        results, losses = simulation.run_simulations(self.TEST_EPISODES)
+        self.assertEqual(len(results), self.TEST_EPISODES)
+
+    def test_Board_4x4(self):
+        # The board modules read BOARD_SIZE on import, so the game runs in a fresh interpreter with a patched config.
+        # basePlayers only supports 3x3, the game is played with random moves on the board directly
+        script = "\n".join(("import TicTacToe.config as config",
+                            "config.BOARD_SIZE = 4",
+                            "from TicTacToe.environment.board import TicTacToeBoard",
+                            "import random",
+                            "board = TicTacToeBoard()",
+                            "for move, color in ((3, 3), config.BLACK), ((0, 0), config.WHITE):",
+                            "    board.make_move(move, color)",
+                            "board.unmake_move(), board.unmake_move()",
+                            "assert board == TicTacToeBoard() and board.code is None",
+                            "color = config.BLACK",
+                            "while board.game_won() is None:",
+                            "    board.apply_move(random.choice(board.get_valid_moves()), color)",
+                            "    color = board.other_color(color)",
+                            "assert sum(board.count_stones()) >= 5 and board.illegal_move is None"))
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        result = subprocess.run([sys.executable, "-c", script], cwd=root, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, msg=result.stderr)
+
+    def test_BatchTicTacToe(self):
+        batch = BatchTicTacToe(50, seed=0)
+        boards = [TicTacToeBoard() for i in range(50)]
+        for i in range(9):
+            moves = batch.sample_random_moves()
+            for index, board in enumerate(boards):
+                self.assertTrue((board.board.flatten() == batch.boards[index]).all())
+                self.assertEqual(board.code, batch.get_codes()[index])
+                self.assertEqual(board.get_valid_moves() if board.game_won() is None else [],
+                                 [tuple(move) for move in np.argwhere(batch.get_legal_moves_maps()[index])])
+                if board.game_won() is None:
+                    board.apply_move((moves[index] // 3, moves[index] % 3), board.to_move)
+            done, winners = batch.step(moves)
+            for index, board in enumerate(boards):
+                self.assertEqual(board.game_won() is not None, done[index])
+                self.assertEqual(board.game_won() or config.EMPTY, winners[index])
+                self.assertEqual(board, batch.get_board(index))
+        self.assertTrue(batch.done.all())
+
+        batch.reset()
+        batch.step(np.zeros(50, dtype=np.int64))
+        self.assertRaises(BoardException, batch.step, np.zeros((50, 2), dtype=np.int64))
+        self.assertEqual(batch.count_stones()[0].tolist(), [1] * 50)
+
     def test_Board_CountStones(self):
         board = TicTacToeBoard()
         board.apply_move((0, 0), config.BLACK)
@@ -170,6 +446,23 @@ class TestEnvironment(unittest.TestCase):
         p2 = FCReinforcePlayer(lr=1e-5)
         evaluate_against_base_players(p2, silent=False)
 
+    def test_ExactEvaluation(self):
+        # Known probabilities of random play: the first player wins 58.49%, the second 28.81% and 12.70% are draws
+        score, results, overview = exact_evaluate_against_base_players(ttt_players.RandomPlayer(), [ttt_players.RandomPlayer()])
+        self.assertAlmostEqual(score, 0)
+        self.assertAlmostEqual(overview[1][1][config.LABEL_WIN], (0.58492 + 0.28810) / 2, places=4)
+        self.assertAlmostEqual(overview[1][1][config.LABEL_DRAW], 0.12698, places=4)
+
+        score, results, overview = exact_evaluate_against_base_players(ttt_players.ExpertPlayer())
+        self.assertEqual(overview[0][1][config.LABEL_LOSS], 0, msg="Perfect play never loses")
+        self.assertEqual(results[-1][1], 0)
+
+        player = FCReinforcePlayer(lr=1e-5)
+        score, results, overview = exact_evaluate_against_base_players(player, [ttt_players.NovicePlayer()])
+        self.assertTrue(player.strategy.train)
+        self.assertAlmostEqual(sum(overview[1][1].values()), 1)
+        self.assertTrue(-1 <= score <= 1)
+
     def test_getAfterstates(self):
         board = TicTacToeBoard()
         self.assertEqual([(0, 0), (0, 1), (0, 2), (1, 0), (1, 1), (1, 2), (2, 0), (2, 1), (2, 2)], [a[1] for a in board.get_afterstates(config.BLACK)])
@@ -7,7 +7,9 @@ import torch.nn.functional as F
 import TicTacToe.config as config
 from TicTacToe.players.reinforcePlayer import FCReinforcePlayer, PGStrategy
 from TicTacToe.environment.board import TicTacToeBoard
-from TicTacToe.players.basePlayers import RandomPlayer
+from TicTacToe.players.basePlayers import RandomPlayer, NovicePlayer
+from TicTacToe.environment.exactTraining import ExactPolicyGradient
+from TicTacToe.environment.exactEvaluation import exact_evaluate_against_base_players
 from TicTacToe.environment.game import TicTacToe
 from abstractClasses import PlayerException, Model, Strategy
 
@@ -42,6 +44,18 @@ class TestReinforcePlayer(unittest.TestCase):
         simulation = TicTacToe([player1, player2])
         simulation.run_simulations(10)
 
+    def test_ExactPolicyGradient(self):
+        player = FCReinforcePlayer(lr=0.001)
+        opponents = [RandomPlayer(), NovicePlayer()]
+        trainer = ExactPolicyGradient(player, opponents)
+        initial_score = exact_evaluate_against_base_players(player, opponents)[0]
+        self.assertAlmostEqual(trainer.update(), initial_score)
+
+        for i in range(20):
+            trainer.update()
+        self.assertAlmostEqual(float(trainer.expected_score()), exact_evaluate_against_base_players(player, opponents)[0])
+        self.assertGreater(float(trainer.expected_score()), initial_score)
+
     def test_LegalSoftMax(self):
         def transform(x):
             return [Variable(torch.DoubleTensor((x*3)).view(-1, 9))]
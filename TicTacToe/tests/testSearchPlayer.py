@@ -1,13 +1,23 @@
 import unittest
+import random
 import numpy as np
 import torch
+from queue import PriorityQueue
 
 import TicTacToe.config as config
 from TicTacToe.environment.board import TicTacToeBoard
-from TicTacToe.players.basePlayers import RandomPlayer
+from TicTacToe.players.basePlayers import RandomPlayer, ExperiencedPlayer
 from TicTacToe.environment.game import TicTacToe
 
-from TicTacToe.players.searchPlayer import SearchPlayer
+from TicTacToe.players.searchPlayer import SearchPlayer, evaluate
+from TicTacToe.players.search_based_ai import GameArtificialIntelligence, ALPHA_BETA, PRINCIPAL_VARIATION
+import search_based_ai
+from transposition_table import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+from move_ordering import MoveOrdering
+from search_cache import SearchCache
+from abstractClasses import BoardArena
+from mcts import MCTSPlayer, MonteCarloTreeSearch
+from TicTacToe.players.acPlayer import FCACPlayer
 
 CORNERS = [(0, 0), (0, 2), (2, 0), (2, 2)]
 SIDES   = [(1, 0), (0, 1), (1, 2), (2, 1)]
@@ -18,6 +28,25 @@ class TestSearchPlayer(unittest.TestCase):
     def test_createPlayer(self):
         SearchPlayer()
 
+    def test_StateTableShortcut(self):
+        board = TicTacToeBoard().apply_move((1, 1), config.BLACK)
+        for use_state_table in False, True:
+            player = SearchPlayer(use_state_table=use_state_table)
+            player.color = config.WHITE
+            self.assertIn(player.get_move(board), CORNERS)
+            self.assertEqual(player.ai.visited_nodes == 0, use_state_table, msg="The state table must only replace the search if enabled")
+
+        # Timed players always search within their budget
+        player = SearchPlayer(time_per_move=5, time_per_game=20, use_state_table=True)
+        player.color = config.WHITE
+        time_limits = []
+        move_search = player.ai.move_search
+        player.ai.move_search = lambda *args: time_limits.append(args[-1]) or move_search(*args)
+        self.assertIn(player.get_move(board), CORNERS)
+        self.assertEqual(len(time_limits), 1)
+        self.assertLessEqual(time_limits[0], 5)
+        self.assertLess(player.time_left, 20, msg="The move was not charged to the game budget")
+
     def test_neverLose(self):
         GAMES = 10000
 
@@ -37,5 +66,189 @@ class TestSearchPlayer(unittest.TestCase):
         print("Win rate: %s vs random player" % (sum(results) / len(results)))
 
 
+    def test_TranspositionTable(self):
+        table = TranspositionTable(size=1000)
+        self.assertEqual(table.size, 1024)
+        self.assertIsNone(table.probe(5))
+
+        table.store(5, 3, EXACT, 10, (1, 1))
+        self.assertEqual(table.probe(5), (3, EXACT, 10, (1, 1)))
+        self.assertIsNone(table.probe(5 + 1024), msg="Colliding keys must not share entries")
+
+        table.store(5 + 1024, 2, LOWER_BOUND, 20, (0, 0))
+        self.assertEqual(table.probe(5), (3, EXACT, 10, (1, 1)), msg="Deeper entry replaced by a shallower one")
+        table.store(5, 1, UPPER_BOUND, 0)
+        self.assertEqual(table.probe(5), (1, UPPER_BOUND, 0, (1, 1)), msg="Best move of the position is not kept")
+
+        table.new_search()
+        table.store(5 + 1024, 0, EXACT, 20, (0, 0))
+        self.assertEqual(table.probe(5 + 1024), (0, EXACT, 20, (0, 0)), msg="Entry of an earlier search is not replaced")
+        self.assertEqual((table.probes, table.hits), (6, 4))
+
+        self.assertEqual(TranspositionTable.bound(0, 0, 10), UPPER_BOUND)
+        self.assertEqual(TranspositionTable.bound(10, 0, 10), LOWER_BOUND)
+        self.assertEqual(TranspositionTable.bound(5, 0, 10), EXACT)
+
+    def test_TranspositionTableSearch(self):
+        for i in range(20):
+            board, color = TicTacToeBoard(), config.BLACK
+            for j in range(random.randint(0, 5)):
+                board.apply_move(random.choice(board.get_valid_moves()), color)
+                color = board.other_color(color)
+            if board.game_won() is not None:
+                continue
+
+            scores = []
+            for probe in True, False:
+                ai = SearchPlayer().ai
+                if not probe:
+                    ai.transposition_table.probe = lambda key: None
+                ai.player, ai.other_player, ai.queue = color, board.other_color(color), PriorityQueue(9)
+                scores.append(ai.alpha_beta_wrapper(board.copy(), 9, color, board.other_color(color))[1])
+            self.assertEqual(scores[0], scores[1], msg="Transposition table changed the search result")
+            self.assertGreater(ai.transposition_table.stores, 0)
+
+        player = SearchPlayer()
+        player.color = config.BLACK
+        player.get_move(TicTacToeBoard())
+        self.assertGreater(player.ai.transposition_table.stores, 0, msg="get_move does not search with the transposition table")
+        self.assertGreater(player.ai.move_ordering.nodes, 0, msg="get_move does not search with the move ordering")
+
+    def test_MoveOrdering(self):
+        ordering = MoveOrdering(square_priorities=[[1, 0, 1], [0, 2, 0], [1, 0, 1]])
+        moves = [(0, 1), (0, 0), (1, 1), (2, 2)]
+        self.assertEqual(ordering.order(moves, 1, config.BLACK), [(1, 1), (0, 0), (2, 2), (0, 1)])
+
+        ordering.searched((0, 0), 1, config.BLACK, 3, 2, True)
+        ordering.searched((2, 2), 1, config.BLACK, 1, 3, True)
+        self.assertEqual(ordering.order(moves, 1, config.BLACK), [(2, 2), (0, 0), (1, 1), (0, 1)], msg="Killers are not searched first")
+        self.assertEqual(ordering.order(moves, 2, config.BLACK), [(0, 0), (2, 2), (1, 1), (0, 1)], msg="History is not used")
+        self.assertEqual(ordering.order(moves, 1, config.BLACK, (0, 1))[0], (0, 1), msg="Table move is not searched first")
+        self.assertEqual(ordering.statistics()["cutoffs"], 2)
+
+        ordering.new_search()
+        self.assertEqual(ordering.order(moves, 1, config.WHITE), [(1, 1), (0, 0), (2, 2), (0, 1)])
+
+    def test_MoveOrderingSearch(self):
+        visited = []
+        for move_ordering in MoveOrdering(False, 0, False), MoveOrdering(square_priorities=ExperiencedPlayer.heuristic_table):
+            ai = GameArtificialIntelligence(evaluate, move_ordering=move_ordering)
+            ai.player, ai.other_player, ai.queue = config.BLACK, config.WHITE, PriorityQueue(9)
+            moves = TicTacToeBoard().get_valid_moves()
+            scores = []
+            for move in moves:
+                board = TicTacToeBoard().apply_move(move, config.BLACK)
+                scores.append(ai.alpha_beta_search(board, 8, config.WHITE, config.BLACK, maximizing=False))
+            visited.append((scores, ai.statistics()["visited_nodes"]))
+
+        self.assertEqual(visited[0][0], visited[1][0], msg="Move ordering changed the search result")
+        self.assertLess(visited[1][1], visited[0][1])
+        print("\nVisited nodes without move ordering: %s, with: %s" % (visited[0][1], visited[1][1]))
+
+
+    def test_PrincipalVariationSearch(self):
+        for i in range(20):
+            board, color = TicTacToeBoard(), config.BLACK
+            for j in range(random.randint(0, 5)):
+                board.apply_move(random.choice(board.get_valid_moves()), color)
+                color = board.other_color(color)
+            if board.game_won() is not None:
+                continue
+
+            scores = []
+            for search in ALPHA_BETA, PRINCIPAL_VARIATION:
+                # Depth limited, so that iterations differ and the aspiration windows are used
+                ai = search_based_ai.GameArtificialIntelligence(evaluate, search=search, aspiration_window=10)
+                ai.move_search(board.copy(), 9, color, board.other_color(color), time_limit=float("inf"))
+                scores.append(ai.best_score)
+            self.assertEqual(scores[0], scores[1], msg="Principal variation search changed the search result")
+
+            ai.queue = PriorityQueue(9)
+            bound = ai.principal_variation_wrapper(board.copy(), 9, color, board.other_color(color), scores[1] + 1, scores[1] + 2)[1]
+            self.assertTrue(scores[1] <= bound <= scores[1] + 1, msg="Failing low must return an upper bound")
+
+    def test_IterativeDeepeningStops(self):
+        ai = GameArtificialIntelligence(evaluate)
+        ai.move_search(TicTacToeBoard(), 9, config.BLACK, config.WHITE, time_limit=float("inf"))
+        self.assertEqual(ai.completed_depth, 1, msg="Searches to the end of the game are exact after the first iteration")
+
+        # The shared search stops at the depth limit, four empty squares need at most four iterations
+        for i in range(10):
+            board, color = TicTacToeBoard(), config.BLACK
+            while len(board.get_valid_moves()) > 4:
+                board.apply_move(random.choice(board.get_valid_moves()), color)
+                color = board.other_color(color)
+            if board.game_won() is None:
+                ai = search_based_ai.GameArtificialIntelligence(evaluate)
+                ai.move_search(board, 9, color, board.other_color(color), time_limit=float("inf"))
+                self.assertLessEqual(ai.completed_depth, 4, msg="Iterative deepening continued beyond the end of the game")
+
+        board = TicTacToeBoard()
+        for move, color in ((0, 0), config.BLACK), ((1, 0), config.WHITE), ((0, 1), config.BLACK), ((1, 1), config.WHITE):
+            board.apply_move(move, color)
+        ai = search_based_ai.GameArtificialIntelligence(evaluate, win_score=100)
+        self.assertEqual(ai.move_search(board, 9, config.BLACK, config.WHITE, time_limit=float("inf")), (0, 2))
+        self.assertEqual(ai.completed_depth, 1, msg="Iterative deepening continued after finding a win")
+
+    def test_MCTSPlayer(self):
+        player = MCTSPlayer(simulations=1000)
+        player.color = config.BLACK
+        player.mcts = MonteCarloTreeSearch(player.evaluate, capacity=4)  # Forces the node and edge arrays to grow
+
+        board = TicTacToeBoard().set_board(np.array([[1, 1, 0], [-1, -1, 0], [0, 0, 0]], dtype=np.int8))
+        self.assertEqual(player.get_move(board), (0, 2), msg="Immediate win not found")
+        board = TicTacToeBoard().set_board(np.array([[1, 0, 0], [-1, -1, 0], [1, 0, 0]], dtype=np.int8))
+        self.assertEqual(player.get_move(board), (1, 2), msg="Threat not blocked")
+        self.assertEqual(sum(visits for move, visits in player.mcts.root_distribution()), 999)
+        self.assertGreater(player.mcts.num_nodes, 4)
+
+        for player in MCTSPlayer(FCACPlayer(lr=1e-5), simulations=200), MCTSPlayer(FCACPlayer(lr=1e-5), simulations=100, rollouts=True):
+            simulation = TicTacToe([player, RandomPlayer()])
+            results, losses = simulation.run_simulations(4)
+            self.assertEqual(len(results), 4)
+
+    def test_SearchCache(self):
+        cache = SearchCache(max_bytes=10**6)
+        entry_bytes = SearchCache.__size__((2**62, 9), ((1, 1), 50, 9))
+        cache.max_bytes = 3 * entry_bytes
+        for key in range(4):
+            cache.put((2**62 + key, 9), ((1, 1), 50, 9))
+        self.assertEqual(len(cache), 3)
+        self.assertIsNone(cache.get((2**62, 9)), msg="Least recently used entry not evicted")
+        self.assertEqual(cache.get((2**62 + 1, 9)), ((1, 1), 50, 9))
+        cache.put((2**62 + 4, 9), ((1, 1), 50, 9))
+        self.assertIsNotNone(cache.get((2**62 + 1, 9)), msg="Recently used entry evicted")
+        self.assertLessEqual(cache.bytes, cache.max_bytes)
+        self.assertEqual((cache.hits, cache.misses, cache.evictions), (2, 1, 2))
+
+        ai = GameArtificialIntelligence(evaluate)
+        board = TicTacToeBoard().apply_move((1, 1), config.BLACK)
+        move = ai.move_search(board, 9, config.WHITE, config.BLACK)
+        self.assertEqual(ai.move_search(board.copy(), 9, config.WHITE, config.BLACK), move, msg="Equal boards do not share results")
+        ai.move_search(board, 9, config.BLACK, config.WHITE)
+        self.assertEqual((ai.search_cache.hits, ai.search_cache.misses), (1, 2), msg="Colors share results")
+
+        # Timed searches neither use nor fill the cache, an infinite budget keeps the check independent of the machine's speed
+        entries = len(ai.search_cache)
+        ai.move_search(board.copy(), 9, config.WHITE, config.BLACK, time_limit=float("inf"))
+        self.assertEqual((ai.search_cache.hits, ai.search_cache.misses, len(ai.search_cache)), (1, 2, entries), msg="Timed search used the cache")
+
+        # The cache holds position keys only, an arena board reused for another position must not hit the entry of its old one
+        arena = BoardArena(TicTacToeBoard, 1)
+        board = arena.acquire().apply_move((0, 0), config.BLACK)
+        ai.move_search(board, 9, config.WHITE, config.BLACK)
+        board.release()
+        reused = arena.acquire().apply_move((0, 1), config.BLACK)
+        self.assertIs(reused, board)
+        hits = ai.search_cache.hits
+        ai.move_search(reused, 9, config.WHITE, config.BLACK)
+        self.assertEqual(ai.search_cache.hits, hits, msg="Released board hit the entry of its old position")
+        ai.move_search(TicTacToeBoard().apply_move((0, 0), config.BLACK), 9, config.WHITE, config.BLACK)
+        self.assertEqual(ai.search_cache.hits, hits + 1)
+
+        SearchCache.clear_all()
+        self.assertEqual((len(cache), len(ai.search_cache)), (0, 0))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -12,6 +12,9 @@ class Board(ABC):
     """
     Represents an interface for the board of any game board used in this package.
     """
+    arena = None  # The BoardArena this board was handed out by, copies are drawn from it as well
+    arena_index = None
+
     @abstractmethod
     def get_valid_moves(self, color):
         """ Returns a list of valid moves for the player represented with :param color.
@@ -34,6 +37,26 @@ class Board(ABC):
         """
         pass
 
+    def make_move(self, move, color):
+        """
+        Applies a legal move in place and records everything needed to take it back on the board's undo stack.
+
+        Used by search to walk the game tree without allocating a board per node.
+
+        :param move: The move to be applied. Raises a BoardException if the move is illegal
+        :param color: The color used to represent the player which performs the move
+        :return: None
+        """
+        raise NotImplementedError("%s does not support make_move" % self.__class__.__name__)
+
+    def unmake_move(self):
+        """
+        Takes back the last move applied with make_move, restoring the exact previous state.
+
+        :return: None
+        """
+        raise NotImplementedError("%s does not support unmake_move" % self.__class__.__name__)
+
     @abstractmethod
     def game_won(self):
         """
@@ -44,11 +67,12 @@ class Board(ABC):
         pass
 
     @abstractmethod
-    def get_representation(self, color):
+    def get_representation(self, color, out=None):
         """
         Generates a representation of the board in which black is always the current player.
 
         :param color: The color used to represent the player in game
+        :param out: Optional array of the board's shape to write the representation into instead of allocating a new one
         :return: A copy of the (modified) game state
         """
         pass
@@ -74,6 +98,22 @@ class Board(ABC):
         """
         pass
 
+    def copy_into(self, board):
+        """
+        Overwrites the state of :param board with the state of this board, reusing its storage. Used by BoardArena.
+
+        :param board: A board of the same type
+        :return: :param board
+        """
+        raise NotImplementedError("%s does not support copy_into" % self.__class__.__name__)
+
+    def release(self):
+        """
+        Hands the board back to the arena it was drawn from. The board must not be used afterwards. Does nothing for boards not drawn from an arena.
+        """
+        if self.arena is not None:
+            self.arena.release(self)
+
     @staticmethod
     def other_color(color):
         """
@@ -84,17 +124,57 @@ class Board(ABC):
         """
         return __other_color__(color)
 
+    def set_board(self, board):
+        """
+        Replaces the position with the array :param board and recomputes all state derived from it such as the key.
+
+        The stones are copied into the board's existing representation, e.g. its array or its bit masks, so storage owned by a BoardArena
+        stays with the board. to_move is left unchanged and the undo stack is not cleared.
+
+        :param board: An array in the format of self.board
+        :return: self
+        """
+        self.board[:] = board
+        return self
+
+    def transform(self, symmetry):
+        """
+        Returns a copy of the board mapped by one of the 8 symmetries of the square, see symmetry_tables.
+
+        :param symmetry: Index of the symmetry, 0 is the identity
+        :return: a new board holding the transformed position
+        """
+        return self.copy().set_board(apply_symmetry(self.board, symmetry))
+
     def rotate_and_flip(self):
-        boards = []
+        """
+        :return: a list of the board transformed by all 8 symmetries, the original board first
+        """
+        return [self.copy().set_board(b) for b in apply_symmetry(self.board, slice(None))]
+
+    def canonical(self):
+        """
+        Finds the symmetric form of the position that is lexicographically smallest. Symmetric positions share the same canonical form.
 
-        for b in deepcopy(self.board), np.fliplr(deepcopy(self.board)):
-            for i in range(4):
-                board = self.__class__()
-                board.board = np.rot90(m=b, k=i)
-                boards.append(board)
+        :return: a tuple (board, symmetry) of the canonical board and the index of the symmetry mapping this board onto it
+        """
+        board, symmetry = canonical_symmetry(self.board)
+        return self.copy().set_board(board), int(symmetry)
+
+    @property
+    def key(self):
+        """
+        64 bit Zobrist key of the position including the color to move. Maintained incrementally by apply_move.
+
+        :return: the key as a python int
+        """
+        return self.__key__
+
+    def __eq__(self, other):
+        return self.key == other.key
 
-        assert (boards[0].board == self.board).all()
-        return boards
+    def __hash__(self):
+        return self.key
 
     def __lt__(self, other):
         return random()
@@ -111,6 +191,164 @@ def __other_color__(color):
         raise BoardException("Illegal color provided: %s" % color)
 
 
+def generate_zobrist_keys(tiles, seed=0):
+    """
+    Generates the random keys used for Zobrist hashing.
+
+    :param tiles: The number of tiles on the board
+    :param seed: Seed of the generator so that keys are reproducible between runs
+    :return: a tuple (tile_keys, side_key) where tile_keys is a (2, tiles) uint64 array holding the keys of a BLACK (row 0) and a WHITE (row 1) stone on each tile
+             and side_key is xor-ed into the key whenever WHITE is to move
+    """
+    random_state = np.random.RandomState(seed)
+    keys = np.frombuffer(random_state.bytes(8 * (2 * tiles + 1)), dtype=np.uint64)
+    return keys[:-1].reshape(2, tiles).copy(), keys[-1]
+
+
+def zobrist_key(board, to_move, tile_keys, side_key):
+    """
+    Computes the Zobrist key of a board from scratch. Boards use this only on creation and update their key incrementally afterwards.
+
+    :param board: The board array
+    :param to_move: The color to move
+    :param tile_keys: The tile keys as created by generate_zobrist_keys
+    :param side_key: The side key as created by generate_zobrist_keys
+    :return: the key as a python int
+    """
+    flat = board.flatten()
+    key = int(np.bitwise_xor.reduce(tile_keys[0][flat == config.BLACK]) ^ np.bitwise_xor.reduce(tile_keys[1][flat == config.WHITE]))
+    if to_move == config.WHITE:
+        key ^= int(side_key)
+    return key
+
+
+SYMMETRY_TABLES = {}
+
+
+def symmetry_tables(board_size):
+    """
+    Index permutations of the 8 symmetries of a square board (rotations by k * 90 degrees, then the same for the horizontally flipped board).
+
+    Tables are built once per board size and cached.
+
+    :param board_size: The board size (NxN)
+    :return: a tuple (permutations, inverses) of (8, board_size**2) int arrays. permutations[t][i] is the flat tile of the original board
+             that ends up on flat tile i of the board transformed by t, inverses[t][i] is the flat tile that original tile i ends up on
+    """
+    if board_size not in SYMMETRY_TABLES:
+        indices = np.arange(board_size**2).reshape(board_size, board_size)
+        permutations = np.array([np.rot90(b, k=i).flatten() for b in (indices, np.fliplr(indices)) for i in range(4)])
+        SYMMETRY_TABLES[board_size] = permutations, np.argsort(permutations, axis=1)
+    return SYMMETRY_TABLES[board_size]
+
+
+def apply_symmetry(arrays, symmetry):
+    """
+    Transforms boards, legal move maps or any other (..., N, N) arrays with a single gather.
+
+    :param arrays: An (N, N) array or a batch of shape (..., N, N)
+    :param symmetry: Index of the symmetry, or a slice / index array selecting several
+    :return: The transformed arrays of shape (..., N, N). If several symmetries were selected, of shape (..., k, N, N)
+    """
+    board_size = arrays.shape[-1]
+    permutation = symmetry_tables(board_size)[0][symmetry]
+    flat = arrays.reshape(arrays.shape[:-2] + (board_size**2,))
+    return flat[..., permutation].reshape(arrays.shape[:-2] + permutation.shape[:-1] + (board_size, board_size))
+
+
+def transform_move(move, symmetry, board_size):
+    """ Returns the coordinates :param move ends up on when the board is transformed by :param symmetry """
+    position = symmetry_tables(board_size)[1][symmetry][move[0] * board_size + move[1]]
+    return position // board_size, position % board_size
+
+
+def inverse_transform_move(move, symmetry, board_size):
+    """ Maps :param move on a board transformed by :param symmetry back onto the original board """
+    position = symmetry_tables(board_size)[0][symmetry][move[0] * board_size + move[1]]
+    return position // board_size, position % board_size
+
+
+def canonical_symmetry(arrays):
+    """
+    Finds the lexicographically smallest symmetric form of boards. Ties are broken towards the lower symmetry index, the identity if a board is symmetric.
+
+    :param arrays: An (N, N) board or a batch of shape (..., N, N)
+    :return: a tuple (canonical, symmetries) of the canonical boards in the shape of :param arrays and the indices of the symmetries mapping each board onto them
+    """
+    forms = apply_symmetry(arrays, slice(None))
+    flat = forms.reshape(forms.shape[:-2] + (-1,)).astype(np.int16)
+
+    candidates = np.ones(flat.shape[:-1], dtype=np.bool_)
+    for i in range(flat.shape[-1]):
+        column = np.where(candidates, flat[..., i], np.iinfo(np.int16).max)
+        candidates &= column == column.min(axis=-1, keepdims=True)
+        if (candidates.sum(axis=-1) == 1).all():
+            break
+
+    symmetries = candidates.argmax(axis=-1)
+    canonical = np.take_along_axis(forms, symmetries[..., None, None, None], axis=-3)[..., 0, :, :]
+    return canonical, symmetries
+
+
+class BoardArena:
+    """
+    Pool of reusable boards, allocated on demand up to a fixed capacity.
+
+    Boards are handed out by acquire and taken back by release or release_all, their arrays are reused instead of allocating new boards.
+    A new board is only allocated if no released board is available, so the pool grows to the peak number of boards in use.
+    Copies of a board drawn from the arena are drawn from the arena as well. Once capacity boards are in use, acquire falls back to
+    allocating a regular board and counts the overflow.
+    """
+    def __init__(self, board_type, capacity):
+        self.board_type = board_type
+        self.capacity = capacity
+        self.initial = board_type()  # Never handed out, source of the starting position
+        self.boards = []
+
+        self.in_use = np.zeros(capacity, dtype=np.bool_)
+        self.free = []
+        self.overflows = 0
+
+    def acquire(self, board=None):
+        """
+        Hands out a board.
+
+        :param board: The board whose state is copied into the handed out board. The starting position if None
+        :return: a board of type board_type owned by the arena
+        """
+        if self.free:
+            index = self.free.pop()
+        elif len(self.boards) < self.capacity:
+            index = len(self.boards)
+            self.boards.append(self.board_type())
+            self.boards[index].arena, self.boards[index].arena_index = self, index
+        else:
+            index = None
+            self.overflows += 1
+            target = self.board_type()
+            target.arena = self
+
+        if index is not None:
+            self.in_use[index] = True
+            target = self.boards[index]
+        return (board if board is not None else self.initial).copy_into(target)
+
+    def release(self, board):
+        """ Takes back a single board handed out by acquire. Releasing a board twice or an overflow board has no effect """
+        if board.arena_index is not None and self.in_use[board.arena_index]:
+            self.in_use[board.arena_index] = False
+            self.free.append(board.arena_index)
+
+    def release_all(self):
+        """ Takes back all boards at once, e.g. when a game or search has finished """
+        self.in_use[:] = False
+        self.free = list(reversed(range(len(self.boards))))
+
+    def __len__(self):
+        """ The number of boards currently handed out """
+        return len(self.boards) - len(self.free)
+
+
 class BoardException(Exception):
     """
     BoardException is raised if Board encounters an illegal state.
@@ -178,6 +416,7 @@ class Player(ABC):
 class LearningPlayer(Player):
 
     ROTATE_AND_FLIP = True
+    CANONICAL = False  # Evaluate the canonical form of every board and map the move back. Makes ROTATE_AND_FLIP redundant
 
     def __init__(self, strategy):
         super(LearningPlayer, self).__init__()
@@ -188,11 +427,21 @@ class LearningPlayer(Player):
             raise Exception("ReinforcePlayer takes as a strategy argument a subclass of %s, received %s" % (Model, strategy))
 
     def get_move(self, board):
+        if self.CANONICAL:
+            if self.strategy.train:
+                self.strategy.rewards.append(0)
+            canonical, symmetry = board.canonical()
+            move = self.strategy.evaluate(canonical.get_representation(self.color), canonical.get_legal_moves_map(self.color))
+            canonical.release()
+            return inverse_transform_move((int(move[0]), int(move[1])), symmetry, board.board_size)
+
         if self.strategy.train:
             self.strategy.rewards.append(0)
             if self.ROTATE_AND_FLIP:
-                for b in board.rotate_and_flip()[1:]:  # Do for all symmetries except for the original
-                    self.strategy.evaluate(b.get_representation(self.color), board.get_legal_moves_map(self.color))
+                representations = apply_symmetry(board.get_representation(self.color), slice(1, None))  # All symmetries except for the original
+                legal_moves_maps = apply_symmetry(board.get_legal_moves_map(self.color), slice(1, None))
+                for representation, legal_moves_map in zip(representations, legal_moves_maps):
+                    self.strategy.evaluate(representation, legal_moves_map)
                     self.strategy.rewards.append(0)
 
         return self.strategy.evaluate(board.get_representation(self.color), board.get_legal_moves_map(self.color))
@@ -0,0 +1,246 @@
+"""
+Monte Carlo Tree Search for the Othello and TicTacToe boards, see MCTSPlayer.
+"""
+import random
+from math import sqrt
+from time import perf_counter
+
+import numpy as np
+import torch
+
+import TicTacToe.config as config
+from abstractClasses import Player, LearningPlayer, PlayerException
+
+PASS = -1  # Move of an edge on which the color to move has to pass
+
+
+class MonteCarloTreeSearch:
+    """
+    PUCT tree search with array-backed node storage.
+
+    Nodes and edges live in flat numpy arrays instead of one Python object per node. A node owns the contiguous block of edges
+    [first_edge, first_edge + edge_count), one per valid move, which hold the visit counts, value sums and priors of the moves.
+    Values are summed from the perspective of the color making the move of the edge. Boards are not stored: every simulation
+    replays the moves of its path on a single board and takes them back afterwards.
+
+    All arrays double in size when they are full, so the memory is bounded by the number of simulations.
+    """
+    def __init__(self, evaluator, c_puct=1.5, capacity=2**10):
+        """
+        :param evaluator: Function (board, color, moves) -> (priors, value) for a position that is not over. priors is an array holding
+                          the probability of every move in :param moves, value the expected outcome in [-1, 1] for :param color
+        :param c_puct: The weight of the prior in the selection, higher values explore more
+        :param capacity: The number of nodes allocated up front
+        """
+        self.evaluator = evaluator
+        self.c_puct = c_puct
+
+        self.first_edge = np.zeros(capacity, dtype=np.int64)
+        self.edge_count = np.zeros(capacity, dtype=np.int32)  # -1 for nodes that are not expanded yet, 0 for terminal nodes
+        self.node_visits = np.zeros(capacity, dtype=np.int64)
+        self.to_move = np.zeros(capacity, dtype=np.int8)
+
+        self.moves = np.zeros(capacity * 8, dtype=np.int16)  # Flat tile index i * board_size + j or PASS
+        self.priors = np.zeros(capacity * 8, dtype=np.float32)
+        self.visits = np.zeros(capacity * 8, dtype=np.int32)
+        self.values = np.zeros(capacity * 8, dtype=np.float64)
+        self.children = np.zeros(capacity * 8, dtype=np.int64)  # -1 until the child is visited
+        self.reset()
+
+    def reset(self):
+        """ Discards the tree """
+        self.num_nodes, self.num_edges = 0, 0
+
+    def search(self, board, color, simulations=None, time_limit=None):
+        """
+        Grows a new tree from :param board. At least one of the budgets must be set, the search stops at whichever is exhausted first.
+
+        :param board: The root position. Moves are applied to it and taken back again, it is unchanged once the search returns
+        :param color: The color to move
+        :param simulations: The number of simulations, None for no limit
+        :param time_limit: Seconds the search may take, None for no limit
+        :return: the number of simulations run
+        """
+        if simulations is None and time_limit is None:
+            raise PlayerException("MonteCarloTreeSearch needs a simulation or a time budget")
+
+        self.reset()
+        self.board_size = board.board_size
+        root = self.__add_node__(color)
+        deadline = None if time_limit is None else perf_counter() + time_limit
+
+        count = 0
+        while (simulations is None or count < simulations) and (deadline is None or perf_counter() < deadline):
+            self.__simulate__(board, root)
+            count += 1
+        return count
+
+    def root_distribution(self):
+        """ :return: a list of tuples (move, visits) for all moves of the root, move is None for a pass """
+        start, count = self.first_edge[0], max(self.edge_count[0], 0)
+        return [(self.__to_move__(self.moves[e]), int(self.visits[e])) for e in range(start, start + count)]
+
+    def best_move(self):
+        """ :return: the most visited move of the root, ties broken randomly """
+        distribution = self.root_distribution()
+        most_visits = max(visits for move, visits in distribution)
+        return random.choice([move for move, visits in distribution if visits == most_visits])
+
+    def __simulate__(self, board, node):
+        path, played = [], 0
+        while self.edge_count[node] > 0:
+            edge = self.__select__(node)
+            path.append((node, edge))
+            move, color = int(self.moves[edge]), int(self.to_move[node])
+            if move != PASS:
+                board.make_move((move // self.board_size, move % self.board_size), color)
+                played += 1
+
+            if self.children[edge] == -1:
+                self.children[edge] = self.__add_node__(board.other_color(color))
+            node = self.children[edge]
+
+        value = self.__expand__(board, node)  # From the perspective of the color to move in the leaf
+        for parent, edge in path:
+            self.node_visits[parent] += 1
+            self.visits[edge] += 1
+            self.values[edge] += value if self.to_move[parent] == self.to_move[node] else -value
+        self.node_visits[node] += 1
+
+        for i in range(played):
+            board.unmake_move()
+
+    def __select__(self, node):
+        """ :return: the edge maximizing Q + c_puct * P * sqrt(N(node)) / (1 + N(edge)). Unvisited edges have Q = 0 """
+        edges = slice(self.first_edge[node], self.first_edge[node] + self.edge_count[node])
+        visits = self.visits[edges]
+        scores = self.values[edges] / np.maximum(visits, 1) + self.c_puct * sqrt(self.node_visits[node]) * self.priors[edges] / (1 + visits)
+        return self.first_edge[node] + int(np.argmax(scores))
+
+    def __expand__(self, board, node):
+        """ Adds the edges of :param node unless it is terminal. :return: the value of the node for its color to move """
+        color = int(self.to_move[node])
+        winner = board.game_won()
+        if winner is not None:
+            self.edge_count[node] = 0
+            return __outcome__(board, winner, color)
+
+        moves = list(board.get_valid_moves(color))
+        if moves:
+            priors, value = self.evaluator(board, color, moves)
+            tiles = [move[0] * self.board_size + move[1] for move in moves]
+        else:
+            priors, value, tiles = np.ones(1), -self.evaluator(board, board.other_color(color), list(board.get_valid_moves(board.other_color(color))))[1], [PASS]
+
+        start = self.num_edges
+        self.__reserve__(len(tiles))
+        end = start + len(tiles)
+        self.moves[start:end] = tiles
+        self.priors[start:end] = priors
+        self.visits[start:end] = 0
+        self.values[start:end] = 0
+        self.children[start:end] = -1
+        self.first_edge[node], self.edge_count[node] = start, len(tiles)
+        self.num_edges = end
+        return value
+
+    def __add_node__(self, color):
+        if self.num_nodes == len(self.first_edge):
+            for name in ("first_edge", "edge_count", "node_visits", "to_move"):
+                setattr(self, name, np.resize(getattr(self, name), 2 * self.num_nodes))
+        node = self.num_nodes
+        self.first_edge[node], self.edge_count[node], self.node_visits[node], self.to_move[node] = 0, -1, 0, color
+        self.num_nodes += 1
+        return node
+
+    def __reserve__(self, count):
+        if self.num_edges + count > len(self.moves):
+            size = 2 * max(len(self.moves), count)
+            for name in ("moves", "priors", "visits", "values", "children"):
+                setattr(self, name, np.resize(getattr(self, name), size))
+
+    def __to_move__(self, tile):
+        return None if tile == PASS else (int(tile) // self.board_size, int(tile) % self.board_size)
+
+
+class MCTSPlayer(Player):
+    """
+    Plays the most visited move of a Monte Carlo Tree Search.
+
+    With a LearningPlayer, priors come from its policy head and leaf values from its vf head, or from a random rollout if
+    rollouts is set. Without one, priors are uniform and leaf values always come from rollouts.
+    """
+    def __init__(self, player=None, simulations=800, time_per_move=None, c_puct=1.5, rollouts=False):
+        """
+        :param player: A LearningPlayer providing priors and values, None for uniform priors and rollouts
+        :param simulations: The number of simulations per move, None for no limit
+        :param time_per_move: Seconds per move, None for no limit
+        :param c_puct: The exploration weight of the PUCT selection
+        :param rollouts: Flag controlling if leaf values come from random rollouts instead of the vf head of :param player
+        """
+        super(MCTSPlayer, self).__init__()
+        if player is not None and not issubclass(player.__class__, LearningPlayer):
+            raise PlayerException("MCTSPlayer takes a LearningPlayer for priors and values, received %s" % player)
+
+        self.player = player
+        self.simulations = simulations
+        self.time_per_move = time_per_move
+        self.rollouts = rollouts or player is None
+        self.mcts = MonteCarloTreeSearch(self.evaluate, c_puct=c_puct)
+
+    def get_move(self, board):
+        assert self.color
+        if not board.get_valid_moves(self.color):
+            return None
+
+        board = board.copy()
+        self.mcts.search(board, self.color, self.simulations, self.time_per_move)
+        board.release()
+        return self.mcts.best_move()
+
+    def evaluate(self, board, color, moves):
+        """ Evaluator of the search, see MonteCarloTreeSearch """
+        if self.player is None:
+            priors = np.full(len(moves), 1 / len(moves))
+        else:
+            with torch.no_grad():
+                probs, value = self.player.strategy.model(config.make_variable([board.get_representation(color)]),
+                                                          config.make_variable([board.get_legal_moves_map(color)]))
+            probs = probs.view(-1).cpu().numpy()[[move[0] * board.board_size + move[1] for move in moves]]
+            priors = probs / probs.sum() if probs.sum() > 0 else np.full(len(moves), 1 / len(moves))
+            if not self.rollouts:
+                return priors, float(np.clip(value.item(), -1, 1))
+
+        return priors, rollout(board, color)
+
+    def __str__(self):
+        return "[%s %s simulations %s time per move %s%s]" % (self.__class__.__name__, self.player if self.player is not None else "uniform",
+                                                             self.simulations, self.time_per_move, " rollouts" if self.rollouts else "")
+
+
+def rollout(board, color):
+    """
+    Plays random moves until the game is over and takes them back again.
+
+    :return: 1 if :param color wins, -1 if it loses and 0 for a draw
+    """
+    played, to_move = 0, color
+    winner = board.game_won()
+    while winner is None:
+        moves = list(board.get_valid_moves(to_move))
+        if moves:
+            board.make_move(random.choice(moves), to_move)
+            played += 1
+        to_move = board.other_color(to_move)
+        winner = board.game_won()
+
+    for i in range(played):
+        board.unmake_move()
+    return __outcome__(board, winner, color)
+
+
+def __outcome__(board, winner, color):
+    """ :return: 1 if :param winner is :param color, -1 if it is the other color and 0 for a draw """
+    if winner == color:
+        return 1
+    return -1 if winner == board.other_color(color) else 0
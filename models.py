@@ -27,7 +27,7 @@ class FCPolicyModel(abstract.Model):
 
     def forward(self, input, legal_moves_map):
         x = input.view(-1, self.board_size**2)
-        legal_moves_map = legal_moves_map.flatten()
+        legal_moves_map = legal_moves_map.reshape(-1, self.board_size**2)
 
         x = F.leaky_relu(self.fc1(x))
         x = F.leaky_relu(self.fc2(x))
@@ -66,7 +66,7 @@ class LargeFCPolicyModel(abstract.Model):
 
     def forward(self, input, legal_moves_map):
         x = input.view(-1, self.board_size ** 2)
-        legal_moves_map = legal_moves_map.flatten()
+        legal_moves_map = legal_moves_map.reshape(-1, self.board_size**2)
 
         x = F.leaky_relu(self.fc1(x))
         x = F.leaky_relu(self.fc2(x))
@@ -112,7 +112,7 @@ class HugeFCPolicyModel(abstract.Model):
 
     def forward(self, input, legal_moves_map):
         x = input.view(-1, self.board_size ** 2)
-        legal_moves_map = legal_moves_map.flatten()
+        legal_moves_map = legal_moves_map.reshape(-1, self.board_size**2)
 
         x = F.leaky_relu(self.fc1(x))
         x = F.leaky_relu(self.fc2(x))
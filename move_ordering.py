@@ -0,0 +1,105 @@
+"""
+Move ordering for the alpha-beta and principal variation searches of search_based_ai.py.
+"""
+
+
+class MoveOrdering:
+    """
+    Orders the moves of a search node so that the ones most likely to cause a cutoff are searched first.
+
+    Moves are ranked by:
+    1. The transposition table move, the best move of an earlier search of the same position
+    2. Killer moves, moves that recently caused a cutoff in a sibling node at the same ply
+    3. The history table, the sum of squared remaining depths of all cutoffs a move of the same color caused
+    4. Static square priorities, e.g. ExperiencedPlayer.heuristic_table
+
+    Ties keep the order in which the moves were passed. Each feature can be disabled, MoveOrdering(False, 0, False) keeps the given order.
+    """
+    def __init__(self, table_move=True, killers=2, history=True, square_priorities=None):
+        """
+        :param table_move: Flag controlling if the transposition table move is searched first
+        :param killers: The number of killer moves kept per ply, 0 to disable them
+        :param history: Flag controlling if the history table is used
+        :param square_priorities: A board_size x board_size array of static move priorities, higher is searched earlier. None to disable them
+        """
+        self.table_move = table_move
+        self.killer_slots = killers
+        self.history = history
+        self.priorities = None if square_priorities is None else \
+            {(i, j): -square_priorities[i][j] for i in range(len(square_priorities)) for j in range(len(square_priorities[i]))}
+        self.clear()
+
+    def clear(self):
+        """ Forgets all killers and history and resets the statistics """
+        self.killers = {}  # ply -> list of moves, most recent first
+        self.history_table = {}  # (color, move) -> score
+        self.reset_statistics()
+
+    def reset_statistics(self):
+        self.nodes, self.cutoffs, self.first_move_cutoffs, self.cutoff_indices = 0, 0, 0, 0
+
+    def new_search(self):
+        """ Killers are specific to the plies of the last search, the history only decays """
+        self.killers = {}
+        self.history_table = {key: score // 2 for key, score in self.history_table.items() if score > 1}
+
+    def order(self, moves, ply, color, table_move=None):
+        """
+        :param moves: The valid moves of the node
+        :param ply: The distance of the node from the root of the search
+        :param color: The color to move
+        :param table_move: The move stored in the transposition table for the node, None if there is none
+        :return: a new list holding :param moves in search order
+        """
+        killers = self.killers.get(ply, ())
+        table_move = table_move if self.table_move else None
+
+        def rank(move):
+            if move == table_move:
+                return 0, 0, 0, 0
+            if move in killers:
+                return 1, killers.index(move), 0, 0
+            return (2, 0,
+                    -self.history_table.get((color, move), 0) if self.history else 0,
+                    self.priorities[move] if self.priorities is not None else 0)
+
+        return sorted(moves, key=rank)
+
+    def searched(self, move, ply, color, depth, index, cutoff):
+        """
+        Records the outcome of searching the children of a node.
+
+        :param move: The best move of the node, None if no move improved on the window
+        :param ply: The distance of the node from the root of the search
+        :param color: The color to move
+        :param depth: The remaining depth of the node
+        :param index: The position of :param move in the search order
+        :param cutoff: Flag indicating that :param move caused a cutoff
+        """
+        self.nodes += 1
+        if not cutoff:
+            return
+
+        self.cutoffs += 1
+        self.cutoff_indices += index
+        if index == 0:
+            self.first_move_cutoffs += 1
+
+        if self.killer_slots:
+            killers = self.killers.setdefault(ply, [])
+            if move in killers:
+                killers.remove(move)
+            killers.insert(0, move)
+            del killers[self.killer_slots:]
+        if self.history:
+            self.history_table[(color, move)] = self.history_table.get((color, move), 0) + max(depth, 1)**2
+
+    def statistics(self):
+        """
+        :return: a dict holding the number of searched inner nodes, their cutoffs, the share of cutoffs caused by the first move
+                 and the average position of the move causing a cutoff
+        """
+        return {"nodes": self.nodes,
+                "cutoffs": self.cutoffs,
+                "first_move_cutoff_rate": self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0,
+                "average_cutoff_index": self.cutoff_indices / self.cutoffs if self.cutoffs else 0}
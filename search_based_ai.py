@@ -0,0 +1,398 @@
+"""
+Alpha-beta and principal variation search shared by the Othello and TicTacToe search players.
+"""
+import sys
+import random
+from time import perf_counter
+from queue import PriorityQueue
+from contextlib import closing
+
+from transposition_table import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+from move_ordering import MoveOrdering
+from search_cache import SearchCache
+
+PASS_KEY = 0x9E3779B97F4A7C15
+
+# Search algorithms
+ALPHA_BETA, PRINCIPAL_VARIATION = range(2)
+
+
+class GameArtificialIntelligence(object):
+
+    def __init__(self, heuristic_fn, transposition_table_size=2**16, move_ordering=None, search=ALPHA_BETA, aspiration_window=None, search_cache=None, win_score=None):
+        """
+        :param heuristic_fn: Function (node, player, other_player) -> score of the node from the perspective of player
+        :param transposition_table_size: The number of slots of the transposition table
+        :param move_ordering: The MoveOrdering used in all nodes. Defaults to transposition table move, killers and history
+        :param search: ALPHA_BETA for the minimax formulation or PRINCIPAL_VARIATION for negamax principal variation search.
+                       The latter relies on null windows and therefore on scores that differ by at least 1
+        :param aspiration_window: Half width of the window around the previous iteration's score in which PRINCIPAL_VARIATION
+                                  searches with a time limit start. None to always search the full window
+        :param search_cache: The SearchCache holding the results of searches without time limit. Defaults to a new cache of 16MB.
+                             Must not be shared with AIs of a different heuristic or search configuration
+        :param win_score: Scores of at least this magnitude are won or lost games. Iterative deepening stops once the best score reaches one,
+                          None to only stop at the end of the game
+        """
+        self.heuristic = heuristic_fn
+        self.search = search
+        self.aspiration_window = aspiration_window
+        self.transposition_table = TranspositionTable(transposition_table_size)
+        self.move_ordering = move_ordering if move_ordering is not None else MoveOrdering()
+        self.search_cache = search_cache if search_cache is not None else SearchCache()
+        self.win_score = win_score
+        self.visited_nodes = 0
+        self.root_depth = 0
+        self.player = None
+        self.deadline = None  # perf_counter() value at which a running search aborts, None for searches without time limit
+        self.exact = False  # Set while no line of the running iteration has been cut short by the depth limit
+
+        # Result of the deepest completed iteration of the last search
+        self.best_move, self.best_score, self.completed_depth = None, None, 0
+
+    def move_search(self, starting_node, depth, current_player, other_player, time_limit=None):
+        """
+        Searches the best move of :param current_player.
+
+        Results of searches without time limit are cached by position key and depth, equal positions share them regardless of
+        the board object. Timed searches depend on the time they got and are neither cached nor looked up.
+
+        Without a time limit, a single search to :param depth is run. With one, the search deepens iteratively from depth 1 up to :param depth.
+        Each iteration searches the root moves in the order of the previous iteration's scores, the transposition table orders the moves below.
+        Once the time is up, the running iteration is abandoned and the best move of the deepest completed one is returned.
+        The deepening also stops once the result is exact, i.e. the best score is a won or lost game or every line reached the end of the game.
+
+        :param time_limit: Seconds the search may take, None for no limit
+        :return: the best move found
+        """
+        cache_key = (self.keyify(starting_node, current_player), depth)
+        if time_limit is None:
+            cached = self.search_cache.get(cache_key)
+            if cached is not None:
+                self.best_move, self.best_score, self.completed_depth = cached
+                return self.best_move
+
+        move = self.__move_search__(starting_node, depth, current_player, other_player, time_limit)
+        if time_limit is None:
+            self.search_cache.put(cache_key, (self.best_move, self.best_score, self.completed_depth))
+        return move
+
+    def __move_search__(self, starting_node, depth, current_player, other_player, time_limit):
+        if self.player != current_player:
+            self.transposition_table.clear()  # Scores are stored from the perspective of the searching player
+        self.transposition_table.new_search()
+        self.move_ordering.new_search()
+        self.player = current_player
+        self.other_player = other_player
+        possible_moves = list(starting_node.get_valid_moves(current_player))
+
+        # Anytime result, available even if not a single iteration completes
+        self.best_move, self.best_score, self.completed_depth = random.choice(possible_moves), None, 0
+        if len(possible_moves) == 1:
+            return self.best_move
+
+        self.queue = PriorityQueue(len(possible_moves))
+        self.deadline = None if time_limit is None else perf_counter() + time_limit
+        try:
+            for iteration_depth in (range(1, depth + 1) if time_limit is not None else [depth]):
+                self.exact = self.reaches_end(starting_node, iteration_depth)
+                if self.search == PRINCIPAL_VARIATION:
+                    (new_move, new_score) = self.aspiration_search(starting_node, iteration_depth, current_player, other_player)
+                else:
+                    (new_move, new_score) = self.alpha_beta_wrapper(starting_node, iteration_depth, current_player, other_player)
+                if new_move is None:
+                    break  # Out of time
+                self.best_move, self.best_score, self.completed_depth = new_move, new_score, iteration_depth
+                if self.exact or (self.win_score is not None and abs(new_score) >= self.win_score):
+                    break  # Deeper iterations return the same result
+        finally:
+            self.deadline = None
+        return self.best_move
+
+    def root_moves(self, node, current_player):
+        """ :return: the moves of the root in the order of the last iteration's scores, for the first iteration in random order refined by the move ordering """
+        if self.queue.queue:
+            moves = [move for (x, move) in sorted(self.queue.queue)]  # Best first, the queue itself is only heap ordered
+            self.queue = PriorityQueue(self.queue.maxsize)
+        else:
+            moves = list(node.get_valid_moves(current_player))
+            # Shuffle order of moves evaluated to prevent playing the same game every time
+            random.shuffle(moves)
+            moves = self.move_ordering.order(moves, 0, current_player)
+        return moves
+
+    def alpha_beta_wrapper(self, node, depth, current_player, other_player):
+        self.root_depth = depth
+        alpha = -sys.maxsize-1
+        beta = sys.maxsize
+        moves = self.root_moves(node, current_player)
+
+        with closing(self.children(node, current_player, moves)) as children:
+            for move in children:
+                new_alpha = self.alpha_beta_search(node, depth-1, other_player, current_player, alpha, beta, False)
+                if new_alpha is None:
+                    return (None, None)
+                else:
+                    self.queue.put((-new_alpha, move))
+                if new_alpha > alpha:
+                    alpha = new_alpha
+                    best_move = move
+                #print "Possible move:", move, "Score:", new_alpha
+        return (best_move, alpha)
+
+    def children(self, node, color, moves=None):
+        """
+        Lazily iterates over the children of :param node without allocating boards.
+
+        Each move is applied to :param node in place right before it is yielded and taken back once the consumer asks for the next one
+        or closes the iterator, e.g. after an alpha-beta cutoff.
+
+        :param node: The board to expand. It holds the child position while the corresponding move is being consumed
+        :param color: The color to move
+        :param moves: The moves to expand in this order. Defaults to all valid moves of :param color
+        :return: a generator of moves
+        """
+        if moves is None:
+            moves = list(node.get_valid_moves(color))
+
+        for move in moves:
+            node.make_move(move, color)
+            try:
+                yield move
+            finally:
+                node.unmake_move()
+
+    def is_terminal(self, node, depth):
+        """
+        Decides whether :param node is a leaf of the search, which is scored by the heuristic instead of being expanded.
+        Games searching to the end of the game regardless of the depth override it.
+
+        :param depth: The remaining depth of :param node
+        """
+        if depth > 0:
+            return node.game_won() is not None
+        if self.exact and node.game_won() is None:
+            self.exact = False  # A line with passes ran out of depth before the end of the game
+        return True
+
+    def reaches_end(self, node, depth):
+        """
+        :return: True if a search of :param depth from :param node can reach the end of the game in every line, as every move fills one
+                 empty square. is_terminal detects lines that are still cut short because of passes
+        """
+        return depth >= node.board_size**2 - sum(node.count_stones())
+
+    def keyify(self, node, player):
+        if player == node.to_move:
+            return node.key
+        return node.key ^ PASS_KEY  # The same board with the other color to move, after a pass
+
+    def alpha_beta_search(self, node, depth, current_player, other_player, alpha=-sys.maxsize-1, beta=sys.maxsize, maximizing=True):
+        if self.deadline is not None and perf_counter() > self.deadline:
+            return None  # Aborts the whole search
+        self.visited_nodes += 1
+
+        if self.is_terminal(node, depth):
+            return self.heuristic(node, self.player, self.other_player)
+
+        # Bounds of earlier searches narrow the window. The bound of the result is classified against the original one
+        key = self.keyify(node, current_player)
+        original_alpha, original_beta = alpha, beta
+        table_move = None
+        entry = self.transposition_table.probe(key)
+        if entry is not None:
+            entry_depth, bound, score, table_move = entry
+            if entry_depth >= depth:
+                if bound == EXACT:
+                    return score
+                if bound == LOWER_BOUND:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score
+
+        score, best_move = self.search_children(node, depth, current_player, other_player, alpha, beta, maximizing, table_move)
+        if score is not None:
+            self.transposition_table.store(key, depth, TranspositionTable.bound(score, original_alpha, original_beta), score, best_move)
+        return score
+
+    def search_children(self, node, depth, current_player, other_player, alpha, beta, maximizing, table_move=None):
+        """
+        Searches all moves of :param current_player in the order of the move ordering.
+
+        :return: a tuple (score, best_move). best_move is None if no move improved on the window or :param current_player has to pass
+        """
+        moves = list(node.get_valid_moves(current_player))
+        if not moves:
+            if maximizing:
+                new_alpha = self.alpha_beta_search(node, depth-1, other_player, current_player, alpha, beta, False)
+                if new_alpha is None:
+                    return None, None
+                return max(alpha, new_alpha), None
+            else:
+                new_beta = self.alpha_beta_search(node, depth-1, other_player, current_player, alpha, beta)
+                if new_beta is None:
+                    return None, None
+                return min(beta, new_beta), None
+
+        ply = self.root_depth - depth
+        moves = self.move_ordering.order(moves, ply, current_player, table_move)
+
+        best_move, best_index, cutoff = None, 0, False
+        with closing(self.children(node, current_player, moves)) as children:
+            for index, move in enumerate(children):
+                if maximizing:
+                    new_alpha = self.alpha_beta_search(node, depth-1, other_player, current_player, alpha, beta, False)
+                    if new_alpha is None:
+                        return None, None
+                    if new_alpha > alpha:
+                        alpha, best_move, best_index = new_alpha, move, index
+                else:
+                    new_beta = self.alpha_beta_search(node, depth-1, other_player, current_player, alpha, beta)
+                    if new_beta is None:
+                        return None, None
+                    if new_beta < beta:
+                        beta, best_move, best_index = new_beta, move, index
+                if alpha >= beta:
+                    cutoff = True
+                    break
+
+        self.move_ordering.searched(best_move, ply, current_player, depth, best_index, cutoff)
+        return (alpha if maximizing else beta), best_move
+
+    def aspiration_search(self, node, depth, current_player, other_player):
+        """
+        Principal variation search of the root in a window of aspiration_window around the score of the previous iteration.
+        A side on which the score falls outside of the window is opened completely and the root is searched again.
+
+        :return: a tuple (best_move, score), (None, None) if the search ran out of time
+        """
+        alpha, beta = -sys.maxsize-1, sys.maxsize
+        if self.aspiration_window is not None and self.best_score is not None:
+            alpha, beta = self.best_score - self.aspiration_window, self.best_score + self.aspiration_window
+
+        while True:
+            (best_move, score) = self.principal_variation_wrapper(node, depth, current_player, other_player, alpha, beta)
+            if best_move is None:
+                return None, None
+            if score <= alpha and alpha != -sys.maxsize-1:
+                alpha = -sys.maxsize-1  # Failed low
+            elif score >= beta and beta != sys.maxsize:
+                beta = sys.maxsize  # Failed high
+            else:
+                return best_move, score
+
+    def principal_variation_wrapper(self, node, depth, current_player, other_player, alpha=-sys.maxsize-1, beta=sys.maxsize):
+        """
+        Searches the first root move with the window (:param alpha, :param beta) and all others with a null window first.
+
+        :return: a tuple (best_move, score). Scores outside of the window are bounds, (None, None) if the search ran out of time
+        """
+        self.root_depth = depth
+        moves = self.root_moves(node, current_player)
+
+        best_move, best_score = None, None
+        with closing(self.children(node, current_player, moves)) as children:
+            for index, move in enumerate(children):
+                score = self.null_window_search(node, depth, other_player, current_player, alpha, beta, index == 0)
+                if score is None:
+                    return None, None
+                self.queue.put((-score, move))
+                if best_score is None or score > best_score:
+                    best_move, best_score = move, score
+                alpha = max(alpha, score)
+                if alpha >= beta:
+                    for remaining in moves[index+1:]:
+                        self.queue.put((sys.maxsize, remaining))  # Searched last in the next iteration
+                    break
+        return best_move, best_score
+
+    def null_window_search(self, node, depth, current_player, other_player, alpha, beta, first):
+        """
+        Scores the child :param node of a principal variation search node. Only the first child is searched with the full window,
+        the others are only proven to be no better than :param alpha and searched again if they are.
+
+        :param current_player: The color to move in the child
+        :return: the score from the perspective of the parent, None if the search ran out of time
+        """
+        if not first:
+            score = self.principal_variation_search(node, depth-1, current_player, other_player, -alpha-1, -alpha)
+            if score is None or not alpha < -score < beta:
+                return None if score is None else -score
+        score = self.principal_variation_search(node, depth-1, current_player, other_player, -beta, -alpha)
+        return None if score is None else -score
+
+    def principal_variation_search(self, node, depth, current_player, other_player, alpha=-sys.maxsize-1, beta=sys.maxsize):
+        """
+        Fail-soft negamax principal variation search.
+
+        :return: the score from the perspective of :param current_player, None if the search ran out of time
+        """
+        if self.deadline is not None and perf_counter() > self.deadline:
+            return None  # Aborts the whole search
+        self.visited_nodes += 1
+
+        if self.is_terminal(node, depth):
+            score = self.heuristic(node, self.player, self.other_player)
+            return score if current_player == self.player else -score
+
+        key = self.keyify(node, current_player)
+        original_alpha, original_beta = alpha, beta
+        table_move = None
+        entry = self.transposition_table.probe(key)
+        if entry is not None:
+            entry_depth, bound, score, table_move = entry
+            if entry_depth >= depth:
+                if bound == EXACT:
+                    return score
+                if bound == LOWER_BOUND:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score
+
+        moves = list(node.get_valid_moves(current_player))
+        if not moves:
+            score = self.principal_variation_search(node, depth-1, other_player, current_player, -beta, -alpha)
+            if score is None:
+                return None
+            self.transposition_table.store(key, depth, TranspositionTable.bound(-score, original_alpha, original_beta), -score)
+            return -score
+
+        ply = self.root_depth - depth
+        moves = self.move_ordering.order(moves, ply, current_player, table_move)
+
+        best_score, best_move, best_index, cutoff = None, None, 0, False
+        with closing(self.children(node, current_player, moves)) as children:
+            for index, move in enumerate(children):
+                score = self.null_window_search(node, depth, other_player, current_player, alpha, beta, index == 0)
+                if score is None:
+                    return None
+                if best_score is None or score > best_score:
+                    best_score = score
+                if score > alpha:
+                    alpha, best_move, best_index = score, move, index
+                if alpha >= beta:
+                    cutoff = True
+                    break
+
+        self.move_ordering.searched(best_move, ply, current_player, depth, best_index, cutoff)
+        self.transposition_table.store(key, depth, TranspositionTable.bound(best_score, original_alpha, original_beta), best_score, best_move)
+        return best_score
+
+    def statistics(self):
+        """
+        :return: a dict holding the number of visited nodes, the move ordering statistics and the transposition table hit rate
+        """
+        statistics = {"visited_nodes": self.visited_nodes}
+        statistics.update(self.move_ordering.statistics())
+        table = self.transposition_table
+        statistics["table_hit_rate"] = table.hits / table.probes if table.probes else 0
+        statistics["cache_hit_rate"] = self.search_cache.statistics()["hit_rate"]
+        return statistics
+
+    def reset_statistics(self):
+        self.visited_nodes = 0
+        self.move_ordering.reset_statistics()
+        self.transposition_table.probes, self.transposition_table.hits, self.transposition_table.stores = 0, 0, 0
@@ -0,0 +1,83 @@
+"""
+Bounded cache of search results for GameArtificialIntelligence.move_search in search_based_ai.py.
+"""
+import sys
+import weakref
+from collections import OrderedDict
+
+ENTRY_OVERHEAD = 100  # Approximate bytes of an OrderedDict slot and its linked list node on top of key and value
+
+
+class SearchCache:
+    """
+    Least recently used mapping of compact keys, e.g. (position key, depth), to search results.
+
+    The size is bounded in bytes rather than entries: every entry is charged the size of its key and value plus ENTRY_OVERHEAD,
+    and the least recently used entries are evicted once the total exceeds the bound. Keys and values must be small immutable
+    objects such as tuples of ints, so that no boards are kept alive.
+
+    Every cache can be cleared on its own, e.g. per player, or all at once with SearchCache.clear_all, e.g. per experiment.
+    """
+    instances = weakref.WeakSet()
+
+    def __init__(self, max_bytes=2**24):
+        """
+        :param max_bytes: The upper bound of the approximate memory used by all entries
+        """
+        self.max_bytes = max_bytes
+        self.clear()
+        SearchCache.instances.add(self)
+
+    def clear(self):
+        """ Removes all entries and resets the statistics """
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits, self.misses, self.evictions = 0, 0, 0
+
+    @classmethod
+    def clear_all(cls):
+        """ Clears every SearchCache that is still alive """
+        for cache in list(cls.instances):
+            cache.clear()
+
+    def get(self, key):
+        """
+        :return: the value stored for :param key, None if there is none
+        """
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        """ Stores :param value for :param key and evicts least recently used entries until the cache fits into max_bytes again """
+        if key in self.entries:
+            self.bytes -= self.__size__(key, self.entries.pop(key))
+        self.entries[key] = value
+        self.bytes += self.__size__(key, value)
+
+        while self.bytes > self.max_bytes and self.entries:
+            self.bytes -= self.__size__(*self.entries.popitem(last=False))
+            self.evictions += 1
+
+    def statistics(self):
+        """
+        :return: a dict holding the number of entries, their approximate bytes, hits, misses, the hit rate and evictions
+        """
+        lookups = self.hits + self.misses
+        return {"entries": len(self.entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0,
+                "evictions": self.evictions}
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def __size__(key, value):
+        return sys.getsizeof(key) + sum(sys.getsizeof(item) for item in key) + sys.getsizeof(value) + ENTRY_OVERHEAD
@@ -0,0 +1,77 @@
+"""
+Fixed size transposition table for the alpha-beta and principal variation searches of search_based_ai.py.
+"""
+
+# Bound types of stored scores
+EXACT, LOWER_BOUND, UPPER_BOUND = range(3)
+
+
+class TranspositionTable:
+    """
+    Maps 64 bit position keys, such as Board.key, to the results of earlier searches.
+
+    Entries live in 2**k slots indexed by the low bits of the key. The full key is stored as well, so that colliding positions are told apart.
+    Replacement is depth preferred with aging: a slot is overwritten by results of the same position, by any result if the stored one is from
+    an earlier search (see new_search), and otherwise only by results of a search at least as deep.
+    """
+    def __init__(self, size=2**16):
+        """
+        :param size: The number of slots, rounded up to the next power of two
+        """
+        self.size = 1 << max(size - 1, 1).bit_length()
+        self.mask = self.size - 1
+        self.generation = 0
+        self.clear()
+
+    def clear(self):
+        """ Removes all entries """
+        self.keys = [None] * self.size
+        self.entries = [None] * self.size  # Tuples (depth, bound, score, move)
+        self.generations = [0] * self.size
+        self.probes, self.hits, self.stores = 0, 0, 0
+
+    def new_search(self):
+        """ Marks all current entries as old, so that the next search can replace them regardless of their depth """
+        self.generation += 1
+
+    def probe(self, key):
+        """
+        :return: a tuple (depth, bound, score, move) stored for :param key, None if there is none
+        """
+        self.probes += 1
+        index = key & self.mask
+        if self.keys[index] == key:
+            self.hits += 1
+            return self.entries[index]
+        return None
+
+    def store(self, key, depth, bound, score, move=None):
+        """
+        Stores a search result unless the replacement policy keeps the entry in its slot.
+
+        :param key: The position key
+        :param depth: The remaining depth the position was searched to
+        :param bound: EXACT, LOWER_BOUND if the score failed high or UPPER_BOUND if it failed low
+        :param score: The score of the position
+        :param move: The best move found, None if no move raised the score above the window
+        """
+        index = key & self.mask
+        if self.keys[index] is not None and self.keys[index] != key and self.generations[index] == self.generation \
+                and self.entries[index][0] > depth:
+            return
+
+        if move is None and self.keys[index] == key:
+            move = self.entries[index][3]  # Keep the move of an earlier search of the position for move ordering
+        self.keys[index] = key
+        self.entries[index] = (depth, bound, score, move)
+        self.generations[index] = self.generation
+        self.stores += 1
+
+    @staticmethod
+    def bound(score, alpha, beta):
+        """ :return: The bound type of a score returned by a search of the window (:param alpha, :param beta) """
+        if score <= alpha:
+            return UPPER_BOUND
+        if score >= beta:
+            return LOWER_BOUND
+        return EXACT